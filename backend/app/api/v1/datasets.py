@@ -1,18 +1,35 @@
-from typing import List
+import asyncio
+import json
+import zlib
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
 from app.database import models
-from app.database.base import get_db
+from app.database.base import SessionLocal, get_db, get_async_db
 from app.api.v1.auth import get_current_user
 from app.api.v1.auth import get_current_admin_user
-from app.services.regeneration import regenerate_dataset
 from app.services.ollama_client import OllamaClient
+from app.services.ollama_errors import OllamaError
+from app.services.dataset_generation import (
+    generate_from_articles,
+    get_model_limit,
+    load_batch_articles,
+    resolve_generation_target,
+    select_batch_articles,
+    stream_from_articles,
+)
+from app.api.v1.sse import SSE_HEADERS, sse_event
 
 router = APIRouter()
 
+# 批次新增資料集的單次上限
+MAX_BATCH_CREATE_SIZE = 5000
+
 @router.post("/", response_model=schemas.RawDataset, status_code=status.HTTP_201_CREATED)
 def create_raw_dataset(
     dataset: schemas.RawDatasetCreate,
@@ -24,7 +41,7 @@ def create_raw_dataset(
 @router.post("/generate-from-regulations", response_model=schemas.GeneratedDataset)
 async def generate_dataset_from_regulations(
     request: schemas.GenerateFromRegulationsRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: models.User = Depends(get_current_admin_user)
 ):
     """
@@ -32,145 +49,126 @@ async def generate_dataset_from_regulations(
     Only accessible by admin users.
     """
     try:
-        # Get Ollama configuration
-        url_setting = crud.get_setting(db, "ollama_url")
-        ollama_url = url_setting.value if url_setting else "http://ollama:11434"
-
-        # 使用指定的模型或從設定中獲取第一個可用模型
-        if request.model_name:
-            model_name = request.model_name
-        else:
-            # 從多模型設定中獲取第一個模型
-            models_setting = crud.get_setting(db, "ollama_models")
-            if models_setting and models_setting.value and len(models_setting.value) > 0:
-                model_name = models_setting.value[0]  # 使用第一個模型作為預設
-            else:
-                model_name = "llama3"  # 預設模型
+        ollama_url, model_name = await resolve_generation_target(db, request.model_name)
 
         # Create Ollama client
-        ollama_client = OllamaClient(host=ollama_url, model=model_name)
+        keep_alive = await crud.get_model_keep_alive_async(db, model_name)
+        ollama_client = OllamaClient(
+            host=ollama_url, model=model_name, use_cache=not request.bypass_cache, keep_alive=keep_alive
+        )
         
         # Get selected legal articles with full content
-        selected_articles = []
-        article_contents = []
-        for article_id in request.selected_article_ids:
-            article = db.query(models.LegalArticle).filter(models.LegalArticle.id == article_id).first()
-            if article:
-                selected_articles.append(f"{article.title}第{article.number}條")
-                article_contents.append(f"{article.title}第{article.number}條：{article.content}")
-        
+        selected_articles = await load_batch_articles(db, request.selected_article_ids, random_selection=False)
         if not selected_articles:
             raise HTTPException(status_code=400, detail="請選擇至少一個法規條文")
         
         # Generate structured dataset with new prompt
-        generated_data = await ollama_client.generate_from_regulations(article_contents)
-        
-        # Add source and model name to the generated data
-        generated_data["source"] = selected_articles
-        generated_data["model_name"] = model_name
-        
-        return schemas.GeneratedDataset(**generated_data)
+        return await generate_from_articles(ollama_client, selected_articles)
         
+    except HTTPException:
+        raise
+    except OllamaError as e:
+        # 重試後仍失敗或斷路器開啟：Ollama 暫時無法使用
+        print(f"Error generating dataset: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"生成資料失敗: {str(e)}")
     except Exception as e:
         print(f"Error generating dataset: {e}")
         raise HTTPException(status_code=500, detail=f"生成資料失敗: {str(e)}")
 
+async def _stream_generation_events(ollama_client: OllamaClient, selected_articles):
+    try:
+        async for kind, value in stream_from_articles(ollama_client, selected_articles):
+            if kind == "token":
+                yield sse_event("token", {"content": value})
+            else:
+                yield sse_event("result", value.model_dump())
+    except Exception as e:
+        # 串流已開始後無法再改變狀態碼，以 error 事件通知前端
+        print(f"Error streaming dataset generation: {e}")
+        yield sse_event("error", {"detail": f"生成資料失敗: {str(e)}"})
+
+@router.post("/generate-from-regulations/stream")
+async def stream_dataset_from_regulations(
+    request: schemas.GenerateFromRegulationsRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Streaming variant of /generate-from-regulations, returned as Server-Sent Events.
+    `token` events relay the model's output as it is produced, a final `result` event
+    carries the parsed GeneratedDataset, and an `error` event is sent if generation fails.
+    Only accessible by admin users.
+    """
+    ollama_url, model_name = await resolve_generation_target(db, request.model_name)
+    selected_articles = await load_batch_articles(db, request.selected_article_ids, random_selection=False)
+    if not selected_articles:
+        raise HTTPException(status_code=400, detail="請選擇至少一個法規條文")
+
+    keep_alive = await crud.get_model_keep_alive_async(db, model_name)
+    ollama_client = OllamaClient(
+        host=ollama_url, model=model_name, use_cache=not request.bypass_cache, keep_alive=keep_alive
+    )
+    return StreamingResponse(
+        _stream_generation_events(ollama_client, selected_articles),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @router.post("/batch-generate-from-regulations", response_model=schemas.BatchGeneratedDataset)
 async def batch_generate_datasets_from_regulations(
     request: schemas.BatchGenerateFromRegulationsRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: models.User = Depends(get_current_admin_user)
 ):
     """
     Generate multiple datasets from selected legal regulations using Ollama.
     Supports random selection of regulations for each generation.
     Only accessible by admin users.
+    For large batches prefer POST /generation-jobs, which returns immediately
+    and streams progress.
     """
     try:
-        # Get Ollama configuration
-        url_setting = crud.get_setting(db, "ollama_url")
-        ollama_url = url_setting.value if url_setting else "http://ollama:11434"
-
-        # 使用指定的模型或從設定中獲取第一個可用模型
-        if request.model_name:
-            model_name = request.model_name
-        else:
-            # 從多模型設定中獲取第一個模型
-            models_setting = crud.get_setting(db, "ollama_models")
-            if models_setting and models_setting.value and len(models_setting.value) > 0:
-                model_name = models_setting.value[0]  # 使用第一個模型作為預設
-            else:
-                model_name = "llama3"  # 預設模型
+        ollama_url, model_name = await resolve_generation_target(db, request.model_name)
 
         # Create Ollama client
-        ollama_client = OllamaClient(host=ollama_url, model=model_name)
+        keep_alive = await crud.get_model_keep_alive_async(db, model_name)
+        ollama_client = OllamaClient(
+            host=ollama_url, model=model_name, use_cache=not request.bypass_cache, keep_alive=keep_alive
+        )
         
         # Get all available legal articles
-        all_articles = []
-        
-        # 如果啟用隨機選擇且沒有選擇法規，使用所有可用的法規
-        if request.random_selection and not request.selected_article_ids:
-            all_available_articles = db.query(models.LegalArticle).all()
-            for article in all_available_articles:
-                all_articles.append({
-                    'id': article.id,
-                    'title': article.title,
-                    'number': article.number,
-                    'content': article.content
-                })
-        else:
-            # 使用選擇的法規
-            for article_id in request.selected_article_ids:
-                article = db.query(models.LegalArticle).filter(models.LegalArticle.id == article_id).first()
-                if article:
-                    all_articles.append({
-                        'id': article.id,
-                        'title': article.title,
-                        'number': article.number,
-                        'content': article.content
-                    })
-        
+        all_articles = await load_batch_articles(db, request.selected_article_ids, request.random_selection)
         if not all_articles:
             raise HTTPException(status_code=400, detail="請選擇至少一個法規條文")
         
+        # 先為每一筆決定使用的法規，再並行生成
+        article_selections = select_batch_articles(all_articles, request.batch_size, request.random_selection)
+
+        # 同時進行的生成數量受模型的並行上限限制（對應 Ollama 的 OLLAMA_NUM_PARALLEL），
+        # 與其他批次、生成工作及重新生成共用
+        model_limit = await get_model_limit(db, ollama_url, model_name)
+
+        async def generate_one(selected_articles):
+            async with model_limit:
+                return await generate_from_articles(ollama_client, selected_articles)
+
+        # gather 會依原始順序回傳結果，個別失敗不影響其他項目
+        results = await asyncio.gather(
+            *(generate_one(selected_articles) for selected_articles in article_selections),
+            return_exceptions=True
+        )
+
         generated_datasets = []
         success_count = 0
         failed_count = 0
-        
-        # Generate multiple datasets
-        for i in range(request.batch_size):
-            try:
-                # Randomly select regulations if enabled
-                if request.random_selection and len(all_articles) > 1:
-                    # Randomly select 1-3 articles for each generation
-                    import random
-                    num_articles = random.randint(1, min(3, len(all_articles)))
-                    selected_articles = random.sample(all_articles, num_articles)
-                else:
-                    # Use all selected articles
-                    selected_articles = all_articles
-                
-                # Prepare article contents
-                article_contents = []
-                article_titles = []
-                for article in selected_articles:
-                    article_titles.append(f"{article['title']}第{article['number']}條")
-                    article_contents.append(f"{article['title']}第{article['number']}條：{article['content']}")
-                
-                # Generate structured dataset
-                generated_data = await ollama_client.generate_from_regulations(article_contents)
-                
-                # Add source and model name to the generated data
-                generated_data["source"] = article_titles
-                generated_data["model_name"] = model_name
-                
-                generated_datasets.append(schemas.GeneratedDataset(**generated_data))
-                success_count += 1
-                
-            except Exception as e:
-                print(f"Error generating dataset {i+1}: {e}")
+        for i, result in enumerate(results):
+            # 個別項目被取消時 gather 回傳的是 CancelledError（BaseException），同樣視為失敗
+            if isinstance(result, BaseException):
+                print(f"Error generating dataset {i+1}: {result}")
                 failed_count += 1
-                continue
+            else:
+                generated_datasets.append(result)
+                success_count += 1
         
         return schemas.BatchGeneratedDataset(
             datasets=generated_datasets,
@@ -205,21 +203,41 @@ def batch_confirm_generated_datasets(
     Confirm and save multiple generated datasets to the database.
     Only accessible by admin users.
     """
-    created_datasets = []
-    for dataset in datasets:
-        created_dataset = crud.create_raw_dataset(db=db, dataset=dataset)
-        created_datasets.append(created_dataset)
-    return created_datasets
+    if len(datasets) > MAX_BATCH_CREATE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch size cannot exceed {MAX_BATCH_CREATE_SIZE} datasets"
+        )
+    return crud.bulk_create_raw_datasets(db=db, datasets=datasets)
 
-@router.get("/", response_model=List[schemas.RawDatasetWithStats])
+@router.get("/", response_model=schemas.RawDatasetPage)
 def read_raw_datasets(
-    skip: int = 0,
-    limit: int = 100,
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    include_history: bool = False,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    datasets = crud.get_raw_datasets(db, skip=skip, limit=limit)
-    return datasets
+    """
+    Retrieve datasets awaiting review, paginated by id.
+    Pass the returned `next_cursor` as `after_id` to fetch the next page.
+    `history` is only loaded when `include_history=true` and is null otherwise.
+    """
+    return crud.get_raw_datasets(db, after_id=after_id, limit=limit, include_history=include_history)
+
+@router.get("/{dataset_id}/revisions", response_model=List[schemas.DatasetRevision])
+def get_dataset_revisions(
+    dataset_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the earlier versions of a dataset replaced by regeneration, oldest first,
+    each with the review counts and rejection reasons it had when it was replaced.
+    """
+    if crud.get_raw_dataset(db, dataset_id=dataset_id) is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return crud.get_dataset_revisions(db, dataset_id)
 
 @router.get("/{dataset_id}/rejections", response_model=List[schemas.RejectionInfo])
 def get_rejection_reasons(
@@ -267,6 +285,64 @@ def read_final_datasets(
     datasets = crud.get_final_datasets(db, skip=skip, limit=limit)
     return datasets
 
+def _final_dataset_export_record(row, export_format: str) -> dict:
+    if export_format == "raw":
+        return {
+            "id": row.id,
+            "original_input": row.original_input,
+            "final_output": row.final_output,
+            "raw_dataset_id": row.raw_dataset_id,
+            "model_name": row.model_name
+        }
+
+    # Alpaca 格式：優先使用原始資料集的指令與輸入，原始資料已不存在時退回合併後的輸入
+    record = {
+        "instruction": row.instruction if row.instruction is not None else row.original_input,
+        "input": row.input or "",
+        "output": row.final_output
+    }
+    if row.system:
+        record["system"] = row.system
+    if row.history:
+        record["history"] = row.history
+    return record
+
+def _stream_final_datasets(export_format: str, compress: bool):
+    # 串流期間需要自己的 Session：get_db 會在回應開始傳送前就關閉
+    db = SessionLocal()
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31：gzip 格式
+    try:
+        for row in crud.iter_final_datasets_for_export(db):
+            line = (json.dumps(_final_dataset_export_record(row, export_format), ensure_ascii=False) + "\n").encode("utf-8")
+            if compressor:
+                line = compressor.compress(line)
+                if not line:
+                    continue
+            yield line
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+@router.get("/final/export")
+def export_final_datasets(
+    export_format: str = Query("alpaca", alias="format", pattern="^(alpaca|raw)$"),
+    gzip: bool = False,
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Stream all final datasets as NDJSON, one record per line.
+    `format=alpaca` emits instruction/input/output records; `format=raw` emits the stored
+    original_input/final_output. Set `gzip=true` to receive a gzip-compressed file.
+    Only accessible by admin users.
+    """
+    filename = "final_dataset.jsonl.gz" if gzip else "final_dataset.jsonl"
+    return StreamingResponse(
+        _stream_final_datasets(export_format, gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.delete("/final", response_model=dict)
 def delete_all_final_datasets(
     db: Session = Depends(get_db),
@@ -309,13 +385,13 @@ def delete_raw_dataset(
 @router.post("/{dataset_id}/regenerate", status_code=status.HTTP_202_ACCEPTED)
 def manual_regenerate_dataset(
     dataset_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     admin_user: models.User = Depends(get_current_admin_user),
     model_name: str = None  # 新增：可選的模型參數
 ):
     """
     Manually trigger regeneration for a dataset.
+    The dataset is added to the regeneration queue and processed by the background workers.
     Only accessible by admin users.
     """
     # Check if dataset exists
@@ -330,12 +406,13 @@ def manual_regenerate_dataset(
             detail="Dataset is already being regenerated"
         )
     
-    # Add regeneration task to background with model parameter
-    background_tasks.add_task(regenerate_dataset, db, dataset_id, model_name)
+    # Add the dataset to the regeneration queue with model parameter
+    task = crud.enqueue_regeneration(db, dataset_id, model_name)
     
     return {
         "message": f"Regeneration started for dataset {dataset_id}",
         "dataset_id": dataset_id,
+        "task_id": task.id,
         "status": "regenerating"
     }
 
@@ -355,23 +432,17 @@ def create_batch_datasets(
             detail="No datasets provided"
         )
     
-    if len(datasets) > 100:  # Limit batch size
+    if len(datasets) > MAX_BATCH_CREATE_SIZE:  # Limit batch size
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="Batch size cannot exceed 100 datasets"
+            detail=f"Batch size cannot exceed {MAX_BATCH_CREATE_SIZE} datasets"
         )
     
-    created_datasets = []
-    for dataset in datasets:
-        try:
-            created_dataset = crud.create_raw_dataset(db=db, dataset=dataset)
-            created_datasets.append(created_dataset)
-        except Exception as e:
-            # Rollback on error
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to create dataset: {str(e)}"
-            )
-    
-    return created_datasets
+    try:
+        # 整批在同一個交易中寫入，失敗時不會留下部分資料
+        return crud.bulk_create_raw_datasets(db=db, datasets=datasets)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create datasets: {str(e)}"
+        )
@@ -0,0 +1,177 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.config import settings
+from app.database import models
+from app.database.base import AsyncSessionLocal, get_async_db
+from app.api.v1.auth import get_current_admin_user
+from app.api.v1.sse import SSE_HEADERS, sse_event
+from app.services.dataset_generation import load_batch_articles, resolve_generation_target, select_batch_articles
+from app.services.generation_jobs import generation_job_runner
+
+router = APIRouter()
+
+# 單一生成工作的項目上限
+MAX_GENERATION_JOB_SIZE = 5000
+
+# 串流閒置時送出註解保持連線的間隔秒數
+SSE_KEEPALIVE_SECONDS = 15.0
+
+_FINISHED_STATUSES = {
+    models.GenerationJobStatus.COMPLETED,
+    models.GenerationJobStatus.CANCELLED,
+    models.GenerationJobStatus.FAILED,
+}
+
+
+async def _get_job_or_404(db: AsyncSession, job_id: int) -> models.GenerationJob:
+    job = await crud.get_generation_job_async(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return job
+
+
+@router.post("/", response_model=schemas.GenerationJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+    request: schemas.BatchGenerateFromRegulationsRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Submit a batch generation job and return immediately.
+    Items are generated in the background and saved as they finish; follow
+    progress via GET /{job_id}/events or fetch results via GET /{job_id}/items.
+    Only accessible by admin users.
+    """
+    if request.batch_size < 1 or request.batch_size > MAX_GENERATION_JOB_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch size must be between 1 and {MAX_GENERATION_JOB_SIZE}"
+        )
+
+    _, model_name = await resolve_generation_target(db, request.model_name)
+    all_articles = await load_batch_articles(db, request.selected_article_ids, request.random_selection)
+    if not all_articles:
+        raise HTTPException(status_code=400, detail="請選擇至少一個法規條文")
+
+    article_selections = select_batch_articles(all_articles, request.batch_size, request.random_selection)
+    job = await crud.create_generation_job_async(
+        db, model_name=model_name, article_selections=article_selections, created_by=admin_user.id,
+        bypass_cache=request.bypass_cache
+    )
+    generation_job_runner.start(job.id)
+    return job
+
+
+@router.get("/{job_id}", response_model=schemas.GenerationJob)
+async def read_generation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    return await _get_job_or_404(db, job_id)
+
+
+@router.get("/{job_id}/items", response_model=schemas.GenerationJobItemPage)
+async def read_generation_job_items(
+    job_id: int,
+    after_index: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    finished_only: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Retrieve the job's items ordered by their position in the batch, including
+    partial results while the job is still running. Set `finished_only=true`
+    to skip items that have not been generated yet.
+    """
+    await _get_job_or_404(db, job_id)
+    return await crud.get_generation_job_items_async(
+        db, job_id, after_index=after_index, limit=limit, finished_only=finished_only
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.GenerationJob)
+async def cancel_generation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Cancel a job. Items already generated are kept; the remaining ones are marked cancelled.
+    """
+    await _get_job_or_404(db, job_id)
+    job = await crud.cancel_generation_job_async(db, job_id)
+    generation_job_runner.cancel(job_id)
+    return job
+
+
+async def _stream_job_events(job_id: int, after_sequence: int, poll_interval: float):
+    # 串流期間需要自己的 Session：依賴注入的 Session 會在回應開始傳送前就關閉
+    last_progress = None
+    idle_seconds = 0.0
+    while True:
+        async with AsyncSessionLocal() as db:
+            job = await crud.get_generation_job_async(db, job_id)
+            if job is None:
+                return
+            finished = job.status in _FINISHED_STATUSES
+            items = await crud.get_generation_job_items_after_sequence_async(db, job_id, after_sequence)
+        job_data = schemas.GenerationJob.model_validate(job).model_dump(mode="json")
+
+        for item in items:
+            after_sequence = item.sequence
+            yield sse_event(
+                "item",
+                schemas.GenerationJobItem.model_validate(item).model_dump(mode="json"),
+                event_id=item.sequence
+            )
+
+        progress = (job_data["status"], job_data["completed_items"], job_data["failed_items"])
+        if progress != last_progress:
+            last_progress = progress
+            idle_seconds = 0.0
+            yield sse_event("progress", job_data, event_id=after_sequence)
+
+        if items:
+            # 可能還有更多已完成的項目，立即再查一次
+            continue
+        if finished:
+            yield sse_event("done", job_data, event_id=after_sequence)
+            return
+
+        await asyncio.sleep(poll_interval)
+        idle_seconds += poll_interval
+        if idle_seconds >= SSE_KEEPALIVE_SECONDS:
+            idle_seconds = 0.0
+            yield ": keep-alive\n\n"
+
+
+@router.get("/{job_id}/events")
+async def stream_generation_job_events(
+    job_id: int,
+    after_sequence: int = Query(0, ge=0),
+    last_event_id: Optional[int] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Stream job progress as Server-Sent Events.
+    `item` events carry each finished item in completion order, `progress` events the
+    job counters and `done` is sent once the job has finished. Reconnecting clients
+    resume after the `Last-Event-ID` header (or `after_sequence`).
+    """
+    await _get_job_or_404(db, job_id)
+    if last_event_id is not None:
+        after_sequence = max(after_sequence, last_event_id)
+    return StreamingResponse(
+        _stream_job_events(job_id, after_sequence, settings.generation_job_poll_interval_seconds),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -1,12 +1,14 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
 from app.database import models
 from app.database.base import get_db
 from app.api.v1.auth import get_current_admin_user
+from app.services.legal_article_import import iter_legal_articles
 
 router = APIRouter()
 
@@ -23,6 +25,24 @@ def create_articles(
     """
     return crud.create_legal_articles(db=db, articles=articles)
 
+@router.post("/import", response_model=schemas.LegalArticleImportResult)
+def import_articles(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Import legal articles from an uploaded JSON array or JSONL file.
+    The file is parsed as a stream and upserted in chunks keyed on (title, number),
+    so re-importing a law updates its articles instead of duplicating them.
+    Only accessible by admin users.
+    """
+    try:
+        ids = crud.upsert_legal_articles(db, iter_legal_articles(file.file, file.filename or ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"法規條文檔案格式錯誤: {str(e)}")
+    return schemas.LegalArticleImportResult(imported_count=len(ids), ids=ids)
+
 @router.get("/", response_model=List[schemas.LegalArticle])
 def read_articles(
     skip: int = 0,
@@ -61,7 +81,11 @@ def update_article(
     """
     Update a legal article.
     """
-    db_article = crud.update_legal_article(db, article_id=article_id, article_update=article)
+    try:
+        db_article = crud.update_legal_article(db, article_id=article_id, article_update=article)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="已存在相同法規名稱與條號的條文")
     if db_article is None:
         raise HTTPException(status_code=404, detail="Article not found")
     return db_article
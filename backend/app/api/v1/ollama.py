@@ -9,6 +9,10 @@ from app import crud, schemas
 from app.database import models
 from app.database.base import get_db
 from app.api.v1.auth import get_current_admin_user
+from app.services.http_clients import ollama_http_clients
+from app.services.generation_cache import generation_cache
+from app.services.model_warmup import model_warmup
+from app.services.ollama_pool import ollama_pool, parse_endpoints, primary_endpoint_url
 
 router = APIRouter()
 
@@ -22,9 +26,20 @@ async def get_ollama_url(db: Session = Depends(get_db)):
         return env_url
     
     ollama_url_setting = crud.get_setting(db, "ollama_url")
-    if not ollama_url_setting or not ollama_url_setting.value:
+    # 設定多個端點時，模型列表與下載使用第一個端點
+    ollama_url = primary_endpoint_url(ollama_url_setting.value) if ollama_url_setting else None
+    if not ollama_url:
         raise HTTPException(status_code=500, detail="Ollama URL is not configured in settings or environment variables.")
-    return ollama_url_setting.value
+    return ollama_url
+
+def _configured_ollama_urls(db: Session) -> set:
+    """設定（含環境變數）中的 Ollama 端點，只有這些端點使用共用的連線池"""
+    ollama_url_setting = crud.get_setting(db, "ollama_url")
+    urls = {endpoint.url.rstrip("/") for endpoint in parse_endpoints(ollama_url_setting.value if ollama_url_setting else None)}
+    env_url = os.environ.get("OLLAMA_BASE_URL")
+    if env_url:
+        urls.add(env_url.rstrip("/"))
+    return urls
 
 @router.post("/test")
 async def test_ollama_connection(
@@ -40,17 +55,22 @@ async def test_ollama_connection(
         if not test_request.url.startswith(('http://', 'https://')):
             raise HTTPException(status_code=400, detail="URL must start with http:// or https://")
         
-        async with httpx.AsyncClient() as client:
-            # 測試 Ollama 版本端點
-            response = await client.get(f"{test_request.url}/api/version", timeout=10.0)
-            response.raise_for_status()
-            
-            version_data = response.json()
-            return {
-                "status": "success", 
-                "message": "連線成功！", 
-                "version": version_data.get("version", "未知版本")
-            }
+        url = test_request.url.rstrip("/")
+        # 測試 Ollama 版本端點
+        if url in _configured_ollama_urls(db):
+            response = await ollama_http_clients.get(url).get("/api/version", timeout=10.0)
+        else:
+            # 尚未設定的網址用完即關閉，不留在共用的連線池登錄中
+            async with httpx.AsyncClient(base_url=url, timeout=10.0) as client:
+                response = await client.get("/api/version")
+        response.raise_for_status()
+        
+        version_data = response.json()
+        return {
+            "status": "success", 
+            "message": "連線成功！", 
+            "version": version_data.get("version", "未知版本")
+        }
     except httpx.ConnectError as e:
         raise HTTPException(status_code=400, detail=f"無法連接到 Ollama 服務: {str(e)}")
     except httpx.TimeoutException as e:
@@ -70,16 +90,72 @@ async def get_ollama_models(
     Get a list of local models from the configured Ollama instance.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{ollama_url}/api/tags", timeout=10.0)
-            response.raise_for_status()
-            models_data = response.json()
-            return models_data.get("models", [])
+        client = ollama_http_clients.get(ollama_url)
+        response = await client.get("/api/tags", timeout=10.0)
+        response.raise_for_status()
+        models_data = response.json()
+        return models_data.get("models", [])
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"無法從 Ollama 獲取模型列表: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"獲取模型列表時發生錯誤: {str(e)}")
 
+@router.get("/endpoints")
+async def get_ollama_endpoints(
+    probe: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Get the configured Ollama endpoints with their health, load and available models.
+    Set `probe=true` to run a health check (`/api/tags`) on every endpoint first.
+    """
+    ollama_url_setting = crud.get_setting(db, "ollama_url")
+    ollama_pool.configure(parse_endpoints(ollama_url_setting.value if ollama_url_setting else None))
+    if probe:
+        await ollama_pool.probe_all()
+    return ollama_pool.status()
+
+@router.get("/warmup")
+def get_model_warmup_report(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Get the result of the most recent model warm-up: per endpoint and model,
+    whether it was loaded (with its load time) or unloaded, or the error.
+    """
+    return model_warmup.last_report or {"results": []}
+
+@router.post("/warmup")
+async def warm_up_models(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Load every model in `ollama_models` now and return the measured load times.
+    """
+    return await model_warmup.run()
+
+@router.get("/cache")
+def get_generation_cache_stats(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Get generation cache statistics: hit/miss counters of this process, entry count and size.
+    """
+    return generation_cache.stats()
+
+@router.delete("/cache")
+def clear_generation_cache(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Remove all cached generation results.
+    """
+    if not generation_cache.enabled:
+        return {"message": "Generation cache is disabled", "deleted_count": 0}
+    count = generation_cache.clear()
+    return {"message": f"Successfully deleted {count} cached results", "deleted_count": count}
+
 @router.post("/pull")
 async def pull_ollama_model(
     pull_request: schemas.OllamaPullRequest,
@@ -100,17 +176,17 @@ async def pull_ollama_model(
             json_payload = json.dumps(payload)
             headers = {'Content-Type': 'application/json'}
 
-            async with httpx.AsyncClient() as client:
-                async with client.stream(
-                    method="POST", 
-                    url=f"{url}/api/pull", 
-                    content=json_payload, 
-                    headers=headers, 
-                    timeout=None
-                ) as response:
-                    response.raise_for_status()
-                    async for chunk in response.aiter_bytes():
-                        yield chunk
+            client = ollama_http_clients.get(url)
+            async with client.stream(
+                method="POST", 
+                url="/api/pull", 
+                content=json_payload, 
+                headers=headers, 
+                timeout=None
+            ) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    yield chunk
         except httpx.RequestError as e:
             error_message = json.dumps({
                 "status": "error", 
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
 from app.database import base
@@ -15,9 +15,14 @@ def get_db():
         db.close()
 
 @router.get("/", response_model=List[schemas.RawDataset])
-def read_raw_datasets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    raw_datasets = crud.get_raw_datasets(db, skip=skip, limit=limit)
-    return raw_datasets
+def read_raw_datasets(
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    include_history: bool = False,
+    db: Session = Depends(get_db)
+):
+    raw_datasets = crud.get_raw_datasets(db, after_id=after_id, limit=limit, include_history=include_history)
+    return raw_datasets.items
 
 @router.put("/{dataset_id}", response_model=schemas.RawDataset)
 def update_raw_dataset(dataset_id: int, dataset: schemas.RawDatasetUpdate, db: Session = Depends(get_db)):
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.database import models
+from app.database.base import get_async_db
+from app.api.v1.auth import get_current_admin_user
+from app.config import settings
+from app.services.regeneration import plan_regeneration_models
+
+router = APIRouter()
+
+# 單一批次最多排入佇列的資料集數
+MAX_SWEEP_SIZE = 5000
+
+_REVIEW_STATUSES = {status.value for status in models.ReviewStatus} - {models.ReviewStatus.REGENERATING.value}
+
+
+def _validate_sweep_request(request: schemas.RegenerationSweepCreate) -> None:
+    if request.limit < 1 or request.limit > MAX_SWEEP_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Limit must be between 1 and {MAX_SWEEP_SIZE}"
+        )
+    # 批次的工作由重新生成 worker 執行，同時執行的數量不可能超過 worker 數
+    if request.max_concurrency < 1 or request.max_concurrency > settings.regeneration_workers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"max_concurrency must be between 1 and {settings.regeneration_workers} (REGENERATION_WORKERS)"
+        )
+    invalid_statuses = set(request.filters.review_status or []) - _REVIEW_STATUSES
+    if invalid_statuses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid review status: {', '.join(sorted(invalid_statuses))}"
+        )
+    if request.model_weights is not None:
+        if any(weight < 0 for weight in request.model_weights.values()):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Model weights must not be negative")
+        if not any(weight > 0 for weight in request.model_weights.values()):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one model weight must be positive")
+
+
+@router.post("/", response_model=schemas.RegenerationSweep, status_code=status.HTTP_202_ACCEPTED)
+async def create_regeneration_sweep(
+    request: schemas.RegenerationSweepCreate,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Queue every dataset matching the filters for regeneration in one call.
+    Models are assigned according to `model_weights`, and at most `max_concurrency`
+    items of the sweep regenerate at the same time. Datasets already being
+    regenerated are skipped. Follow progress via GET /{sweep_id}.
+    Only accessible by admin users.
+    """
+    _validate_sweep_request(request)
+    candidates = await crud.get_regeneration_candidates_async(db, request.filters, request.limit)
+    if not candidates:
+        raise HTTPException(status_code=404, detail="No datasets match the filters")
+
+    sweep = await crud.create_regeneration_sweep_async(
+        db,
+        filters=request.filters,
+        candidates=candidates,
+        model_plan=plan_regeneration_models(request.model_weights, len(candidates)),
+        model_weights=request.model_weights,
+        max_concurrency=request.max_concurrency,
+        created_by=admin_user.id
+    )
+    return await crud.get_regeneration_sweep_async(db, sweep.id)
+
+
+@router.get("/{sweep_id}", response_model=schemas.RegenerationSweep)
+async def read_regeneration_sweep(
+    sweep_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Report the sweep's progress: task counts per status and per model, the
+    aggregate throughput in items per minute and the estimated time remaining.
+    """
+    sweep = await crud.get_regeneration_sweep_async(db, sweep_id)
+    if sweep is None:
+        raise HTTPException(status_code=404, detail="Regeneration sweep not found")
+    return sweep
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -6,7 +6,7 @@ from app import crud, schemas
 from app.database import models
 from app.database.base import get_db
 from app.api.v1.auth import get_current_user
-from app.services.regeneration import regenerate_dataset
+from app.stats_cache import stats_cache
 
 router = APIRouter()
 
@@ -91,7 +91,6 @@ def _extract_value(value):
 def submit_review(
     dataset_id: int,
     review: schemas.ReviewCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -117,15 +116,15 @@ def submit_review(
         review=review
     )
 
-    # Get review statistics from ReviewLog table
-    review_stats = crud.get_dataset_review_stats(db, dataset_id)
+    # create_review_log has already incremented the counters on the dataset
+    db.refresh(dataset)
     
     # Check approval threshold and move to final dataset if met
     if review.result.upper() == "ACCEPT":
         approval_threshold_setting = crud.get_setting(db, "approval_threshold")
         approval_threshold = _extract_value(approval_threshold_setting.value) if approval_threshold_setting else 2
         
-        if review_stats["accept_count"] >= approval_threshold:
+        if dataset.accept_count >= approval_threshold:
             print(f"Dataset {dataset.id} has reached the approval threshold. Moving to final dataset.")
             # Move to final dataset
             # Create a comprehensive input that includes instruction and input
@@ -152,6 +151,7 @@ def submit_review(
             db.add(final_dataset)
             dataset.review_status = "accepted"
             db.commit()
+            stats_cache.invalidate()
             print(f"Dataset {dataset.id} has been moved to final dataset.")
     
     # Trigger auto-regeneration if rejection threshold is met
@@ -160,8 +160,8 @@ def submit_review(
         # Use a default if not set, although init_db should handle it
         rejection_threshold = _extract_value(rejection_threshold_setting.value) if rejection_threshold_setting else 3
 
-        if review_stats["reject_count"] >= rejection_threshold:
-            print(f"Dataset {dataset.id} has reached the rejection threshold. Adding regeneration task to background.")
-            background_tasks.add_task(regenerate_dataset, db, dataset.id, None)  # 自動重新生成時隨機選擇模型
+        if dataset.reject_count >= rejection_threshold:
+            print(f"Dataset {dataset.id} has reached the rejection threshold. Adding it to the regeneration queue.")
+            crud.enqueue_regeneration(db, dataset.id, None)  # 自動重新生成時隨機選擇模型
             
     return review_log 
\ No newline at end of file
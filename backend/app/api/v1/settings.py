@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -6,6 +6,9 @@ from app import crud, schemas
 from app.database import models
 from app.database.base import get_db
 from app.api.v1.auth import get_current_admin_user
+from app.config import settings as app_settings
+from app.services.model_warmup import model_warmup
+from app.services.ollama_pool import ollama_pool, parse_endpoints
 
 router = APIRouter()
 
@@ -37,18 +40,35 @@ def read_settings(
         approval_threshold=settings_map.get("approval_threshold"),
         ollama_models=settings_map.get("ollama_models", []),  # 修改：支援多模型列表
         ollama_url=settings_map.get("ollama_url"),
+        ollama_model_concurrency=settings_map.get("ollama_model_concurrency") or {},
+        ollama_model_keep_alive=settings_map.get("ollama_model_keep_alive") or {},
     )
 
 @router.put("/", response_model=schemas.AllSettings)
 def update_settings(
     settings_in: schemas.SystemSettingsUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     admin_user: models.User = Depends(get_current_admin_user)
 ):
     """
     Update system settings.
+    When `ollama_models` changes, the configured models are loaded in the background
+    and, if OLLAMA_UNLOAD_REMOVED_MODELS is enabled, models removed from the list are unloaded.
     """
+    models_setting = crud.get_setting(db, "ollama_models")
+    previous_models = list(_extract_value(models_setting.value) or []) if models_setting else []
+
     crud.update_settings(db, settings_in.settings)
+    if "ollama_url" in settings_in.settings:
+        ollama_pool.configure(parse_endpoints(settings_in.settings["ollama_url"]))
+
+    new_models = settings_in.settings.get("ollama_models")
+    if app_settings.ollama_warmup_enabled and new_models is not None and list(new_models) != previous_models:
+        removed = [name for name in previous_models if name not in new_models]
+        background_tasks.add_task(
+            model_warmup.run_safely, removed if app_settings.ollama_unload_removed_models else []
+        )
     
     # After updating, fetch them all to return the updated state
     updated_settings_db = crud.get_all_settings(db)
@@ -59,4 +79,6 @@ def update_settings(
         approval_threshold=settings_map.get("approval_threshold"),
         ollama_models=settings_map.get("ollama_models", []),  # 修改：支援多模型列表
         ollama_url=settings_map.get("ollama_url"),
+        ollama_model_concurrency=settings_map.get("ollama_model_concurrency") or {},
+        ollama_model_keep_alive=settings_map.get("ollama_model_keep_alive") or {},
     ) 
\ No newline at end of file
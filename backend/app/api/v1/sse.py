@@ -0,0 +1,15 @@
+import json
+from typing import Any, Optional
+
+# 避免瀏覽器與反向代理（如 nginx）快取或緩衝事件串流
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """將一筆事件格式化為 Server-Sent Events 格式"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
@@ -5,6 +5,7 @@ from app import crud, schemas
 from app.database import models
 from app.database.base import get_db
 from app.api.v1.auth import get_current_user, get_current_admin_user
+from app.stats_cache import stats_cache
 
 router = APIRouter()
 
@@ -13,7 +14,7 @@ def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    try:
+    def compute_dashboard_stats():
         if current_user.role == models.UserRole.ADMIN:
             global_stats = crud.get_global_stats(db)
             review_activity = crud.get_review_activity(db, days=30)
@@ -34,6 +35,15 @@ def get_dashboard_stats(
             common_rejection_reasons=common_rejection_reasons,
             model_stats=model_stats  # 新增：模型統計
         )
+
+    # 管理員共用同一份統計，專家則依使用者區分
+    if current_user.role == models.UserRole.ADMIN:
+        cache_key = ("dashboard", "admin")
+    else:
+        cache_key = ("dashboard", "user", current_user.id)
+
+    try:
+        return stats_cache.get_or_compute(cache_key, compute_dashboard_stats)
     except Exception as e:
         print(f"Error in get_dashboard_stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -48,8 +58,7 @@ def get_model_statistics(
     僅管理員可訪問
     """
     try:
-        model_stats = crud.get_model_stats(db)
-        return model_stats
+        return stats_cache.get_or_compute(("models",), lambda: crud.get_model_stats(db))
     except Exception as e:
         print(f"Error in get_model_statistics: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -7,6 +7,68 @@ class Settings(BaseSettings):
     ollama_model: str = "qwen3:1.7b"
     ollama_url: str = "http://host.docker.internal:11434"
 
+    # Database engine settings
+    # SQLite（WAL 模式）
+    sqlite_busy_timeout_ms: int = 30000
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456  # 256 MiB
+    sqlite_cache_size_kib: int = 65536  # 64 MiB
+    # 其他資料庫（PostgreSQL 等）的連線池
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+
+    # Ollama HTTP 連線池（依主機共用）
+    ollama_timeout_seconds: float = 300.0
+    ollama_max_connections: int = 20
+    ollama_max_keepalive_connections: int = 10
+    ollama_keepalive_expiry_seconds: float = 60.0
+    ollama_http2: bool = False  # 僅對 https 端點有效，需安裝 h2
+    # 每個模型同時進行的生成請求數，可用系統設定 ollama_model_concurrency 逐模型覆寫
+    ollama_default_concurrency: int = 2
+    # 模型閒置多久後由 Ollama 卸載（Ollama 預設 5m），可用系統設定 ollama_model_keep_alive 逐模型覆寫
+    ollama_keep_alive: str = "30m"
+    # 啟動時與 ollama_models 設定變更後預先載入模型；是否卸載從列表移除的模型以釋放記憶體
+    ollama_warmup_enabled: bool = True
+    ollama_unload_removed_models: bool = False
+
+    # Ollama 生成結果的磁碟快取（預設關閉，適合 temperature 0 的重複評估）
+    generation_cache_enabled: bool = False
+    generation_cache_path: str = "./data/generation_cache.db"
+    generation_cache_max_bytes: int = 268435456  # 256 MiB
+    generation_cache_ttl_seconds: float = 604800.0  # 7 天，0 表示不過期
+
+    # 連線錯誤、逾時與 5xx 的重試次數，等待時間以指數成長（加上隨機抖動）
+    ollama_max_retries: int = 2
+    ollama_retry_backoff_seconds: float = 1.0
+    ollama_retry_backoff_max_seconds: float = 10.0
+
+    # 每個 Ollama 端點的斷路器與健康檢查：連續失敗達門檻即暫停送出請求，期滿後放行一個試探請求
+    ollama_endpoint_failure_threshold: int = 3
+    ollama_endpoint_eject_seconds: float = 30.0
+    ollama_health_check_interval_seconds: float = 15.0
+    ollama_health_check_timeout_seconds: float = 5.0
+
+    # 重新生成佇列：worker 數、沒有工作時查詢佇列的間隔，以及失敗重試（等待時間以指數成長）
+    regeneration_workers: int = 2
+    regeneration_poll_interval_seconds: float = 2.0
+    regeneration_max_attempts: int = 3
+    regeneration_retry_delay_seconds: float = 30.0
+    regeneration_retry_delay_max_seconds: float = 600.0
+    # 執行中的工作每隔 heartbeat 秒更新心跳，超過 stale 秒未更新即視為中斷並重新排入佇列
+    regeneration_heartbeat_interval_seconds: float = 30.0
+    regeneration_stale_after_seconds: float = 300.0
+
+    # 生成工作進度串流（SSE）查詢資料庫的間隔秒數
+    generation_job_poll_interval_seconds: float = 1.0
+
+    # 儀表板統計快取的最長存活秒數（0 表示停用快取）
+    stats_cache_max_staleness_seconds: float = 30.0
+
+    # 應用程式日誌等級（DEBUG 會記錄完整的 Ollama 回應內容）
+    log_level: str = "INFO"
+
     # JWT settings
     secret_key: str = "a_very_secret_key_that_should_be_in_env_file"
     refresh_secret_key: str = "a_different_very_secret_key_for_refresh"
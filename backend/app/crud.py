@@ -1,11 +1,17 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, Date
-from typing import List
-from datetime import datetime, timedelta
+from sqlalchemy.orm import Session, defer, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, delete, exists, insert, literal, or_, select, update, Date
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Iterable, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
 
 from app import schemas
 from app.database import models
+from app.config import settings as app_settings
 from app.security import get_password_hash
+from app.stats_cache import stats_cache
 
 # --- User CRUD ---
 
@@ -54,31 +60,80 @@ def delete_user(db: Session, user_id: int):
         
     db.delete(db_user)
     db.commit()
+    stats_cache.invalidate()
     return db_user
 
+# --- Bulk Maintenance ---
+
+# 大量更新／刪除時每個交易處理的列數，避免 SQLite 在大表上長時間持有寫入鎖
+BULK_MAINTENANCE_CHUNK_SIZE = 5000
+
+def _execute_in_id_chunks(db: Session, id_column, build_statement, chunk_size: Optional[int] = None) -> int:
+    """
+    依 id 以 keyset 分批執行集合式 UPDATE／DELETE，每批各自 commit，回傳語句回報的總影響列數。
+    build_statement 接收該批的範圍條件並回傳要執行的語句；中途失敗時已 commit 的批次會保留。
+    """
+    chunk_size = chunk_size or BULK_MAINTENANCE_CHUNK_SIZE
+    total = 0
+    last_id = None
+    while True:
+        lower = id_column > last_id if last_id is not None else id_column.is_not(None)
+        # 本批最後一個 id；剩餘不足一批時為 None，直接處理到最後
+        upper_id = db.execute(
+            select(id_column).where(lower).order_by(id_column).offset(chunk_size - 1).limit(1)
+        ).scalar()
+        condition = lower if upper_id is None else lower & (id_column <= upper_id)
+        total += db.execute(
+            build_statement(condition).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if upper_id is None:
+            return total
+        last_id = upper_id
+
 # --- Dataset CRUD ---
 
 def get_raw_dataset(db: Session, dataset_id: int):
     return db.query(models.RawDataset).filter(models.RawDataset.id == dataset_id).first()
 
-def get_raw_datasets(db: Session, skip: int = 0, limit: int = 100):
-    datasets = (
+def get_raw_datasets(
+    db: Session,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    include_history: bool = False
+) -> schemas.RawDatasetPage:
+    """
+    以 keyset（after_id）分頁取得待審核資料集，審核統計直接讀取資料集上的計數欄位。
+    history 只在 include_history 時讀取，否則不查詢該欄位並回傳 None。
+    """
+    query = (
         db.query(models.RawDataset)
-        .options(joinedload(models.RawDataset.review_logs))
+        .options(selectinload(models.RawDataset.review_logs))
         .filter(models.RawDataset.review_status.in_(['pending', 'reviewing', 'regenerating']))
-        .order_by(models.RawDataset.id)
-        .offset(skip)
-        .limit(10000)
-        .all()
     )
-    
-    # Add calculated review stats to each dataset
-    for dataset in datasets:
-        stats = get_dataset_review_stats(db, dataset.id)
-        dataset.accept_count = stats["accept_count"]
-        dataset.reject_count = stats["reject_count"]
-    
-    return datasets
+    if not include_history:
+        query = query.options(defer(models.RawDataset.history))
+    if after_id is not None:
+        query = query.filter(models.RawDataset.id > after_id)
+
+    # 多取一筆用來判斷是否還有下一頁
+    datasets = query.order_by(models.RawDataset.id).limit(limit + 1).all()
+    has_more = len(datasets) > limit
+    datasets = datasets[:limit]
+    if not include_history:
+        # 直接建立回應，避免序列化時逐筆延遲載入被略過的欄位；ORM 物件維持原狀
+        fields = set(schemas.RawDatasetWithStats.model_fields) - {"history"}
+        datasets = [
+            schemas.RawDatasetWithStats.model_validate(
+                {**{name: getattr(dataset, name) for name in fields}, "history": None}, from_attributes=True
+            )
+            for dataset in datasets
+        ]
+
+    return schemas.RawDatasetPage(
+        items=datasets,
+        next_cursor=datasets[-1].id if has_more else None
+    )
 
 def update_raw_dataset(db: Session, dataset_id: int, dataset_update: schemas.RawDatasetUpdate):
     db_dataset = get_raw_dataset(db, dataset_id)
@@ -90,6 +145,7 @@ def update_raw_dataset(db: Session, dataset_id: int, dataset_update: schemas.Raw
         setattr(db_dataset, key, value)
 
     db.commit()
+    stats_cache.invalidate()
     db.refresh(db_dataset)
     return db_dataset
 
@@ -100,6 +156,7 @@ def delete_raw_dataset(db: Session, dataset_id: int):
     
     db.delete(db_dataset)
     db.commit()
+    stats_cache.invalidate()
     return db_dataset
 
 def create_raw_dataset(db: Session, dataset: schemas.RawDatasetCreate):
@@ -114,12 +171,65 @@ def create_raw_dataset(db: Session, dataset: schemas.RawDatasetCreate):
     )
     db.add(db_dataset)
     db.commit()
+    stats_cache.invalidate()
     db.refresh(db_dataset)
     return db_dataset
 
+def bulk_create_raw_datasets(db: Session, datasets: List[schemas.RawDatasetCreate]) -> List[models.RawDataset]:
+    """在單一交易中以 executemany + RETURNING 批次新增資料集，失敗時整批回滾"""
+    if not datasets:
+        return []
+
+    rows = [
+        {
+            "instruction": dataset.instruction,
+            "input": dataset.input,
+            "output": dataset.output,
+            "system": dataset.system,
+            "source": dataset.source,
+            "history": dataset.history,
+            "model_name": dataset.model_name
+        }
+        for dataset in datasets
+    ]
+    try:
+        created = db.scalars(
+            insert(models.RawDataset).returning(models.RawDataset, sort_by_parameter_order=True),
+            rows
+        ).all()
+        db.commit()
+        stats_cache.invalidate()
+    except Exception:
+        db.rollback()
+        raise
+    return created
+
 def get_final_datasets(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.FinalDataset).offset(skip).limit(10000).all()
 
+def iter_final_datasets_for_export(db: Session, batch_size: int = 1000):
+    """
+    逐批串流最終資料集（連同原始資料集的指令欄位），使用 yield_per / 伺服器端游標，
+    記憶體用量與資料量無關。
+    """
+    stmt = (
+        select(
+            models.FinalDataset.id,
+            models.FinalDataset.original_input,
+            models.FinalDataset.final_output,
+            models.FinalDataset.raw_dataset_id,
+            models.FinalDataset.model_name,
+            models.RawDataset.instruction,
+            models.RawDataset.input,
+            models.RawDataset.system,
+            models.RawDataset.history
+        )
+        .outerjoin(models.RawDataset, models.RawDataset.id == models.FinalDataset.raw_dataset_id)
+        .order_by(models.FinalDataset.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(stmt)
+
 def get_final_dataset(db: Session, dataset_id: int):
     return db.query(models.FinalDataset).filter(models.FinalDataset.id == dataset_id).first()
 
@@ -130,13 +240,15 @@ def delete_final_dataset(db: Session, dataset_id: int):
     
     db.delete(db_dataset)
     db.commit()
+    stats_cache.invalidate()
     return db_dataset
 
-def delete_all_final_datasets(db: Session):
-    """刪除所有最終資料集"""
-    count = db.query(models.FinalDataset).count()
-    db.query(models.FinalDataset).delete()
-    db.commit()
+def delete_all_final_datasets(db: Session) -> int:
+    """分批刪除所有最終資料集，回傳刪除的筆數"""
+    count = _execute_in_id_chunks(
+        db, models.FinalDataset.id, lambda condition: delete(models.FinalDataset).where(condition)
+    )
+    stats_cache.invalidate()
     return count
 
 # --- ReviewLog CRUD ---
@@ -158,7 +270,20 @@ def create_review_log(db: Session, dataset_id: int, reviewer_id: int, review: sc
         db_review_log.rejection_reasons.extend(reasons)
 
     db.add(db_review_log)
+
+    # 在同一個交易中以 SQL 層級的遞增更新計數，避免並行審核時遺失更新
+    counter = {
+        'ACCEPT': models.RawDataset.accept_count,
+        'REJECT': models.RawDataset.reject_count
+    }.get(db_review_log.result)
+    if counter is not None:
+        db.query(models.RawDataset).filter(models.RawDataset.id == dataset_id).update(
+            {counter: func.coalesce(counter, 0) + 1},
+            synchronize_session=False
+        )
+
     db.commit()
+    stats_cache.invalidate()
     db.refresh(db_review_log)
     return db_review_log
 
@@ -205,6 +330,29 @@ def get_dataset_review_stats(db: Session, dataset_id: int) -> dict:
         "total_reviews": accept_count + reject_count
     }
 
+def rebuild_review_counters(db: Session) -> int:
+    """依 ReviewLog 重新計算所有 RawDataset 的 accept_count / reject_count，回傳更新筆數"""
+    def count_for(result: str):
+        return (
+            db.query(func.count(models.ReviewLog.id))
+            .filter(
+                models.ReviewLog.dataset_id == models.RawDataset.id,
+                models.ReviewLog.result == result
+            )
+            .scalar_subquery()
+        )
+
+    updated = db.query(models.RawDataset).update(
+        {
+            models.RawDataset.accept_count: count_for('ACCEPT'),
+            models.RawDataset.reject_count: count_for('REJECT')
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    stats_cache.invalidate()
+    return updated
+
 # --- System Settings CRUD ---
 
 def get_setting(db: Session, key: str):
@@ -386,131 +534,172 @@ def get_user_rejection_reasons(db: Session, user_id: int, limit: int = 5) -> lis
     return [schemas.CommonRejectionReason(reason=r.comment, count=r.count) for r in results]
 
 def get_model_stats(db: Session) -> list[schemas.ModelStats]:
-    """獲取按模型分類的統計數據"""
-    # 從所有相關表獲取模型名稱（RawDataset, FinalDataset, ReviewLog）
-    raw_models = (
-        db.query(models.RawDataset.model_name)
+    """獲取按模型分類的統計數據（固定三次分組查詢，與模型數量無關）"""
+    # 只計算未被接受的 RawDataset（避免與 FinalDataset 重複計算），
+    # 但已全部被接受的模型仍需出現在列表中，因此以條件加總而非過濾
+    raw_counts = (
+        db.query(
+            models.RawDataset.model_name,
+            func.sum(case((models.RawDataset.review_status != models.ReviewStatus.ACCEPTED, 1), else_=0))
+        )
         .filter(models.RawDataset.model_name.isnot(None))
-        .distinct()
+        .group_by(models.RawDataset.model_name)
         .all()
     )
-    
-    final_models = (
-        db.query(models.FinalDataset.model_name)
+
+    final_counts = (
+        db.query(models.FinalDataset.model_name, func.count(models.FinalDataset.id))
         .filter(models.FinalDataset.model_name.isnot(None))
-        .distinct()
+        .group_by(models.FinalDataset.model_name)
         .all()
     )
-    
-    # 從 ReviewLog 也獲取模型名稱（用於歷史數據）
-    review_models = (
-        db.query(models.ReviewLog.model_name)
+
+    # 審核數據直接從 ReviewLog 表分組計算（也涵蓋僅存在於歷史審核記錄中的模型）
+    review_counts = (
+        db.query(
+            models.ReviewLog.model_name,
+            func.count(models.ReviewLog.id),
+            func.sum(case((models.ReviewLog.result == 'ACCEPT', 1), else_=0)),
+            func.sum(case((models.ReviewLog.result == 'REJECT', 1), else_=0))
+        )
         .filter(models.ReviewLog.model_name.isnot(None))
-        .distinct()
+        .group_by(models.ReviewLog.model_name)
         .all()
     )
-    
+
+    dataset_totals = {}
+    for model_name, count in list(raw_counts) + list(final_counts):
+        dataset_totals[model_name] = dataset_totals.get(model_name, 0) + (count or 0)
+
+    review_totals = {
+        model_name: (total or 0, accepts or 0, rejects or 0)
+        for model_name, total, accepts, rejects in review_counts
+    }
+
     # 合併所有模型名稱
-    all_model_names = set()
-    for model in raw_models:
-        if model.model_name:
-            all_model_names.add(model.model_name)
-    for model in final_models:
-        if model.model_name:
-            all_model_names.add(model.model_name)
-    for model in review_models:
-        if model.model_name:
-            all_model_names.add(model.model_name)
-    
+    all_model_names = set(dataset_totals) | set(review_totals)
+
     model_stats = []
-    for model_name in all_model_names:
-        # 獲取該模型的資料集總數
-        # 只計算未被接受的 RawDataset（避免與 FinalDataset 重複計算）
-        raw_datasets_count = db.query(func.count(models.RawDataset.id)).filter(
-            models.RawDataset.model_name == model_name,
-            models.RawDataset.review_status != models.ReviewStatus.ACCEPTED
-        ).scalar()
-        
-        final_datasets_count = db.query(func.count(models.FinalDataset.id)).filter(
-            models.FinalDataset.model_name == model_name
-        ).scalar()
-        
-        total_datasets = raw_datasets_count + final_datasets_count
-        
-        # 獲取該模型的審核總數（直接從 ReviewLog 表查詢，不需要 JOIN）
-        total_reviews = db.query(func.count(models.ReviewLog.id)).filter(
-            models.ReviewLog.model_name == model_name
-        ).scalar()
-        
-        # 獲取該模型的接受總數
-        total_accepts = db.query(func.count(models.ReviewLog.id)).filter(
-            models.ReviewLog.model_name == model_name,
-            models.ReviewLog.result == 'ACCEPT'
-        ).scalar()
-        
-        # 獲取該模型的拒絕總數
-        total_rejects = db.query(func.count(models.ReviewLog.id)).filter(
-            models.ReviewLog.model_name == model_name,
-            models.ReviewLog.result == 'REJECT'
-        ).scalar()
-        
+    for model_name in sorted(all_model_names):
+        total_reviews, total_accepts, total_rejects = review_totals.get(model_name, (0, 0, 0))
+
         # 計算通過率
         acceptance_rate = (total_accepts / total_reviews * 100) if total_reviews > 0 else 0.0
-        
+
         model_stats.append(schemas.ModelStats(
             model_name=model_name,
-            total_datasets=total_datasets,
+            total_datasets=dataset_totals.get(model_name, 0),
             total_reviews=total_reviews,
             total_accepts=total_accepts,
             total_rejects=total_rejects,
             acceptance_rate=round(acceptance_rate, 1)
         ))
-    
+
     return model_stats
 
 def refresh_model_stats(db: Session) -> dict:
-    """重新統計模型數據，清空所有 review_log 記錄"""
-    
-    # 1. 獲取清空前的統計資訊
-    total_review_logs_before = db.query(func.count(models.ReviewLog.id)).scalar()
-    
-    # 2. 清空所有 ReviewLog 記錄
-    db.query(models.ReviewLog).delete()
-    
-    # 3. 重置所有 RawDataset 的審核狀態和計數
-    raw_datasets = db.query(models.RawDataset).all()
-    for dataset in raw_datasets:
-        dataset.review_status = models.ReviewStatus.PENDING
-        dataset.accept_count = 0
-        dataset.reject_count = 0
-    
-    # 4. 提交清空操作
-    db.commit()
-    
-    # 5. 重新計算統計（此時所有統計都會是 0）
+    """重新統計模型數據，清空所有 review_log 記錄；以分批的集合式 DELETE／UPDATE 執行"""
+    association = models.review_log_rejection_reason_association
+
+    # 1. 清空所有 ReviewLog 記錄（先刪除拒絕理由關聯）
+    _execute_in_id_chunks(db, association.c.review_log_id, lambda condition: association.delete().where(condition))
+    review_logs_cleared = _execute_in_id_chunks(
+        db, models.ReviewLog.id, lambda condition: delete(models.ReviewLog).where(condition)
+    )
+
+    # 2. 重置所有 RawDataset 的審核狀態和計數；重新生成中的資料集維持 regenerating，由佇列中的工作完成
+    raw_datasets_reset = _execute_in_id_chunks(
+        db,
+        models.RawDataset.id,
+        lambda condition: update(models.RawDataset).where(condition).values(
+            review_status=case(
+                (models.RawDataset.review_status == models.ReviewStatus.REGENERATING, models.RawDataset.review_status),
+                else_=literal(models.ReviewStatus.PENDING, models.RawDataset.review_status.type)
+            ),
+            accept_count=0,
+            reject_count=0
+        )
+    )
+    # 進行中的重新生成最終失敗時還原為待審核，而非清空前的審核狀態
+    _execute_in_id_chunks(
+        db,
+        models.RegenerationTask.id,
+        lambda condition: update(models.RegenerationTask).where(condition).where(
+            models.RegenerationTask.status.in_(_ACTIVE_REGENERATION_STATUSES)
+        ).values(previous_status=models.ReviewStatus.PENDING.value)
+    )
+    # 語句未同步 Session，已載入的物件需重新讀取
+    db.expire_all()
+    stats_cache.invalidate()
+
+    # 3. 重新計算統計（此時所有統計都會是 0）
     model_stats = get_model_stats(db)
-    
+
     return {
         "message": "所有審核記錄已清空，模型統計已重置",
         "model_count": len(model_stats),
         "models": [stat.model_name for stat in model_stats],
         "cleanup_info": {
-            "total_review_logs_cleared": total_review_logs_before,
-            "raw_datasets_reset": len(raw_datasets)
+            "total_review_logs_cleared": review_logs_cleared,
+            "raw_datasets_reset": raw_datasets_reset
         }
     }
 
 
 # --- Legal Articles CRUD ---
 
+LEGAL_ARTICLE_UPSERT_CHUNK_SIZE = 500
+
+def _upsert_legal_article_chunk(db: Session, chunk: List[dict]) -> List[int]:
+    dialect_insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(models.LegalArticle).values(chunk)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.LegalArticle.title, models.LegalArticle.number],
+        set_={"content": stmt.excluded.content}
+    ).returning(models.LegalArticle.title, models.LegalArticle.number, models.LegalArticle.id)
+    # RETURNING 的列順序不保證與 VALUES 相同，依 (title, number) 對回輸入順序
+    ids_by_key = {(row.title, row.number): row.id for row in db.execute(stmt)}
+    return [ids_by_key[(article["title"], article["number"])] for article in chunk]
+
+def upsert_legal_articles(
+    db: Session,
+    articles: Iterable[schemas.LegalArticleCreate],
+    chunk_size: int = LEGAL_ARTICLE_UPSERT_CHUNK_SIZE
+) -> List[int]:
+    """
+    以 (title, number) 為鍵批次匯入法規條文：已存在的條文更新內容，其餘新增。
+    articles 可以是串流產生器，每 chunk_size 筆送出一次 INSERT ... ON CONFLICT DO UPDATE，
+    整個匯入在同一個交易中完成，回傳每筆條文的 id（依輸入順序，重複的條文只回傳一次）。
+    """
+    ids = []
+    chunk = {}
+    try:
+        for article in articles:
+            # 同一個 chunk 內重複的條文以最後一筆為準（PostgreSQL 不允許同一語句更新同一列兩次）
+            chunk[(article.title, article.number)] = article.model_dump()
+            if len(chunk) >= chunk_size:
+                ids.extend(_upsert_legal_article_chunk(db, list(chunk.values())))
+                chunk = {}
+        if chunk:
+            ids.extend(_upsert_legal_article_chunk(db, list(chunk.values())))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # 跨 chunk 重複的條文會回傳相同 id，只保留第一次出現的位置
+    return list(dict.fromkeys(ids))
+
+def get_legal_articles_by_ids(db: Session, article_ids: List[int]) -> List[models.LegalArticle]:
+    """依傳入順序取得法規條文，不存在的 ID 會被略過"""
+    if not article_ids:
+        return []
+    articles = db.query(models.LegalArticle).filter(models.LegalArticle.id.in_(article_ids)).all()
+    articles_by_id = {article.id: article for article in articles}
+    return [articles_by_id[article_id] for article_id in article_ids if article_id in articles_by_id]
+
 def create_legal_articles(db: Session, articles: List[schemas.LegalArticleCreate]):
-    db_articles = [models.LegalArticle(**article.model_dump()) for article in articles]
-    db.add_all(db_articles)
-    db.commit()
-    # We need to refresh each object individually if we want to return them with IDs
-    for article in db_articles:
-        db.refresh(article)
-    return db_articles
+    ids = upsert_legal_articles(db, articles)
+    return get_legal_articles_by_ids(db, ids)
 
 def get_legal_articles(db: Session, skip: int = 0, limit: int = 10000):
     return db.query(models.LegalArticle).offset(skip).limit(limit).all()
@@ -543,3 +732,684 @@ def delete_legal_article(db: Session, article_id: int):
     db.commit()
     return db_article
 
+
+
+# --- Async CRUD ---
+# 供 async 端點與背景重新生成使用，避免同步 Session 的 I/O 阻塞事件迴圈
+
+async def get_setting_async(db: AsyncSession, key: str):
+    result = await db.execute(select(models.SystemSetting).filter(models.SystemSetting.key == key))
+    return result.scalars().first()
+
+async def get_model_concurrency_async(db: AsyncSession, model_name: str) -> int:
+    """取得模型的並行生成上限：ollama_model_concurrency 設定中的值，未設定時使用預設值"""
+    setting = await get_setting_async(db, "ollama_model_concurrency")
+    limits = setting.value if setting and isinstance(setting.value, dict) else {}
+    try:
+        concurrency = int(limits.get(model_name, app_settings.ollama_default_concurrency))
+    except (TypeError, ValueError):
+        concurrency = app_settings.ollama_default_concurrency
+    return max(1, concurrency)
+
+async def get_model_keep_alive_async(db: AsyncSession, model_name: str) -> Union[str, int]:
+    """取得模型的 keep_alive：ollama_model_keep_alive 設定中的值，未設定時使用預設值"""
+    setting = await get_setting_async(db, "ollama_model_keep_alive")
+    keep_alive = setting.value if setting and isinstance(setting.value, dict) else {}
+    return keep_alive.get(model_name, app_settings.ollama_keep_alive)
+
+async def get_legal_articles_by_ids_async(db: AsyncSession, article_ids: List[int]) -> List[models.LegalArticle]:
+    """依傳入順序取得法規條文，不存在的 ID 會被略過"""
+    if not article_ids:
+        return []
+    result = await db.execute(select(models.LegalArticle).filter(models.LegalArticle.id.in_(article_ids)))
+    articles_by_id = {article.id: article for article in result.scalars().all()}
+    return [articles_by_id[article_id] for article_id in article_ids if article_id in articles_by_id]
+
+async def get_all_legal_articles_async(db: AsyncSession) -> List[models.LegalArticle]:
+    result = await db.execute(select(models.LegalArticle).order_by(models.LegalArticle.id))
+    return list(result.scalars().all())
+
+async def get_raw_dataset_async(db: AsyncSession, dataset_id: int):
+    result = await db.execute(select(models.RawDataset).filter(models.RawDataset.id == dataset_id))
+    return result.scalars().first()
+
+async def get_rejection_reasons_for_dataset_async(db: AsyncSession, dataset_id: int):
+    result = await db.execute(
+        select(models.ReviewLog)
+        .options(
+            selectinload(models.ReviewLog.reviewer),
+            selectinload(models.ReviewLog.rejection_reasons)
+        )
+        .filter(models.ReviewLog.dataset_id == dataset_id)
+        .filter(models.ReviewLog.result == "REJECT")
+    )
+
+    return [
+        schemas.RejectionInfo(
+            id=log.id,
+            comment=log.comment,
+            rejection_reasons=log.rejection_reasons,
+            timestamp=log.timestamp,
+            reviewer_username=log.reviewer.username
+        )
+        for log in result.scalars().all()
+    ]
+
+def get_dataset_revisions(db: Session, dataset_id: int) -> List[models.DatasetRevision]:
+    return db.query(models.DatasetRevision).filter(
+        models.DatasetRevision.dataset_id == dataset_id
+    ).order_by(models.DatasetRevision.revision).all()
+
+async def add_dataset_revision_async(
+    db: AsyncSession,
+    dataset: models.RawDataset,
+    rejection_snapshot: Optional[dict] = None
+) -> models.DatasetRevision:
+    """
+    將資料集目前的內容保存為下一個修訂版本，不會自動 commit。
+    只新增一列：版本號由 (dataset_id, revision) 索引取得最大值，不讀取或改寫既有的修訂。
+    """
+    latest = (await db.execute(
+        select(func.max(models.DatasetRevision.revision))
+        .filter(models.DatasetRevision.dataset_id == dataset.id)
+    )).scalar()
+    revision = models.DatasetRevision(
+        dataset_id=dataset.id,
+        revision=(latest or 0) + 1,
+        instruction=dataset.instruction,
+        input=dataset.input,
+        output=dataset.output,
+        model_name=dataset.model_name,
+        rejection_snapshot=rejection_snapshot
+    )
+    db.add(revision)
+    return revision
+
+async def delete_review_logs_for_dataset_async(db: AsyncSession, dataset_id: int) -> int:
+    """刪除指定資料集的所有審核記錄（含拒絕理由關聯），不會自動 commit"""
+    review_log_ids = select(models.ReviewLog.id).filter(models.ReviewLog.dataset_id == dataset_id)
+    association = models.review_log_rejection_reason_association
+    await db.execute(delete(association).where(association.c.review_log_id.in_(review_log_ids)))
+    result = await db.execute(
+        delete(models.ReviewLog)
+        .where(models.ReviewLog.dataset_id == dataset_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+# --- Generation Job CRUD (async) ---
+
+_FINISHED_JOB_STATUSES = (
+    models.GenerationJobStatus.COMPLETED,
+    models.GenerationJobStatus.CANCELLED,
+    models.GenerationJobStatus.FAILED,
+)
+
+async def create_generation_job_async(
+    db: AsyncSession,
+    model_name: str,
+    article_selections: List[List[dict]],
+    created_by: Optional[int] = None,
+    bypass_cache: bool = False
+) -> models.GenerationJob:
+    """建立生成工作與每一筆待生成項目（每筆使用的法規在建立時即決定）"""
+    job = models.GenerationJob(
+        model_name=model_name,
+        total_items=len(article_selections),
+        completed_items=0,
+        failed_items=0,
+        created_by=created_by,
+        bypass_cache=bypass_cache,
+        status=models.GenerationJobStatus.PENDING
+    )
+    db.add(job)
+    await db.flush()
+    await db.execute(insert(models.GenerationJobItem), [
+        {
+            "job_id": job.id,
+            "item_index": index,
+            "status": models.GenerationJobItemStatus.PENDING,
+            "articles": articles
+        }
+        for index, articles in enumerate(article_selections)
+    ])
+    await db.commit()
+    return job
+
+async def get_generation_job_async(db: AsyncSession, job_id: int) -> Optional[models.GenerationJob]:
+    result = await db.execute(
+        select(models.GenerationJob)
+        .filter(models.GenerationJob.id == job_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def get_generation_job_items_async(
+    db: AsyncSession,
+    job_id: int,
+    after_index: Optional[int] = None,
+    limit: int = 100,
+    finished_only: bool = False
+) -> schemas.GenerationJobItemPage:
+    """依 item_index 分頁取得工作項目，finished_only 時只回傳已有結果的項目"""
+    query = select(models.GenerationJobItem).filter(models.GenerationJobItem.job_id == job_id)
+    if after_index is not None:
+        query = query.filter(models.GenerationJobItem.item_index > after_index)
+    if finished_only:
+        query = query.filter(models.GenerationJobItem.sequence.is_not(None))
+    result = await db.execute(query.order_by(models.GenerationJobItem.item_index).limit(limit + 1))
+    items = list(result.scalars().all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1].item_index
+    return schemas.GenerationJobItemPage(items=items, next_cursor=next_cursor)
+
+async def get_generation_job_items_after_sequence_async(
+    db: AsyncSession, job_id: int, after_sequence: int = 0, limit: int = 100
+) -> List[models.GenerationJobItem]:
+    """依完成順序取得 after_sequence 之後完成的項目，供進度串流使用"""
+    result = await db.execute(
+        select(models.GenerationJobItem)
+        .filter(models.GenerationJobItem.job_id == job_id)
+        .filter(models.GenerationJobItem.sequence > after_sequence)
+        .order_by(models.GenerationJobItem.sequence)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def get_pending_generation_job_items_async(db: AsyncSession, job_id: int) -> List[models.GenerationJobItem]:
+    result = await db.execute(
+        select(models.GenerationJobItem)
+        .filter(models.GenerationJobItem.job_id == job_id)
+        .filter(models.GenerationJobItem.status == models.GenerationJobItemStatus.PENDING)
+        .order_by(models.GenerationJobItem.item_index)
+    )
+    return list(result.scalars().all())
+
+async def get_unfinished_generation_job_ids_async(db: AsyncSession) -> List[int]:
+    result = await db.execute(
+        select(models.GenerationJob.id)
+        .filter(models.GenerationJob.status.not_in(_FINISHED_JOB_STATUSES))
+        .order_by(models.GenerationJob.id)
+    )
+    return list(result.scalars().all())
+
+async def start_generation_job_async(db: AsyncSession, job_id: int) -> bool:
+    """將待處理的工作標記為執行中；工作已結束時回傳 False"""
+    await db.execute(
+        models.GenerationJob.__table__.update()
+        .where(models.GenerationJob.id == job_id)
+        .where(models.GenerationJob.status == models.GenerationJobStatus.PENDING)
+        .values(status=models.GenerationJobStatus.RUNNING)
+    )
+    await db.commit()
+    job = await get_generation_job_async(db, job_id)
+    return job is not None and job.status == models.GenerationJobStatus.RUNNING
+
+async def complete_generation_job_item_async(
+    db: AsyncSession,
+    job_id: int,
+    item_id: int,
+    result: Optional[dict] = None,
+    error: Optional[str] = None
+) -> bool:
+    """
+    記錄單筆項目的生成結果並更新工作計數。
+    只會更新仍在等待中的項目（已取消或已完成的項目不受影響），回傳是否有更新。
+    """
+    succeeded = error is None
+    jobs = models.GenerationJob.__table__
+    items = models.GenerationJobItem.__table__
+    counter = jobs.c.completed_items if succeeded else jobs.c.failed_items
+
+    # 先遞增工作計數取得完成順序；同一交易內該列已被鎖定，順序不會重複
+    sequence = (await db.execute(
+        jobs.update()
+        .where(jobs.c.id == job_id)
+        .where(jobs.c.status == models.GenerationJobStatus.RUNNING)
+        .values({counter: counter + 1})
+        .returning(jobs.c.completed_items + jobs.c.failed_items)
+    )).scalar()
+    if sequence is None:
+        await db.rollback()
+        return False
+
+    updated = (await db.execute(
+        items.update()
+        .where(items.c.id == item_id)
+        .where(items.c.status == models.GenerationJobItemStatus.PENDING)
+        .values(
+            status=models.GenerationJobItemStatus.COMPLETED if succeeded else models.GenerationJobItemStatus.FAILED,
+            result=result,
+            error=error,
+            sequence=sequence,
+            completed_at=func.now()
+        )
+    )).rowcount
+    if not updated:
+        await db.rollback()
+        return False
+
+    await db.commit()
+    return True
+
+async def finish_generation_job_async(
+    db: AsyncSession, job_id: int, status: models.GenerationJobStatus = models.GenerationJobStatus.COMPLETED
+) -> None:
+    """將執行中的工作標記為結束（已取消的工作維持原狀態）"""
+    await db.execute(
+        models.GenerationJob.__table__.update()
+        .where(models.GenerationJob.id == job_id)
+        .where(models.GenerationJob.status.not_in(_FINISHED_JOB_STATUSES))
+        .values(status=status, finished_at=func.now())
+    )
+    await db.commit()
+
+async def cancel_generation_job_async(db: AsyncSession, job_id: int) -> Optional[models.GenerationJob]:
+    """取消尚未結束的工作，尚未生成的項目一併標記為取消；已生成的結果會保留"""
+    jobs = models.GenerationJob.__table__
+    items = models.GenerationJobItem.__table__
+    cancelled = (await db.execute(
+        jobs.update()
+        .where(jobs.c.id == job_id)
+        .where(jobs.c.status.not_in(_FINISHED_JOB_STATUSES))
+        .values(status=models.GenerationJobStatus.CANCELLED, finished_at=func.now())
+    )).rowcount
+    if cancelled:
+        await db.execute(
+            items.update()
+            .where(items.c.job_id == job_id)
+            .where(items.c.status == models.GenerationJobItemStatus.PENDING)
+            .values(status=models.GenerationJobItemStatus.CANCELLED)
+        )
+    await db.commit()
+    return await get_generation_job_async(db, job_id)
+
+# --- Regeneration Queue CRUD ---
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+_ACTIVE_REGENERATION_STATUSES = (models.RegenerationTaskStatus.PENDING, models.RegenerationTaskStatus.RUNNING)
+
+def get_active_regeneration_task(db: Session, dataset_id: int) -> Optional[models.RegenerationTask]:
+    return db.query(models.RegenerationTask).filter(
+        models.RegenerationTask.dataset_id == dataset_id,
+        models.RegenerationTask.status.in_(_ACTIVE_REGENERATION_STATUSES)
+    ).order_by(models.RegenerationTask.id).first()
+
+def enqueue_regeneration(db: Session, dataset_id: int, model_name: Optional[str] = None) -> Optional[models.RegenerationTask]:
+    """
+    將資料集加入重新生成佇列並標記為 regenerating，由背景 worker 執行。
+    每個資料集同時最多只有一筆進行中的工作：以 UPDATE ... WHERE review_status != 'regenerating'
+    取得資格，已在重新生成中時不新增工作，直接回傳進行中的那一筆（重複觸發併入同一次重新生成）。
+    資料集不存在時回傳 None。
+    """
+    dataset = get_raw_dataset(db, dataset_id)
+    if not dataset:
+        return None
+    previous_status = _status_value(dataset.review_status)
+
+    claimed = db.query(models.RawDataset).filter(
+        models.RawDataset.id == dataset_id,
+        models.RawDataset.review_status != models.ReviewStatus.REGENERATING
+    ).update({models.RawDataset.review_status: models.ReviewStatus.REGENERATING}, synchronize_session=False)
+    if not claimed:
+        active = get_active_regeneration_task(db, dataset_id)
+        if active:
+            return active
+        # 停留在 regenerating 卻沒有工作（例如舊版背景工作中斷）：補上一筆，最終失敗後回到待審核
+        previous_status = models.ReviewStatus.PENDING.value
+
+    task = models.RegenerationTask(
+        dataset_id=dataset_id,
+        model_name=model_name,
+        status=models.RegenerationTaskStatus.PENDING,
+        previous_status=previous_status,
+        attempts=0,
+        available_at=_utcnow()
+    )
+    db.add(task)
+    db.commit()
+    stats_cache.invalidate()
+    db.refresh(task)
+    db.refresh(dataset)
+    return task
+
+async def get_regeneration_task_async(db: AsyncSession, task_id: int) -> Optional[models.RegenerationTask]:
+    result = await db.execute(
+        select(models.RegenerationTask)
+        .filter(models.RegenerationTask.id == task_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+def _within_sweep_concurrency(tasks):
+    """批次重新生成的工作只在該批次執行中的數量低於 max_concurrency 時才可領取"""
+    sweeps = models.RegenerationSweep.__table__
+    sweep_running = tasks.alias("sweep_running")
+    running_count = (
+        select(func.count())
+        .where(sweep_running.c.sweep_id == tasks.c.sweep_id)
+        .where(sweep_running.c.status == models.RegenerationTaskStatus.RUNNING)
+        .scalar_subquery()
+    )
+    max_concurrency = select(sweeps.c.max_concurrency).where(sweeps.c.id == tasks.c.sweep_id).scalar_subquery()
+    return or_(tasks.c.sweep_id.is_(None), running_count < max_concurrency)
+
+async def claim_regeneration_task_async(db: AsyncSession, claimed_by: Optional[str] = None) -> Optional[models.RegenerationTask]:
+    """
+    領取最早可執行的待處理工作並標記為執行中。
+    以 UPDATE ... WHERE status = 'pending' 確保同一筆工作只會被一個 worker（或行程）領取；
+    被搶先時改領下一筆，沒有可執行的工作時回傳 None。
+    批次重新生成的工作另受該批次的 max_concurrency 限制。
+    領取時記錄 claimed_by 與心跳時間，執行期間需以 heartbeat_regeneration_task_async 持續更新。
+    """
+    tasks = models.RegenerationTask.__table__
+    running = tasks.alias("running")
+    within_sweep_limit = _within_sweep_concurrency(tasks)
+    while True:
+        now = _utcnow()
+        task_id = (await db.execute(
+            select(tasks.c.id)
+            .where(tasks.c.status == models.RegenerationTaskStatus.PENDING)
+            .where(tasks.c.available_at <= now)
+            # 同一資料集已有執行中的工作時先跳過
+            .where(~exists().where(running.c.dataset_id == tasks.c.dataset_id)
+                   .where(running.c.status == models.RegenerationTaskStatus.RUNNING))
+            .where(within_sweep_limit)
+            .order_by(tasks.c.available_at, tasks.c.id)
+            .limit(1)
+        )).scalar()
+        if task_id is None:
+            await db.commit()
+            return None
+
+        claimed = (await db.execute(
+            tasks.update()
+            .where(tasks.c.id == task_id)
+            .where(tasks.c.status == models.RegenerationTaskStatus.PENDING)
+            .where(within_sweep_limit)
+            .values(
+                status=models.RegenerationTaskStatus.RUNNING,
+                attempts=tasks.c.attempts + 1,
+                started_at=now,
+                claimed_by=claimed_by,
+                heartbeat_at=now
+            )
+        )).rowcount
+        await db.commit()
+        if claimed:
+            return await get_regeneration_task_async(db, task_id)
+
+async def heartbeat_regeneration_task_async(db: AsyncSession, task_id: int, claimed_by: Optional[str]) -> bool:
+    """更新執行中工作的心跳；工作已被重新排入佇列或改由其他行程領取時回傳 False"""
+    tasks = models.RegenerationTask.__table__
+    updated = (await db.execute(
+        tasks.update()
+        .where(tasks.c.id == task_id)
+        .where(tasks.c.status == models.RegenerationTaskStatus.RUNNING)
+        .where(tasks.c.claimed_by == claimed_by)
+        .values(heartbeat_at=_utcnow())
+    )).rowcount
+    await db.commit()
+    return bool(updated)
+
+async def complete_regeneration_task_async(db: AsyncSession, task_id: int) -> None:
+    tasks = models.RegenerationTask.__table__
+    await db.execute(
+        tasks.update()
+        .where(tasks.c.id == task_id)
+        .values(status=models.RegenerationTaskStatus.COMPLETED, last_error=None, finished_at=_utcnow())
+    )
+    await db.commit()
+
+async def retry_regeneration_task_async(db: AsyncSession, task_id: int, error: str, delay_seconds: float) -> None:
+    """將失敗的工作放回佇列，delay_seconds 後才能再被領取；資料集維持 regenerating"""
+    tasks = models.RegenerationTask.__table__
+    await db.execute(
+        tasks.update()
+        .where(tasks.c.id == task_id)
+        .values(
+            status=models.RegenerationTaskStatus.PENDING,
+            last_error=error,
+            available_at=_utcnow() + timedelta(seconds=delay_seconds)
+        )
+    )
+    await db.commit()
+
+async def fail_regeneration_task_async(db: AsyncSession, task_id: int, error: str) -> None:
+    """將工作標記為失敗，並把仍在 regenerating 的資料集還原為加入佇列前的狀態"""
+    tasks = models.RegenerationTask.__table__
+    datasets = models.RawDataset.__table__
+    task = await get_regeneration_task_async(db, task_id)
+    if not task:
+        return
+    await db.execute(
+        tasks.update()
+        .where(tasks.c.id == task_id)
+        .values(status=models.RegenerationTaskStatus.FAILED, last_error=error, finished_at=_utcnow())
+    )
+    await db.execute(
+        datasets.update()
+        .where(datasets.c.id == task.dataset_id)
+        .where(datasets.c.review_status == models.ReviewStatus.REGENERATING)
+        .values(review_status=models.ReviewStatus(task.previous_status or models.ReviewStatus.PENDING.value))
+    )
+    await db.commit()
+    stats_cache.invalidate()
+
+async def requeue_orphaned_regenerations_async(
+    db: AsyncSession,
+    stale_after_seconds: float = app_settings.regeneration_stale_after_seconds
+) -> int:
+    """
+    將中斷的工作放回佇列：執行中但心跳超過 stale_after_seconds 未更新的工作
+    （領取的行程已結束或當機），其他行程仍在執行、心跳正常的工作不受影響。
+    狀態為 regenerating 卻沒有待處理工作的資料集（例如舊版背景工作中斷）也重新加入佇列。
+    回傳重新排入的工作數。
+    """
+    tasks = models.RegenerationTask.__table__
+    now = _utcnow()
+    # 舊版工作沒有心跳欄位，改以開始時間判斷
+    last_seen = func.coalesce(tasks.c.heartbeat_at, tasks.c.started_at, tasks.c.created_at)
+    requeued = (await db.execute(
+        tasks.update()
+        .where(tasks.c.status == models.RegenerationTaskStatus.RUNNING)
+        .where(last_seen < now - timedelta(seconds=stale_after_seconds))
+        .values(status=models.RegenerationTaskStatus.PENDING, available_at=now, claimed_by=None, heartbeat_at=None)
+    )).rowcount
+
+    active = select(tasks.c.dataset_id).where(tasks.c.status.in_(_ACTIVE_REGENERATION_STATUSES))
+    orphan_ids = (await db.execute(
+        select(models.RawDataset.id)
+        .filter(models.RawDataset.review_status == models.ReviewStatus.REGENERATING)
+        .filter(models.RawDataset.id.not_in(active))
+    )).scalars().all()
+    if orphan_ids:
+        await db.execute(insert(models.RegenerationTask), [
+            {
+                "dataset_id": dataset_id,
+                "status": models.RegenerationTaskStatus.PENDING,
+                "previous_status": models.ReviewStatus.PENDING.value,
+                "attempts": 0,
+                "available_at": now,
+            }
+            for dataset_id in orphan_ids
+        ])
+    await db.commit()
+    return requeued + len(orphan_ids)
+
+# --- Regeneration Sweep CRUD ---
+
+# 每次 UPDATE ... WHERE id IN (...) 的資料集數，避免超過 SQLite 的參數上限
+_SWEEP_CHUNK_SIZE = 500
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite 不保存時區，讀回的時間為 UTC 的 naive datetime
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _source_contains(dialect_name: str, text: str):
+    """source（法規標題的 JSON 陣列）中有任一元素包含 text；逐元素比對，不會跨元素或比對到 JSON 符號"""
+    elements_function = func.json_array_elements_text if dialect_name == "postgresql" else func.json_each
+    elements = elements_function(models.RawDataset.source).table_valued("value").alias("source_element")
+    return exists().select_from(elements).where(elements.c.value.contains(text, autoescape=True))
+
+async def get_regeneration_candidates_async(
+    db: AsyncSession,
+    filters: schemas.RegenerationSweepFilters,
+    limit: int
+) -> List[Tuple[int, str]]:
+    """
+    依條件選出要重新生成的資料集，回傳 (id, review_status)；已在重新生成中的資料集不列入。
+    拒絕次數多的優先，其次依 id。
+    """
+    query = select(models.RawDataset.id, models.RawDataset.review_status).filter(
+        models.RawDataset.review_status != models.ReviewStatus.REGENERATING
+    )
+    if filters.review_status:
+        query = query.filter(models.RawDataset.review_status.in_(
+            [models.ReviewStatus(status) for status in filters.review_status]
+        ))
+    if filters.model_name:
+        query = query.filter(models.RawDataset.model_name == filters.model_name)
+    if filters.min_reject_count is not None:
+        query = query.filter(models.RawDataset.reject_count >= filters.min_reject_count)
+    if filters.source:
+        query = query.filter(_source_contains(db.get_bind().dialect.name, filters.source))
+
+    result = await db.execute(
+        query.order_by(models.RawDataset.reject_count.desc(), models.RawDataset.id).limit(limit)
+    )
+    return [(dataset_id, _status_value(status)) for dataset_id, status in result.all()]
+
+async def create_regeneration_sweep_async(
+    db: AsyncSession,
+    filters: schemas.RegenerationSweepFilters,
+    candidates: List[Tuple[int, str]],
+    model_plan: List[Optional[str]],
+    model_weights: Optional[dict],
+    max_concurrency: int,
+    created_by: Optional[int] = None
+) -> models.RegenerationSweep:
+    """
+    在單一交易中將候選資料集排入重新生成佇列，model_plan 為對應每個候選的模型。
+    與 enqueue_regeneration 相同，以 UPDATE ... WHERE review_status = <選取時的狀態> RETURNING id
+    取得資格；選取後狀態已改變（例如已被加入佇列）的資料集略過。
+    """
+    sweep = models.RegenerationSweep(
+        filters=filters.model_dump(exclude_none=True),
+        model_weights=model_weights,
+        max_concurrency=max_concurrency,
+        matched_items=len(candidates),
+        total_items=0,
+        created_by=created_by
+    )
+    db.add(sweep)
+    await db.flush()
+
+    datasets = models.RawDataset.__table__
+    position = {dataset_id: index for index, (dataset_id, _) in enumerate(candidates)}
+    ids_by_status = defaultdict(list)
+    for dataset_id, status in candidates:
+        ids_by_status[status].append(dataset_id)
+
+    claimed_ids = []
+    for previous_status, ids in ids_by_status.items():
+        for start in range(0, len(ids), _SWEEP_CHUNK_SIZE):
+            result = await db.execute(
+                datasets.update()
+                .where(datasets.c.id.in_(ids[start:start + _SWEEP_CHUNK_SIZE]))
+                .where(datasets.c.review_status == models.ReviewStatus(previous_status))
+                .values(review_status=models.ReviewStatus.REGENERATING)
+                .returning(datasets.c.id)
+            )
+            claimed_ids.extend((dataset_id, previous_status) for dataset_id in result.scalars().all())
+
+    # 依選取順序建立工作，讓 worker 依序領取時各模型交錯執行
+    claimed_ids.sort(key=lambda claimed: position[claimed[0]])
+    now = _utcnow()
+    if claimed_ids:
+        await db.execute(insert(models.RegenerationTask), [
+            {
+                "dataset_id": dataset_id,
+                "sweep_id": sweep.id,
+                "model_name": model_plan[position[dataset_id]],
+                "status": models.RegenerationTaskStatus.PENDING,
+                "previous_status": previous_status,
+                "attempts": 0,
+                "available_at": now,
+            }
+            for dataset_id, previous_status in claimed_ids
+        ])
+    sweep.total_items = len(claimed_ids)
+    await db.commit()
+    stats_cache.invalidate()
+    return sweep
+
+async def get_regeneration_sweep_async(db: AsyncSession, sweep_id: int) -> Optional[schemas.RegenerationSweep]:
+    """批次重新生成的進度：各狀態與各模型的工作數，以及完成速度與預估剩餘時間"""
+    sweep = (await db.execute(
+        select(models.RegenerationSweep).filter(models.RegenerationSweep.id == sweep_id)
+    )).scalars().first()
+    if sweep is None:
+        return None
+
+    tasks = models.RegenerationTask.__table__
+    rows = (await db.execute(
+        select(
+            tasks.c.model_name,
+            tasks.c.status,
+            func.count(),
+            func.min(tasks.c.started_at),
+            func.max(tasks.c.finished_at)
+        )
+        .where(tasks.c.sweep_id == sweep_id)
+        .group_by(tasks.c.model_name, tasks.c.status)
+    )).all()
+
+    totals = schemas.RegenerationSweepModelProgress()
+    by_model = {}
+    first_started, last_finished = None, None
+    for model_name, status, count, started_at, finished_at in rows:
+        field = _status_value(status)
+        model_progress = by_model.setdefault(model_name or "auto", schemas.RegenerationSweepModelProgress())
+        setattr(model_progress, field, getattr(model_progress, field) + count)
+        setattr(totals, field, getattr(totals, field) + count)
+        started_at, finished_at = _as_utc(started_at), _as_utc(finished_at)
+        if started_at and (first_started is None or started_at < first_started):
+            first_started = started_at
+        if finished_at and (last_finished is None or finished_at > last_finished):
+            last_finished = finished_at
+
+    remaining = totals.pending + totals.running
+    done = totals.completed + totals.failed
+    finished = remaining == 0
+    elapsed = 0.0
+    if first_started:
+        end = last_finished if finished and last_finished else _utcnow()
+        elapsed = max(0.0, (end - first_started).total_seconds())
+    rate = done / elapsed if elapsed > 0 else 0.0
+
+    return schemas.RegenerationSweep(
+        id=sweep.id,
+        filters=sweep.filters or {},
+        model_weights=sweep.model_weights,
+        max_concurrency=sweep.max_concurrency,
+        matched_items=sweep.matched_items,
+        total_items=sweep.total_items,
+        created_at=sweep.created_at,
+        **totals.model_dump(),
+        finished=finished,
+        by_model=by_model,
+        elapsed_seconds=round(elapsed, 3),
+        items_per_minute=round(rate * 60, 3),
+        estimated_remaining_seconds=round(remaining / rate, 1) if rate and remaining else (0.0 if finished else None)
+    )
@@ -0,0 +1,330 @@
+"""
+資料庫遷移：讓既有資料庫跟上模型定義
+
+`Base.metadata.create_all` 只會建立不存在的資料表（連同其索引），
+既有資料表新增的欄位、索引與設定格式變更需要透過此模組補上。
+所有步驟皆可重複執行（idempotent），同時適用 SQLite 與 PostgreSQL。
+
+執行方式：python -m app.database.migrations
+強制依審核記錄重建所有審核計數：python -m app.database.migrations --rebuild-review-counters
+合併重複的法規條文並建立唯一索引：python -m app.database.migrations --dedupe-legal-articles
+"""
+
+import argparse
+import json
+import logging
+from typing import Dict, List, Set
+
+from sqlalchemy import and_, func, inspect, or_, select, text
+from sqlalchemy.engine import Engine
+
+from . import models  # noqa: F401  確保所有模型都已註冊到 Base.metadata
+from .base import Base
+
+logger = logging.getLogger(__name__)
+
+LEGAL_ARTICLES_UNIQUE_INDEX = "uq_legal_articles_title_number"
+
+
+def add_missing_columns(engine: Engine) -> List[str]:
+    """為既有資料表補上模型中新增的可為空欄位，回傳本次新增的欄位"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                # 只自動補上可為空的欄位，必填欄位需要人工決定既有資料的值
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+                ))
+                added.append(f"{table.name}.{column.name}")
+
+    return added
+
+
+def _duplicate_legal_article_keys(articles):
+    return (
+        select(articles.c.title, articles.c.number)
+        .group_by(articles.c.title, articles.c.number)
+        .having(func.count() > 1)
+    )
+
+
+def count_duplicate_legal_articles(engine: Engine) -> int:
+    """回傳 (title, number) 重複的法規條文組數"""
+    articles = models.LegalArticle.__table__
+    if articles.name not in inspect(engine).get_table_names():
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(_duplicate_legal_article_keys(articles).subquery())
+        ).scalar()
+
+
+def deduplicate_legal_articles(engine: Engine) -> List[str]:
+    """
+    合併 (title, number) 重複的法規條文，讓唯一索引得以建立。
+    每組保留內容最完整（最長）的一筆，長度相同時保留最新（id 最大）的一筆；
+    生成工作中記錄的法規 id 改指向保留的那一筆（資料集的 source 只記錄標題，不受影響）。
+    會刪除資料，只在以 --dedupe-legal-articles 執行時進行，每筆刪除的條文都會記錄 WARNING。
+    """
+    articles = models.LegalArticle.__table__
+    job_items = models.GenerationJobItem.__table__
+    existing_tables = set(inspect(engine).get_table_names())
+    if articles.name not in existing_tables:
+        return []
+
+    with engine.begin() as conn:
+        duplicate_keys = _duplicate_legal_article_keys(articles).subquery()
+        rows = conn.execute(
+            select(articles.c.id, articles.c.title, articles.c.number, articles.c.content)
+            .join(duplicate_keys, and_(
+                articles.c.title == duplicate_keys.c.title,
+                articles.c.number == duplicate_keys.c.number
+            ))
+            .order_by(articles.c.id)
+        ).all()
+        groups: Dict[tuple, list] = {}
+        for row in rows:
+            groups.setdefault((row.title, row.number), []).append(row)
+
+        replaced_by: Dict[int, int] = {}
+        for (title, number), group in groups.items():
+            keep = max(group, key=lambda row: (len(row.content or ""), row.id))
+            for row in group:
+                if row.id != keep.id:
+                    replaced_by[row.id] = keep.id
+                    logger.warning(
+                        "legal article removed as duplicate id=%s kept_id=%s title=%s number=%s",
+                        row.id, keep.id, title, number
+                    )
+        if not replaced_by:
+            return []
+
+        remapped_items = 0
+        if job_items.name in existing_tables:
+            for item in conn.execute(select(job_items.c.id, job_items.c.articles)).all():
+                item_articles = item.articles or []
+                if not any(article.get("id") in replaced_by for article in item_articles):
+                    continue
+                conn.execute(job_items.update().where(job_items.c.id == item.id).values(articles=[
+                    {**article, "id": replaced_by.get(article.get("id"), article.get("id"))}
+                    for article in item_articles
+                ]))
+                remapped_items += 1
+
+        conn.execute(articles.delete().where(articles.c.id.in_(list(replaced_by))))
+
+    changes = [f"legal_articles: removed {len(replaced_by)} duplicate (title, number) rows"]
+    if remapped_items:
+        changes.append(f"generation_job_items: remapped legal article ids in {remapped_items} items")
+    return changes
+
+
+def create_missing_indexes(engine: Engine, skip: Set[str] = frozenset()) -> List[str]:
+    """建立資料庫中尚不存在的索引（skip 中的除外），回傳本次新建的索引名稱"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    created = []
+    for table in Base.metadata.sorted_tables:
+        # 尚未建立的資料表交由 create_all 處理
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing_indexes or index.name in skip:
+                continue
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+
+    return created
+
+
+def migrate_ollama_model_setting(engine: Engine) -> List[str]:
+    """將舊的單一模型設定 ollama_model 轉換為多模型列表 ollama_models"""
+    settings_table = models.SystemSetting.__table__
+    if settings_table.name not in inspect(engine).get_table_names():
+        return []
+
+    with engine.begin() as conn:
+        old_setting = conn.execute(
+            settings_table.select().where(settings_table.c.key == "ollama_model")
+        ).first()
+        if old_setting is None:
+            return []
+
+        has_new_setting = conn.execute(
+            settings_table.select().where(settings_table.c.key == "ollama_models")
+        ).first() is not None
+        if not has_new_setting:
+            old_model = old_setting.value
+            if isinstance(old_model, dict) and "value" in old_model:
+                old_model = old_model["value"]
+            conn.execute(settings_table.insert().values(
+                key="ollama_models",
+                value=[old_model] if old_model else []
+            ))
+        conn.execute(settings_table.delete().where(settings_table.c.key == "ollama_model"))
+
+    return ["system_settings.ollama_model -> ollama_models"]
+
+
+def move_regeneration_metadata_to_revisions(engine: Engine) -> List[str]:
+    """
+    舊版重新生成把拒絕資訊序列化後寫入 system，並把被取代的 [指令, 回答] 附加到 history。
+    將這些資料移到 dataset_revisions：system 中的拒絕資訊與 history 最後一組成為一筆修訂，並清除 system。
+    舊版沒有記錄附加了幾組，較早的組合無法與生成時的多輪對話區分，因此保留在 history 中。
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    datasets = models.RawDataset.__table__
+    revisions = models.DatasetRevision.__table__
+    if datasets.name not in existing_tables or revisions.name not in existing_tables:
+        return []
+
+    moved = 0
+    with engine.begin() as conn:
+        rows = conn.execute(
+            select(datasets.c.id, datasets.c.system, datasets.c.history)
+            .where(datasets.c.system.like('%"rejection_reasons"%'))
+        ).all()
+        for row in rows:
+            try:
+                metadata = json.loads(row.system)
+            except ValueError:
+                continue
+            if not isinstance(metadata, dict) or "rejection_reasons" not in metadata:
+                continue
+
+            history = list(row.history or [])
+            values = {"system": None}
+            if history and isinstance(history[-1], list) and len(history[-1]) == 2:
+                instruction, output = history.pop()
+                latest = conn.execute(
+                    select(func.max(revisions.c.revision)).where(revisions.c.dataset_id == row.id)
+                ).scalar()
+                conn.execute(revisions.insert().values(
+                    dataset_id=row.id,
+                    revision=(latest or 0) + 1,
+                    instruction=instruction,
+                    input=metadata.get("previous_input"),
+                    output=output,
+                    rejection_snapshot={
+                        key: metadata[key]
+                        for key in ("reject_count", "accept_count", "rejection_reasons")
+                        if key in metadata
+                    }
+                ))
+                values["history"] = history
+            conn.execute(datasets.update().where(datasets.c.id == row.id).values(**values))
+            moved += 1
+
+    if not moved:
+        return []
+    return [f"raw_dataset: moved regeneration metadata of {moved} datasets to dataset_revisions"]
+
+
+def rebuild_review_counters(engine: Engine, force: bool = False) -> List[str]:
+    """
+    依 review_logs 重新計算 raw_dataset 的 accept_count / reject_count。
+    預設只更新計數與審核記錄不一致（或為空）的資料集，計數正確時不做任何變更；force 時重建全部。
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    datasets = models.RawDataset.__table__
+    logs = models.ReviewLog.__table__
+    if datasets.name not in existing_tables or logs.name not in existing_tables:
+        return []
+
+    def count_for(result: str):
+        return (
+            select(func.count(logs.c.id))
+            .where(logs.c.dataset_id == datasets.c.id)
+            .where(logs.c.result == result)
+            .scalar_subquery()
+        )
+
+    statement = datasets.update().values(accept_count=count_for("ACCEPT"), reject_count=count_for("REJECT"))
+    if not force:
+        statement = statement.where(or_(
+            datasets.c.accept_count.is_(None),
+            datasets.c.reject_count.is_(None),
+            datasets.c.accept_count != count_for("ACCEPT"),
+            datasets.c.reject_count != count_for("REJECT"),
+        ))
+    with engine.begin() as conn:
+        updated = conn.execute(statement).rowcount
+
+    if not updated:
+        return []
+    return [f"raw_dataset: rebuilt review counters of {updated} datasets from review_logs"]
+
+
+def run_migrations(engine: Engine, dedupe_legal_articles: bool = False) -> List[str]:
+    """
+    依序執行所有遷移步驟，回傳本次實際套用的變更。
+    法規條文有重複時不會自動刪除：除非指定 dedupe_legal_articles，否則略過其唯一索引並記錄 WARNING。
+    """
+    applied = []
+    applied.extend(add_missing_columns(engine))
+    if dedupe_legal_articles:
+        applied.extend(deduplicate_legal_articles(engine))
+
+    skipped_indexes = set()
+    duplicate_groups = count_duplicate_legal_articles(engine)
+    if duplicate_groups:
+        logger.warning(
+            "legal_articles has duplicate (title, number) rows groups=%d; %s not created until "
+            "python -m app.database.migrations --dedupe-legal-articles is run",
+            duplicate_groups, LEGAL_ARTICLES_UNIQUE_INDEX
+        )
+        skipped_indexes.add(LEGAL_ARTICLES_UNIQUE_INDEX)
+    applied.extend(create_missing_indexes(engine, skip=skipped_indexes))
+    applied.extend(migrate_ollama_model_setting(engine))
+    applied.extend(rebuild_review_counters(engine))
+    applied.extend(move_regeneration_metadata_to_revisions(engine))
+    return applied
+
+
+if __name__ == "__main__":
+    from .base import engine
+
+    parser = argparse.ArgumentParser(description="AI 資安資料集審核系統 - 資料庫遷移工具")
+    parser.add_argument(
+        "--rebuild-review-counters",
+        action="store_true",
+        help="執行遷移後依 review_logs 重建所有資料集的審核計數",
+    )
+    parser.add_argument(
+        "--dedupe-legal-articles",
+        action="store_true",
+        help="合併 (title, number) 重複的法規條文（保留內容最完整的一筆）並建立唯一索引",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    print("=" * 50)
+    print("AI 資安資料集審核系統 - 資料庫遷移工具")
+    print("=" * 50)
+
+    applied_changes = run_migrations(engine, dedupe_legal_articles=args.dedupe_legal_articles)
+    if args.rebuild_review_counters:
+        applied_changes.extend(rebuild_review_counters(engine, force=True))
+    if applied_changes:
+        for change in applied_changes:
+            print(f"✓ {change}")
+    else:
+        print("✓ 資料庫已是最新狀態，無需遷移")
+
+    print("=" * 50)
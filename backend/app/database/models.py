@@ -7,7 +7,9 @@ from sqlalchemy import (
     DateTime,
     Text,
     JSON,
-    Table
+    Table,
+    Index,
+    Boolean
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -65,6 +67,35 @@ class RawDataset(Base):
     reject_count = Column(Integer, default=0)
     
     review_logs = relationship("ReviewLog", back_populates="dataset", cascade="all, delete-orphan")
+    regeneration_tasks = relationship("RegenerationTask", back_populates="dataset", cascade="all, delete-orphan")
+    revisions = relationship(
+        "DatasetRevision", back_populates="dataset", cascade="all, delete-orphan", order_by="DatasetRevision.revision"
+    )
+
+    __table_args__ = (
+        Index("ix_raw_dataset_review_status_id", "review_status", "id"),
+        Index("ix_raw_dataset_model_name_review_status", "model_name", "review_status"),
+    )
+
+
+class DatasetRevision(Base):
+    """重新生成前的資料集內容：每次重新生成只新增一筆，資料集本身不保存歷次內容"""
+    __tablename__ = "dataset_revisions"
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("raw_dataset.id", ondelete="CASCADE"), nullable=False)
+    revision = Column(Integer, nullable=False)  # 同一資料集內從 1 起算
+    instruction = Column(Text, nullable=True)
+    input = Column(Text, nullable=True)
+    output = Column(Text, nullable=False)
+    model_name = Column(String, nullable=True)
+    rejection_snapshot = Column(JSON, nullable=True)  # 被取代時的審核計數與拒絕原因
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    dataset = relationship("RawDataset", back_populates="revisions")
+
+    __table_args__ = (
+        Index("uq_dataset_revisions_dataset_id_revision", "dataset_id", "revision", unique=True),
+    )
 
 
 class FinalDataset(Base):
@@ -96,6 +127,12 @@ class ReviewLog(Base):
         back_populates="review_logs"
     )
 
+    __table_args__ = (
+        Index("ix_review_logs_dataset_id_result", "dataset_id", "result"),
+        Index("ix_review_logs_reviewer_id_timestamp", "reviewer_id", "timestamp"),
+        Index("ix_review_logs_model_name_result", "model_name", "result"),
+    )
+
 
 class RejectionReason(Base):
     __tablename__ = "rejection_reasons"
@@ -124,3 +161,114 @@ class LegalArticle(Base):
     title = Column(String, index=True, nullable=False)
     number = Column(String, nullable=False)
     content = Column(Text, nullable=False)
+
+    __table_args__ = (
+        # 以唯一索引實作，既有資料庫可透過遷移補建，並作為匯入時 ON CONFLICT 的目標
+        Index("uq_legal_articles_title_number", "title", "number", unique=True),
+    )
+
+
+class GenerationJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+
+class GenerationJobItemStatus(str, enum.Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(Enum(GenerationJobStatus), default=GenerationJobStatus.PENDING, nullable=False)
+    model_name = Column(String, nullable=False)
+    total_items = Column(Integer, nullable=False)
+    completed_items = Column(Integer, default=0, nullable=False)
+    failed_items = Column(Integer, default=0, nullable=False)
+    bypass_cache = Column(Boolean, default=False, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    items = relationship(
+        "GenerationJobItem",
+        back_populates="job",
+        cascade="all, delete-orphan",
+        order_by="GenerationJobItem.item_index"
+    )
+
+
+class GenerationJobItem(Base):
+    __tablename__ = "generation_job_items"
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"), nullable=False)
+    item_index = Column(Integer, nullable=False)
+    status = Column(Enum(GenerationJobItemStatus), default=GenerationJobItemStatus.PENDING, nullable=False)
+    articles = Column(JSON, default=[])  # 此筆使用的法規（id、標題、條號、內容）
+    result = Column(JSON, nullable=True)  # 生成成功時的 GeneratedDataset
+    error = Column(Text, nullable=True)
+    sequence = Column(Integer, nullable=True)  # 完成順序（1 起算），作為進度串流的游標
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    job = relationship("GenerationJob", back_populates="items")
+
+    __table_args__ = (
+        Index("ix_generation_job_items_job_id_item_index", "job_id", "item_index", unique=True),
+        Index("ix_generation_job_items_job_id_sequence", "job_id", "sequence"),
+    )
+
+
+class RegenerationTaskStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class RegenerationSweep(Base):
+    """批次重新生成：依條件選出的資料集一次排入佇列，同時執行的數量不超過 max_concurrency"""
+    __tablename__ = "regeneration_sweeps"
+    id = Column(Integer, primary_key=True, index=True)
+    filters = Column(JSON, default={})  # 選取條件（狀態、模型、拒絕次數、來源法規）
+    model_weights = Column(JSON, nullable=True)  # 目標模型分配 {模型: 權重}，未指定時由 worker 隨機選擇
+    max_concurrency = Column(Integer, nullable=False)
+    matched_items = Column(Integer, nullable=False)  # 符合條件的資料集數
+    total_items = Column(Integer, nullable=False)  # 實際排入佇列的工作數
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    tasks = relationship("RegenerationTask", back_populates="sweep")
+
+
+class RegenerationTask(Base):
+    """重新生成佇列：由背景 worker 領取執行，重新啟動後仍會繼續"""
+    __tablename__ = "regeneration_tasks"
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("raw_dataset.id", ondelete="CASCADE"), nullable=False)
+    sweep_id = Column(Integer, ForeignKey("regeneration_sweeps.id"), nullable=True)  # 由批次重新生成建立時
+    model_name = Column(String, nullable=True)  # 未指定時由 worker 從 ollama_models 隨機選擇
+    status = Column(Enum(RegenerationTaskStatus), default=RegenerationTaskStatus.PENDING, nullable=False)
+    previous_status = Column(String, nullable=True)  # 加入佇列前的審核狀態，最終失敗時還原
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime(timezone=True), server_default=func.now())  # 重試前不會被領取
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    claimed_by = Column(String, nullable=True)  # 領取工作的行程（主機名稱:pid）
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # 執行中定期更新，逾時未更新視為中斷
+
+    dataset = relationship("RawDataset", back_populates="regeneration_tasks")
+    sweep = relationship("RegenerationSweep", back_populates="tasks")
+
+    __table_args__ = (
+        Index("ix_regeneration_tasks_status_available_at", "status", "available_at"),
+        Index("ix_regeneration_tasks_dataset_id", "dataset_id"),
+        Index("ix_regeneration_tasks_sweep_id_status", "sweep_id", "status"),
+    )
@@ -1,7 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.database import models, base
+from app.database import models, base, migrations
 from app.api.v1 import auth as auth_v1
 from app.api.v1 import settings as settings_v1
 from app.api.v1 import ollama as ollama_v1
@@ -11,9 +12,22 @@ from app.api.v1 import legal_articles as legal_articles_v1
 from app.api.v1 import stats as stats_v1
 from app.api.v1 import users as users_v1
 from app.api.v1 import review as review_v1
+from app.api.v1 import generation_jobs as generation_jobs_v1
+from app.api.v1 import regeneration_sweeps as regeneration_sweeps_v1
 from app import crud, schemas
+from app.config import settings
+from app.metrics import render_metrics
 from app.database.models import UserRole
+from app.services.http_clients import ollama_http_clients
+from app.services.generation_jobs import generation_job_runner
+from app.services.generation_cache import generation_cache
+from app.services.model_warmup import model_warmup
+from app.services.regeneration_worker import regeneration_worker_pool
+from app.services.ollama_pool import ollama_pool, parse_endpoints
 
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import os
 import uvicorn
 
@@ -53,6 +67,13 @@ def get_cors_origins():
     return origins
 
 def create_app() -> FastAPI:
+    logging.basicConfig(
+        level=settings.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+    # httpx 會為每個請求記錄一行 INFO，Ollama 請求已由 ollama_client 記錄
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
     # --- Database Initialization ---
     def init_db():
         db = base.SessionLocal()
@@ -83,6 +104,8 @@ def create_app() -> FastAPI:
                 "rejection_threshold": 3,
                 "approval_threshold": 3,
                 "ollama_models": [],
+                "ollama_model_concurrency": {},
+                "ollama_model_keep_alive": {},
                 "ollama_url": "http://host.docker.internal:11434"
             }
             
@@ -95,12 +118,46 @@ def create_app() -> FastAPI:
             db.close()
 
     models.Base.metadata.create_all(bind=base.engine)
+    migrations.run_migrations(base.engine)
     init_db()
 
+    def configure_ollama_pool():
+        db = base.SessionLocal()
+        try:
+            ollama_url_setting = crud.get_setting(db, "ollama_url")
+            ollama_pool.configure(parse_endpoints(ollama_url_setting.value if ollama_url_setting else None))
+        finally:
+            db.close()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # 多個 Ollama 端點時定期做健康檢查，讓被剔除的端點能自動恢復
+        configure_ollama_pool()
+        health_check_task = asyncio.create_task(
+            ollama_pool.run_health_checks(settings.ollama_health_check_interval_seconds)
+        )
+        # 在背景預先載入設定中的模型，不延遲啟動
+        warmup_task = asyncio.create_task(model_warmup.run_safely()) if settings.ollama_warmup_enabled else None
+        # 接續上次關閉時尚未完成的生成工作
+        await generation_job_runner.resume_unfinished()
+        # 重新排入中斷的重新生成工作後啟動 worker
+        await regeneration_worker_pool.recover()
+        regeneration_worker_pool.start()
+        yield
+        await regeneration_worker_pool.shutdown()
+        await generation_job_runner.shutdown()
+        health_check_task.cancel()
+        if warmup_task:
+            warmup_task.cancel()
+        # 關閉所有共用的 Ollama HTTP 連線
+        await ollama_http_clients.aclose()
+        generation_cache.close()
+
     app = FastAPI(
         title="AI Cybersecurity Dataset Review System API",
         description="API for managing and reviewing AI-generated cybersecurity datasets.",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
     # CORS Middleware
@@ -122,10 +179,19 @@ def create_app() -> FastAPI:
     app.include_router(legal_articles_v1.router, prefix="/api/v1/legal-articles", tags=["Legal Articles"])
     app.include_router(stats_v1.router, prefix="/api/v1/stats", tags=["Statistics"])
     app.include_router(review_v1.router, prefix="/api/v1/review", tags=["Review"])
+    app.include_router(generation_jobs_v1.router, prefix="/api/v1/generation-jobs", tags=["Generation Jobs"])
+    app.include_router(
+        regeneration_sweeps_v1.router, prefix="/api/v1/regeneration-sweeps", tags=["Regeneration Sweeps"]
+    )
 
     @app.get("/", tags=["Root"])
     def read_root():
         return {"message": "歡迎使用 AI 資安資料審核系統 API"}
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        """Prometheus 格式的生成指標（每個模型的延遲、token 數、載入時間與錯誤數）"""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
         
     return app
 
@@ -0,0 +1,183 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 生成請求延遲的分桶（秒）：小模型在 CPU 上單次生成約 30–90 秒
+LATENCY_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+# 模型載入時間的分桶（秒）：已載入時通常只有數毫秒
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+# 提示詞評估時間的分桶（秒）：重用提示詞前綴快取時只需評估最後的 user 訊息
+PROMPT_EVAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+NANOSECONDS = 1_000_000_000
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class GenerationMetrics:
+    """
+    各模型的 Ollama 生成指標，以 Prometheus 文字格式輸出。
+
+    指標保存在本行程的記憶體中；多個 worker 行程時每個行程各自計數，
+    由 Prometheus 端加總。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self._requests: Dict[Tuple[str, str], int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._retries: Dict[Tuple[str, str], int] = {}
+        self._latency: Dict[str, _Histogram] = {}
+        self._load: Dict[str, _Histogram] = {}
+        self._prompt_eval: Dict[str, _Histogram] = {}
+        self._prompt_tokens: Dict[str, int] = {}
+        self._generated_tokens: Dict[str, int] = {}
+        self._prompt_eval_seconds: Dict[str, float] = {}
+        self._eval_seconds: Dict[str, float] = {}
+        self._tokens_per_second: Dict[str, float] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset_state()
+
+    def observe_response(self, model: str, latency: float, data: Dict[str, Any]) -> None:
+        """記錄一次成功的請求；data 為 Ollama 最後一個回應物件（含 eval_count 等欄位）"""
+        with self._lock:
+            self._increment(self._requests, (model, "success"))
+            self._latency.setdefault(model, _Histogram(LATENCY_BUCKETS)).observe(latency)
+
+            prompt_tokens = data.get("prompt_eval_count") or 0
+            generated_tokens = data.get("eval_count") or 0
+            eval_seconds = (data.get("eval_duration") or 0) / NANOSECONDS
+            self._increment(self._prompt_tokens, model, prompt_tokens)
+            self._increment(self._generated_tokens, model, generated_tokens)
+            self._increment(self._prompt_eval_seconds, model, (data.get("prompt_eval_duration") or 0) / NANOSECONDS)
+            self._increment(self._eval_seconds, model, eval_seconds)
+            if generated_tokens and eval_seconds:
+                self._tokens_per_second[model] = generated_tokens / eval_seconds
+            if data.get("prompt_eval_duration") is not None:
+                self._prompt_eval.setdefault(model, _Histogram(PROMPT_EVAL_BUCKETS)).observe(
+                    data["prompt_eval_duration"] / NANOSECONDS
+                )
+            if data.get("load_duration") is not None:
+                self._load.setdefault(model, _Histogram(LOAD_BUCKETS)).observe(data["load_duration"] / NANOSECONDS)
+
+    def observe_model_load(self, model: str, load_seconds: float) -> None:
+        """記錄預先載入模型（warm-up）的載入時間"""
+        with self._lock:
+            self._load.setdefault(model, _Histogram(LOAD_BUCKETS)).observe(load_seconds)
+
+    def observe_error(self, model: str, error_type: str, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self._increment(self._requests, (model, "error"))
+            self._increment(self._errors, (model, error_type))
+            if latency is not None:
+                self._latency.setdefault(model, _Histogram(LATENCY_BUCKETS)).observe(latency)
+
+    def observe_retry(self, model: str, error_type: str) -> None:
+        with self._lock:
+            self._increment(self._retries, (model, error_type))
+
+    def observe_cache_hit(self, model: str) -> None:
+        with self._lock:
+            self._increment(self._requests, (model, "cache_hit"))
+
+    @staticmethod
+    def _increment(counter: Dict, key, amount=1) -> None:
+        counter[key] = counter.get(key, 0) + amount
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def scalar(name, help_text, values, label_names, metric_type="counter"):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for key, value in sorted(values.items()):
+                label_values = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{name}{_labels(label_names, label_values)} {_format_value(value)}")
+
+        def histogram(name, help_text, histograms):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for model, hist in sorted(histograms.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{name}_bucket{_labels(('model', 'le'), (model, _format_value(bound)))} {count}")
+                lines.append(f"{name}_bucket{_labels(('model', 'le'), (model, '+Inf'))} {hist.count}")
+                lines.append(f"{name}_sum{_labels(('model',), (model,))} {_format_value(hist.sum)}")
+                lines.append(f"{name}_count{_labels(('model',), (model,))} {hist.count}")
+
+        with self._lock:
+            scalar("ollama_requests_total", "Ollama chat requests by outcome (success, error, cache_hit).",
+                    self._requests, ("model", "outcome"))
+            scalar("ollama_request_errors_total", "Failed Ollama chat requests by error type.",
+                    self._errors, ("model", "error_type"))
+            scalar("ollama_request_retries_total", "Ollama chat requests retried after a transient error.",
+                    self._retries, ("model", "error_type"))
+            histogram("ollama_request_duration_seconds", "End-to-end Ollama chat request latency.", self._latency)
+            histogram("ollama_model_load_duration_seconds", "Time Ollama spent loading the model (load_duration).", self._load)
+            histogram("ollama_prompt_eval_seconds", "Prompt evaluation time per request (prompt_eval_duration).",
+                      self._prompt_eval)
+            scalar("ollama_prompt_tokens_total", "Prompt tokens evaluated (prompt_eval_count).",
+                    self._prompt_tokens, ("model",))
+            scalar("ollama_generated_tokens_total", "Tokens generated (eval_count).",
+                    self._generated_tokens, ("model",))
+            scalar("ollama_prompt_eval_duration_seconds_total", "Time spent evaluating prompts (prompt_eval_duration).",
+                    self._prompt_eval_seconds, ("model",))
+            scalar("ollama_eval_duration_seconds_total", "Time spent generating tokens (eval_duration).",
+                    self._eval_seconds, ("model",))
+            scalar("ollama_tokens_per_second", "Generation speed of the most recent request (eval_count / eval_duration).",
+                    self._tokens_per_second, ("model",), metric_type="gauge")
+
+        return "\n".join(lines) + "\n"
+
+
+generation_metrics = GenerationMetrics()
+
+
+def render_metrics() -> str:
+    """/metrics 端點的完整內容：生成指標與生成快取計數"""
+    from app.services.generation_cache import generation_cache
+
+    lines = [generation_metrics.render().rstrip("\n")]
+    cache_stats = generation_cache.stats()
+    for name, key, metric_type, help_text in (
+        ("ollama_generation_cache_hits_total", "hits", "counter", "Generation cache hits."),
+        ("ollama_generation_cache_misses_total", "misses", "counter", "Generation cache misses."),
+        ("ollama_generation_cache_evictions_total", "evictions", "counter", "Generation cache entries evicted."),
+        ("ollama_generation_cache_entries", "entries", "gauge", "Entries in the generation cache."),
+        ("ollama_generation_cache_size_bytes", "size_bytes", "gauge", "Size of cached generation results."),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {_format_value(cache_stats[key])}")
+    return "\n".join(lines) + "\n"
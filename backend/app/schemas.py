@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, field_validator
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Union
 from datetime import datetime
 import re
 
@@ -76,6 +76,16 @@ class RawDataset(RawDatasetBase):
     # history is already in Base
     model_config = ConfigDict(from_attributes=True)
 
+class DatasetRevision(BaseModel):
+    revision: int
+    instruction: Optional[str] = None
+    input: Optional[str] = None
+    output: str
+    model_name: Optional[str] = None
+    rejection_snapshot: Optional[Dict[str, Any]] = None  # 被取代時的審核計數與拒絕原因
+    created_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
 class ReviewLogInDB(BaseModel):
     reviewer_id: int
     
@@ -86,6 +96,10 @@ class RawDatasetWithStats(RawDataset):
     reject_count: int
     review_logs: List[ReviewLogInDB] = []
 
+class RawDatasetPage(BaseModel):
+    items: List[RawDatasetWithStats]
+    next_cursor: Optional[int] = None  # 下一頁的 after_id，沒有下一頁時為 None
+
 
 # --- FinalDataset Schemas ---
 class FinalDatasetBase(BaseModel):
@@ -108,6 +122,13 @@ class ReviewCreate(BaseModel):
     comment: Optional[str] = None # For custom, detailed text
     rejection_reason_ids: Optional[List[int]] = [] # List of IDs for common reasons
 
+    @field_validator('result')
+    def result_is_accept_or_reject(cls, v):
+        result = v.upper()
+        if result not in ('ACCEPT', 'REJECT'):
+            raise ValueError('Result must be ACCEPT or REJECT')
+        return result
+
 # --- Rejection Reason Schemas ---
 class RejectionReasonBase(BaseModel):
     label: str
@@ -142,11 +163,18 @@ class SystemSettingsUpdate(BaseModel):
 
 
 # --- All Settings Schema ---
+class OllamaEndpointSetting(BaseModel):
+    url: str
+    weight: float = 1.0  # 分配請求時的權重
+    models: List[str] = []  # 此端點提供的模型，空列表表示不限制（以 /api/tags 為準）
+
 class AllSettings(BaseModel):
     rejection_threshold: int
     approval_threshold: int
     ollama_models: List[str]  # 修改：從單一模型改為多模型列表
-    ollama_url: str
+    ollama_url: Union[str, List[Union[str, OllamaEndpointSetting]]]  # 單一網址或多個端點
+    ollama_model_concurrency: Dict[str, int] = {}  # 每個模型的並行生成上限
+    ollama_model_keep_alive: Dict[str, Union[str, int]] = {}  # 每個模型閒置後保留在記憶體中的時間，例如 "1h"、-1
 
 # --- Ollama Schemas ---
 class OllamaPullRequest(BaseModel):
@@ -204,17 +232,23 @@ class LegalArticle(LegalArticleBase):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+class LegalArticleImportResult(BaseModel):
+    imported_count: int
+    ids: List[int]
+
 # --- Dataset Generation Schemas ---
 
 class GenerateFromRegulationsRequest(BaseModel):
     selected_article_ids: List[int]
     model_name: Optional[str] = None  # 新增：指定使用的模型名稱
+    bypass_cache: bool = False  # 略過生成快取，需要不同結果時使用
 
 class BatchGenerateFromRegulationsRequest(BaseModel):
     selected_article_ids: List[int]
     model_name: Optional[str] = None  # 指定使用的模型名稱
     batch_size: int = 1  # 批量生成數量，預設為1
     random_selection: bool = True  # 是否隨機選擇法規，預設為True
+    bypass_cache: bool = False  # 略過生成快取；同一批次重複使用相同法規時可避免得到相同結果
 
 class GeneratedDataset(BaseModel):
     instruction: str
@@ -229,3 +263,67 @@ class BatchGeneratedDataset(BaseModel):
     total_generated: int
     success_count: int
     failed_count: int
+
+# --- Generation Job Schemas ---
+class GenerationJob(BaseModel):
+    id: int
+    status: str
+    model_name: str
+    total_items: int
+    completed_items: int
+    failed_items: int
+    bypass_cache: bool = False
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class GenerationJobItem(BaseModel):
+    id: int
+    item_index: int
+    status: str
+    result: Optional[GeneratedDataset] = None
+    error: Optional[str] = None
+    sequence: Optional[int] = None  # 完成順序，對應進度串流的事件 id
+    completed_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class GenerationJobItemPage(BaseModel):
+    items: List[GenerationJobItem]
+    next_cursor: Optional[int] = None  # 下一頁的 after_index，沒有更多資料時為 None
+
+# --- Regeneration Sweep Schemas ---
+class RegenerationSweepFilters(BaseModel):
+    review_status: Optional[List[str]] = None  # 審核狀態，未指定時為 regenerating 以外的所有狀態
+    model_name: Optional[str] = None  # 生成資料集的模型
+    min_reject_count: Optional[int] = None  # 拒絕次數下限（含）
+    source: Optional[str] = None  # 來源法規標題包含的文字
+
+class RegenerationSweepCreate(BaseModel):
+    filters: RegenerationSweepFilters = RegenerationSweepFilters()
+    model_weights: Optional[Dict[str, float]] = None  # 目標模型分配 {模型: 權重}，未指定時由 worker 隨機選擇
+    max_concurrency: int = 2  # 此批次同時執行的重新生成數上限，不可超過 REGENERATION_WORKERS
+    limit: int = 500  # 最多排入佇列的資料集數
+
+class RegenerationSweepModelProgress(BaseModel):
+    pending: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+
+class RegenerationSweep(BaseModel):
+    id: int
+    filters: Dict[str, Any] = {}
+    model_weights: Optional[Dict[str, float]] = None
+    max_concurrency: int
+    matched_items: int
+    total_items: int
+    created_at: Optional[datetime] = None
+    pending: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    finished: bool = False
+    by_model: Dict[str, RegenerationSweepModelProgress] = {}  # 未指定模型的工作以 "auto" 計
+    elapsed_seconds: float = 0.0  # 第一筆開始執行到最後一筆完成（或現在）
+    items_per_minute: float = 0.0  # 每分鐘完成（含失敗）的工作數
+    estimated_remaining_seconds: Optional[float] = None
@@ -0,0 +1,197 @@
+import asyncio
+import random
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.services.ollama_client import OllamaClient
+from app.services.ollama_pool import normalize_model_name, ollama_pool, parse_endpoints
+
+
+async def resolve_generation_target(db: AsyncSession, model_name: Optional[str] = None) -> Tuple[str, str]:
+    """取得 Ollama 主機與要使用的模型：指定的模型，否則為設定中的第一個模型"""
+    url_setting = await crud.get_setting_async(db, "ollama_url")
+    ollama_url = url_setting.value if url_setting else "http://ollama:11434"
+
+    if not model_name:
+        # 從多模型設定中獲取第一個模型
+        models_setting = await crud.get_setting_async(db, "ollama_models")
+        if models_setting and models_setting.value and len(models_setting.value) > 0:
+            model_name = models_setting.value[0]  # 使用第一個模型作為預設
+        else:
+            model_name = "llama3"  # 預設模型
+
+    return ollama_url, model_name
+
+
+async def get_generation_concurrency(db: AsyncSession, ollama_url: Any, model_name: str) -> int:
+    """
+    批量生成的並行上限：ollama_model_concurrency 為單一 Ollama 端點的上限，
+    設定多個端點時乘上目前可處理此模型的端點數
+    """
+    per_endpoint = await crud.get_model_concurrency_async(db, model_name)
+    return per_endpoint * ollama_pool.serving_count(parse_endpoints(ollama_url), model_name)
+
+
+class ModelLimiter:
+    """
+    可調整上限的並行限制（用法同 asyncio.Semaphore：async with limiter）。
+
+    與 semaphore 不同，上限改變時沿用同一個執行中計數：上限調低時，
+    已在執行的請求仍計入，新的請求要等執行中數量低於新上限才會放行；調高時立即喚醒等待中的請求。
+    """
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def resize(self, limit: int) -> None:
+        self._limit = max(1, limit)
+        self._wake()
+
+    async def acquire(self) -> None:
+        if not self._waiters and self._in_flight < self._limit:
+            self._in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分到名額才被取消：交還給下一個等待者
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # 名額直接交給等待最久的請求，避免新來的請求插隊
+        while self._waiters and self._in_flight < self._limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._in_flight += 1
+                future.set_result(None)
+
+    async def __aenter__(self) -> "ModelLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class ModelConcurrencyLimits:
+    """
+    行程內共用的逐模型並行上限。
+
+    即時批量生成、背景生成工作與重新生成 worker 都從這裡取得同一個 ModelLimiter，
+    多個批次同時進行時送往 Ollama 的請求數仍不超過 get_generation_concurrency。
+    每個模型只有一個 limiter，上限改變時（設定或可用端點數變動）就地調整，執行中的請求持續計入。
+    limiter 只能在建立它的事件迴圈中使用，事件迴圈不同時（例如測試）才會重新建立。
+    """
+
+    def __init__(self):
+        self._limits: Dict[str, Tuple[asyncio.AbstractEventLoop, ModelLimiter]] = {}
+
+    def get(self, model_name: str, concurrency: int) -> ModelLimiter:
+        key = normalize_model_name(model_name)
+        loop = asyncio.get_running_loop()
+        current = self._limits.get(key)
+        if current is None or current[0] is not loop:
+            current = (loop, ModelLimiter(concurrency))
+            self._limits[key] = current
+        else:
+            current[1].resize(concurrency)
+        return current[1]
+
+
+model_concurrency_limits = ModelConcurrencyLimits()
+
+
+async def get_model_limit(db: AsyncSession, ollama_url: Any, model_name: str) -> ModelLimiter:
+    """取得模型共用的並行上限，並依目前的設定與可用端點數調整"""
+    concurrency = await get_generation_concurrency(db, ollama_url, model_name)
+    return model_concurrency_limits.get(model_name, concurrency)
+
+
+async def load_batch_articles(db: AsyncSession, selected_article_ids: List[int], random_selection: bool) -> List[Dict[str, Any]]:
+    """取得批量生成可用的法規：啟用隨機選擇且未選擇法規時使用所有法規"""
+    if random_selection and not selected_article_ids:
+        articles = await crud.get_all_legal_articles_async(db)
+    else:
+        articles = await crud.get_legal_articles_by_ids_async(db, selected_article_ids)
+    return [
+        {
+            'id': article.id,
+            'title': article.title,
+            'number': article.number,
+            'content': article.content
+        }
+        for article in articles
+    ]
+
+
+def select_batch_articles(all_articles: List[Dict[str, Any]], batch_size: int, random_selection: bool) -> List[List[Dict[str, Any]]]:
+    """為批量中的每一筆決定使用的法規"""
+    selections = []
+    for _ in range(batch_size):
+        if random_selection and len(all_articles) > 1:
+            # Randomly select 1-3 articles for each generation
+            num_articles = random.randint(1, min(3, len(all_articles)))
+            selections.append(random.sample(all_articles, num_articles))
+        else:
+            # Use all selected articles
+            selections.append(all_articles)
+    return selections
+
+
+def format_articles(articles: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """回傳 (來源標題, 提供給模型的條文內容)"""
+    article_titles = []
+    article_contents = []
+    for article in articles:
+        article_titles.append(f"{article['title']}第{article['number']}條")
+        article_contents.append(f"{article['title']}第{article['number']}條：{article['content']}")
+    return article_titles, article_contents
+
+
+async def generate_from_articles(ollama_client: OllamaClient, articles: List[Dict[str, Any]]) -> schemas.GeneratedDataset:
+    """以指定法規生成一筆資料，並附上來源與模型名稱"""
+    article_titles, article_contents = format_articles(articles)
+
+    generated_data = await ollama_client.generate_from_regulations(article_contents)
+
+    generated_data["source"] = article_titles
+    generated_data["model_name"] = ollama_client.model
+    return schemas.GeneratedDataset(**generated_data)
+
+
+async def stream_from_articles(ollama_client: OllamaClient, articles: List[Dict[str, Any]]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    generate_from_articles 的串流版本：逐段產生 ("token", 文字)，
+    生成結束後產生 ("result", GeneratedDataset)
+    """
+    article_titles, article_contents = format_articles(articles)
+
+    async for kind, value in ollama_client.stream_from_regulations(article_contents):
+        if kind == "result":
+            value["source"] = article_titles
+            value["model_name"] = ollama_client.model
+            value = schemas.GeneratedDataset(**value)
+        yield kind, value
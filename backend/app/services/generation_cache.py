@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+def make_cache_key(payload: Dict[str, Any]) -> str:
+    """
+    以 (模型, 訊息, 輸出格式, 生成參數) 計算快取鍵。
+    stream、keep_alive 等不影響生成結果的欄位不列入。
+    """
+    key_fields = {
+        "model": payload.get("model"),
+        "messages": payload.get("messages"),
+        "format": payload.get("format"),
+        "options": payload.get("options"),
+        "think": payload.get("think"),
+    }
+    canonical = json.dumps(key_fields, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Ollama 生成結果的磁碟快取（SQLite）。
+
+    項目超過 ttl_seconds 即視為過期；總大小超過 max_bytes 時，
+    依最後存取時間淘汰最久未使用的項目（LRU）。
+    命中與未命中次數為本行程的計數。
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generation_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_generation_cache_accessed_at ON generation_cache (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM generation_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE generation_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str, model: Optional[str] = None) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, model, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds > 0:
+            self.evictions += conn.execute(
+                "DELETE FROM generation_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM generation_cache").fetchone()[0]
+        while total_size > self.max_bytes:
+            # 依存取時間由舊到新淘汰，直到總大小回到上限以內
+            rows = conn.execute(
+                "SELECT key, size FROM generation_cache ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            evicted_keys = []
+            for key, size in rows:
+                evicted_keys.append(key)
+                total_size -= size
+                if total_size <= self.max_bytes:
+                    break
+            conn.executemany("DELETE FROM generation_cache WHERE key = ?", [(key,) for key in evicted_keys])
+            self.evictions += len(evicted_keys)
+
+    def clear(self) -> int:
+        with self._lock:
+            return self._connect().execute("DELETE FROM generation_cache").rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size_bytes = 0, 0
+        if self.enabled:
+            with self._lock:
+                entries, size_bytes = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generation_cache"
+                ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+generation_cache = GenerationCache(
+    path=settings.generation_cache_path,
+    max_bytes=settings.generation_cache_max_bytes,
+    ttl_seconds=settings.generation_cache_ttl_seconds,
+    enabled=settings.generation_cache_enabled,
+)
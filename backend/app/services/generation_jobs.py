@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from typing import Dict
+
+from app import crud
+from app.database import models
+from app.database.base import AsyncSessionLocal
+from app.services.dataset_generation import (
+    generate_from_articles,
+    get_model_limit,
+    resolve_generation_target,
+)
+from app.services.ollama_client import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJobRunner:
+    """
+    在背景執行批量生成工作。
+
+    每筆項目完成時立即以獨立的 Session 寫入 generation_job_items，
+    因此進度可以即時查詢，行程重啟後也只需補做仍在等待中的項目。
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def start(self, job_id: int) -> None:
+        if self.is_running(job_id):
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    def is_running(self, job_id: int) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    def cancel(self, job_id: int) -> None:
+        """停止本行程中的工作；資料庫狀態由 crud.cancel_generation_job_async 負責"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def wait(self, job_id: int) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def resume_unfinished(self) -> None:
+        """啟動時接續先前中斷（pending / running）的工作"""
+        async with self.session_factory() as db:
+            job_ids = await crud.get_unfinished_generation_job_ids_async(db)
+        for job_id in job_ids:
+            self.start(job_id)
+
+    async def shutdown(self) -> None:
+        """停止所有工作但不更改狀態，下次啟動時會被接續"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _is_cancelled(self, job_id: int) -> bool:
+        async with self.session_factory() as db:
+            job = await crud.get_generation_job_async(db, job_id)
+            return job is None or job.status == models.GenerationJobStatus.CANCELLED
+
+    async def _run(self, job_id: int) -> None:
+        try:
+            async with self.session_factory() as db:
+                job = await crud.get_generation_job_async(db, job_id)
+                if job is None or job.status not in (models.GenerationJobStatus.PENDING, models.GenerationJobStatus.RUNNING):
+                    return
+                if job.status == models.GenerationJobStatus.PENDING and not await crud.start_generation_job_async(db, job_id):
+                    return
+                ollama_url, model_name = await resolve_generation_target(db, job.model_name)
+                # 與其他批次及重新生成共用模型的並行上限
+                model_limit = await get_model_limit(db, ollama_url, model_name)
+                keep_alive = await crud.get_model_keep_alive_async(db, model_name)
+                use_cache = not job.bypass_cache
+                pending_items = [
+                    (item.id, item.articles)
+                    for item in await crud.get_pending_generation_job_items_async(db, job_id)
+                ]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("generation job failed to start job_id=%s error=%s", job_id, e)
+            async with self.session_factory() as db:
+                await crud.finish_generation_job_async(db, job_id, status=models.GenerationJobStatus.FAILED)
+            return
+
+        ollama_client = OllamaClient(host=ollama_url, model=model_name, use_cache=use_cache, keep_alive=keep_alive)
+
+        async def run_item(item_id, articles):
+            async with model_limit:
+                # 取消可能來自其他 worker 行程，開始生成前再確認一次
+                if await self._is_cancelled(job_id):
+                    return
+                try:
+                    dataset = await generate_from_articles(ollama_client, articles)
+                    result, error = dataset.model_dump(), None
+                except Exception as e:
+                    logger.warning("generation job item failed job_id=%s item_id=%s error=%s", job_id, item_id, e)
+                    result, error = None, str(e) or type(e).__name__
+
+            async with self.session_factory() as db:
+                await crud.complete_generation_job_item_async(db, job_id, item_id, result=result, error=error)
+
+        results = await asyncio.gather(
+            *(run_item(item_id, articles) for item_id, articles in pending_items),
+            return_exceptions=True
+        )
+        for (item_id, _), result in zip(pending_items, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "generation job item could not be saved job_id=%s item_id=%s error=%s",
+                    job_id, item_id, result, exc_info=result
+                )
+
+        async with self.session_factory() as db:
+            await crud.finish_generation_job_async(db, job_id)
+
+
+generation_job_runner = GenerationJobRunner()
@@ -0,0 +1,45 @@
+from typing import Dict
+
+import httpx
+
+from app.config import settings
+
+
+class OllamaHTTPClientRegistry:
+    """
+    依 Ollama 主機共用 httpx.AsyncClient，讓請求重複使用連線池與 keep-alive 連線。
+    由應用程式 lifespan 在關閉時統一釋放。
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def _normalize_host(host: str) -> str:
+        return host.rstrip("/")
+
+    def get(self, host: str) -> httpx.AsyncClient:
+        host = self._normalize_host(host)
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=host,
+                timeout=settings.ollama_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.ollama_max_connections,
+                    max_keepalive_connections=settings.ollama_max_keepalive_connections,
+                    keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+                ),
+                http2=settings.ollama_http2,
+            )
+            self._clients[host] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+ollama_http_clients = OllamaHTTPClientRegistry()
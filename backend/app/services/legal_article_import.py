@@ -0,0 +1,89 @@
+import io
+import json
+from typing import Any, BinaryIO, Iterator
+
+from app import schemas
+
+READ_SIZE = 64 * 1024
+
+
+def _iter_jsonl(text_stream: io.TextIOBase) -> Iterator[Any]:
+    """逐行解析 JSONL，略過空白行"""
+    for line_number, line in enumerate(text_stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"第 {line_number} 行不是有效的 JSON: {e}")
+
+
+def _iter_json_array(text_stream: io.TextIOBase) -> Iterator[Any]:
+    """逐一解析 JSON 陣列中的元素，只在記憶體中保留尚未解析的片段"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = text_stream.read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    while True:
+        # 略過空白與元素之間的逗號
+        while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ",")):
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("JSON 陣列不完整")
+            fill()
+            continue
+
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("JSON 檔案必須是法規條文的陣列")
+            started = True
+            position += 1
+            continue
+
+        if buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"JSON 格式錯誤: {e}")
+            fill()
+            continue
+        # 元素剛好在緩衝區結尾時，數字等值可能被截斷，需再讀一段確認
+        if end == len(buffer) and not eof:
+            fill()
+            continue
+        position = end
+        yield item
+
+
+def iter_legal_articles(file: BinaryIO, filename: str = "") -> Iterator[schemas.LegalArticleCreate]:
+    """
+    串流解析上傳的法規條文檔案（JSON 陣列或 JSONL），逐筆產生 LegalArticleCreate。
+    """
+    text_stream = io.TextIOWrapper(file, encoding="utf-8-sig")
+    try:
+        if filename.lower().endswith((".jsonl", ".ndjson")):
+            items = _iter_jsonl(text_stream)
+        else:
+            items = _iter_json_array(text_stream)
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError("每筆法規條文必須是 JSON 物件")
+            yield schemas.LegalArticleCreate(**item)
+    finally:
+        # 避免關閉 TextIOWrapper 時一併關閉上傳檔案
+        text_stream.detach()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import httpx
+
+from app import crud
+from app.config import settings
+from app.database.base import AsyncSessionLocal
+from app.metrics import generation_metrics
+from app.services.http_clients import ollama_http_clients
+from app.services.ollama_errors import to_ollama_error
+from app.services.ollama_pool import normalize_model_name, parse_endpoints
+
+logger = logging.getLogger(__name__)
+
+NANOSECONDS = 1_000_000_000
+
+
+async def _load_request(url: str, model: str, keep_alive: Union[str, int]) -> Dict[str, Any]:
+    """
+    對 /api/generate 送出不含提示詞的請求：Ollama 只載入（或卸載）模型而不生成內容，
+    並依 keep_alive 決定模型保留在記憶體中的時間（0 表示立即卸載）
+    """
+    response = await ollama_http_clients.get(url).post(
+        "/api/generate", json={"model": model, "keep_alive": keep_alive}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def warm_up_model(url: str, model: str, keep_alive: Union[str, int]) -> Dict[str, Any]:
+    """載入一個模型並回傳耗時；模型已載入時 load_duration 通常只有數毫秒"""
+    started = time.perf_counter()
+    try:
+        data = await _load_request(url, model, keep_alive)
+    except (httpx.HTTPError, ValueError) as e:
+        error = to_ollama_error(e)
+        logger.warning("ollama model warm-up failed model=%s host=%s error=%s", model, url, error)
+        return {"url": url, "model": model, "status": "failed", "error": str(error)}
+
+    elapsed = time.perf_counter() - started
+    load_seconds = (data.get("load_duration") or 0) / NANOSECONDS
+    generation_metrics.observe_model_load(model, load_seconds)
+    logger.info(
+        "ollama model warmed up model=%s host=%s load_duration=%.2fs elapsed=%.2fs keep_alive=%s",
+        model, url, load_seconds, elapsed, keep_alive
+    )
+    return {
+        "url": url,
+        "model": model,
+        "status": "loaded",
+        "load_seconds": round(load_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "keep_alive": keep_alive,
+    }
+
+
+async def unload_model(url: str, model: str) -> Dict[str, Any]:
+    """以 keep_alive=0 要求 Ollama 立即卸載模型，釋放記憶體"""
+    try:
+        await _load_request(url, model, 0)
+    except (httpx.HTTPError, ValueError) as e:
+        error = to_ollama_error(e)
+        logger.warning("ollama model unload failed model=%s host=%s error=%s", model, url, error)
+        return {"url": url, "model": model, "status": "failed", "error": str(error)}
+    logger.info("ollama model unloaded model=%s host=%s", model, url)
+    return {"url": url, "model": model, "status": "unloaded"}
+
+
+class ModelWarmup:
+    """
+    在啟動時與 ollama_models 設定變更後預先載入模型，避免第一次生成時才付出載入時間。
+
+    同一端點上的模型依序載入，避免同時載入多個模型超出記憶體；不同端點則同時進行。
+    最近一次的結果保存在 last_report，供 GET /api/v1/ollama/warmup 查詢。
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._lock = asyncio.Lock()
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    async def run(self, unload_models: Iterable[str] = ()) -> Dict[str, Any]:
+        """載入設定中的所有模型；unload_models 為要從記憶體卸載的模型（例如剛從列表移除的模型）"""
+        async with self._lock:
+            async with self._session_factory() as db:
+                url_setting = await crud.get_setting_async(db, "ollama_url")
+                models_setting = await crud.get_setting_async(db, "ollama_models")
+                model_names = list(models_setting.value or []) if models_setting else []
+                keep_alive = {name: await crud.get_model_keep_alive_async(db, name) for name in model_names}
+
+            endpoints = parse_endpoints(url_setting.value if url_setting else None)
+            configured = {normalize_model_name(name) for name in model_names}
+            # 仍在列表中的模型不卸載
+            unload_models = [name for name in unload_models if normalize_model_name(name) not in configured]
+
+            started = time.time()
+
+            async def process_endpoint(endpoint) -> List[Dict[str, Any]]:
+                results = []
+                for name in unload_models:
+                    if endpoint.serves(name):
+                        results.append(await unload_model(endpoint.url, name))
+                for name in model_names:
+                    if endpoint.serves(name):
+                        results.append(await warm_up_model(endpoint.url, name, keep_alive[name]))
+                return results
+
+            per_endpoint = await asyncio.gather(*(process_endpoint(endpoint) for endpoint in endpoints))
+            self.last_report = {
+                "started_at": started,
+                "finished_at": time.time(),
+                "results": [result for results in per_endpoint for result in results],
+            }
+            return self.last_report
+
+    async def run_safely(self, unload_models: Iterable[str] = ()) -> None:
+        """背景執行用：記錄錯誤而不拋出"""
+        try:
+            await self.run(unload_models)
+        except Exception as e:
+            logger.error("ollama model warm-up failed: %s", e)
+
+
+model_warmup = ModelWarmup()
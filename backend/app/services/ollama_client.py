@@ -1,11 +1,33 @@
+import asyncio
 import httpx
-import os
 import json
-from typing import List, Dict, Any, Optional
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+
+from app.config import settings
+from app.metrics import generation_metrics
+from app.services.generation_cache import generation_cache, make_cache_key
+from app.services.http_clients import ollama_http_clients
+from app.services.ollama_errors import (
+    OllamaError,
+    OllamaHTTPError,
+    OllamaResponseError,
+    OllamaTimeoutError,
+    OllamaUnavailableError,
+    to_ollama_error,
+)
+from app.services.ollama_pool import OllamaEndpointConfig, ollama_pool, parse_endpoints
+from app.services.prompt_templates import SYSTEM_PROMPT, build_regulation_prompt, build_revision_prompt
 
 # OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://ollama:11434")
 OLLAMA_HOST = "http://localhost:11434"
 
+logger = logging.getLogger(__name__)
+
 # JSON Schema for structured outputs
 DATASET_SCHEMA = {
     "type": "object",
@@ -38,24 +60,116 @@ DATASET_SCHEMA = {
     "required": ["instruction", "output"]
 }
 
+def error_type(error: OllamaError) -> str:
+    """錯誤在指標與日誌中的分類"""
+    if isinstance(error, OllamaHTTPError):
+        return f"http_{error.status_code}"
+    if isinstance(error, OllamaTimeoutError):
+        return "timeout"
+    if isinstance(error, OllamaUnavailableError):
+        return "circuit_open"
+    if isinstance(error, OllamaResponseError):
+        return "ollama_error"
+    return "connection"
+
+
+def normalize_history(history: Any) -> List[List[str]]:
+    """驗證和修正 history 格式，只保留 [指令, 回答] 形式的項目"""
+    if not isinstance(history, list):
+        return []
+
+    corrected_history = []
+    for item in history:
+        if isinstance(item, list) and len(item) == 2:
+            # 正確的二維陣列格式
+            corrected_history.append(item)
+        elif isinstance(item, dict):
+            # 如果是物件，嘗試提取問題和回答
+            if "question" in item and "answer" in item:
+                corrected_history.append([item["question"], item["answer"]])
+            elif "instruction" in item and "output" in item:
+                corrected_history.append([item["instruction"], item["output"]])
+        # 字串或其他無法解析的格式，跳過
+    return corrected_history
+
+
+def parse_dataset_response(response: str, default_instruction: str, default_input: str) -> Dict[str, Any]:
+    """
+    將模型回傳的 JSON 文字解析為資料集欄位，缺少的欄位補上預設值；
+    無法解析時以整段回應作為 output。
+    """
+    try:
+        # Try to parse the response as JSON
+        result = json.loads(response)
+    except json.JSONDecodeError as e:
+        logger.warning("JSON parsing error: %s (response_chars=%d)", e, len(response))
+        logger.debug("Raw response: %s", response)
+        
+        # Fallback: return structured response
+        return {
+            "instruction": default_instruction,
+            "input": default_input,
+            "output": response.strip(),
+            "history": []
+        }
+
+    # Ensure all required fields are present
+    if "instruction" not in result:
+        result["instruction"] = default_instruction
+    if "input" not in result:
+        result["input"] = default_input
+    if "output" not in result:
+        result["output"] = "無法生成輸出內容"
+    result["history"] = normalize_history(result.get("history", []))
+    return result
+
+
+# 依法規生成時，模型回應缺少欄位所使用的預設值
+REGULATION_DEFAULT_INSTRUCTION = "請根據資安法規回答問題"
+REGULATION_DEFAULT_INPUT = "請提供資安相關的指導"
+
+
 class OllamaClient:
-    def __init__(self, host: str = OLLAMA_HOST, model: str = "llama3"):
-        self.host = host
+    def __init__(self,
+                 host: Union[str, List[Any]] = OLLAMA_HOST,
+                 model: str = "llama3",
+                 use_cache: bool = True,
+                 keep_alive: Union[str, int, None] = None):
+        # host 可為單一網址或 ollama_url 設定中的端點列表，多個端點時每次請求由 ollama_pool 分配
+        self.endpoints = parse_endpoints(host) or [OllamaEndpointConfig(OLLAMA_HOST)]
+        self.host = self.endpoints[0].url
         self.model = model
-        self.client = httpx.AsyncClient(base_url=self.host, timeout=300.0)  # 增加到 5 分鐘
+        self.client = ollama_http_clients.get(self.host)  # 依主機共用連線池
+        # 生成快取需另外以 GENERATION_CACHE_ENABLED 啟用；需要不同結果時傳入 use_cache=False
+        self.use_cache = use_cache and generation_cache.enabled
+        # 模型在最後一次請求後保留在記憶體中的時間（例如 "30m"、3600、-1 表示不卸載），
+        # 未指定時使用 OLLAMA_KEEP_ALIVE；保持載入才能重用提示詞快取
+        self.keep_alive = keep_alive if keep_alive is not None else settings.ollama_keep_alive
 
-    async def generate(self, prompt: str, history: List[Dict[str, Any]] = None, format_schema: Optional[Dict] = None) -> str:
-        """
-        Generates content using the Ollama API with optional structured output.
-        
-        Args:
-            prompt: The input prompt
-            history: Chat history
-            format_schema: Optional JSON schema for structured output
-        """
-        full_prompt = prompt
+    def _http_client(self, url: str) -> httpx.AsyncClient:
+        return self.client if url == self.host else ollama_http_clients.get(url)
+
+    async def _cache_get(self, payload: Dict[str, Any]) -> Optional[str]:
+        if not self.use_cache:
+            return None
+        return await asyncio.to_thread(generation_cache.get, make_cache_key(payload))
+
+    async def _cache_set(self, payload: Dict[str, Any], content: str) -> None:
+        if self.use_cache and content:
+            await asyncio.to_thread(generation_cache.set, make_cache_key(payload), content, self.model)
+
+    def _build_chat_payload(self,
+                            prompt: str,
+                            history: List[Dict[str, Any]] = None,
+                            format_schema: Optional[Dict] = None,
+                            stream: bool = False,
+                            system: Optional[str] = None) -> Dict[str, Any]:
         chat_history = []
 
+        # 固定的 system 訊息放在最前面，讓每次請求的提示詞前綴相同
+        if system:
+            chat_history.append({"role": "system", "content": system})
+
         if history:
             for item in history:
                 chat_history.append({
@@ -64,14 +178,16 @@ class OllamaClient:
                 })
         
         # Always add the current prompt as a user message
-        chat_history.append({"role": "user", "content": full_prompt})
+        chat_history.append({"role": "user", "content": prompt})
 
         payload = {
             "model": self.model,
             "messages": chat_history,
-            "stream": False,
+            "stream": stream,
             "think": False
         }
+        if self.keep_alive not in (None, ""):
+            payload["keep_alive"] = self.keep_alive
         
         # Add format parameter if schema is provided
         if format_schema:
@@ -79,33 +195,187 @@ class OllamaClient:
             payload["options"] = {
                 "json_schema": format_schema
             }
+        return payload
 
-        print(payload)
+    async def generate(self,
+                       prompt: str,
+                       history: List[Dict[str, Any]] = None,
+                       format_schema: Optional[Dict] = None,
+                       system: Optional[str] = None) -> str:
+        """
+        Generates content using the Ollama API with optional structured output.
+        Transient failures (connection errors, timeouts, 5xx) are retried with exponential backoff;
+        if they persist, or the request cannot be served, an OllamaError is raised.
+        
+        Args:
+            prompt: The input prompt
+            history: Chat history
+            format_schema: Optional JSON schema for structured output
+            system: Optional system message sent before the history and prompt
+        """
+        payload = self._build_chat_payload(prompt, history, format_schema, system=system)
+
+        cached = await self._cache_get(payload)
+        if cached is not None:
+            logger.debug("ollama chat cache hit model=%s", self.model)
+            generation_metrics.observe_cache_hit(self.model)
+            return cached
+
+        attempt = 0
+        while True:
+            try:
+                content = await self._chat(payload, len(prompt))
+                break
+            except OllamaError as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await self._backoff(e, attempt)
+                attempt += 1
+
+        await self._cache_set(payload, content)
+        return content
+
+    async def _chat(self, payload: Dict[str, Any], prompt_chars: int) -> str:
+        """送出一次 /api/chat 請求，失敗時拋出對應的 OllamaError"""
+        async with self._lease() as endpoint:
+            logger.debug("ollama chat request model=%s host=%s prompt_chars=%d", self.model, endpoint.url, prompt_chars)
+            started = time.perf_counter()
+            try:
+                response = await self._http_client(endpoint.url).post("/api/chat", json=payload)
+                response.raise_for_status()
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                error = to_ollama_error(e)
+                self._record_error(endpoint.url, error, time.perf_counter() - started)
+                raise error from e
+
+            self._record_success(endpoint.url, data, time.perf_counter() - started)
 
-        try:
-            print(f"Sending request to Ollama with prompt: {full_prompt[:200]}...")
-            response = await self.client.post("/api/chat", json=payload)
-            response.raise_for_status()
-            
-            data = response.json()
-            print("Received response from Ollama.")
-            print(data)
-            
             # Extract content from the response
             if "message" in data and "content" in data["message"]:
                 return data["message"]["content"].strip()
             elif "response" in data:
                 return data["response"].strip()
-            else:
-                return ""
-            
-        except httpx.HTTPStatusError as e:
-            print(f"Error response {e.response.status_code} while requesting {e.request.url!r}.")
-            # Handle specific errors if needed
-            return f"Error: Could not get a response from Ollama. Status: {e.response.status_code}"
-        except httpx.RequestError as e:
-            print(f"An error occurred while requesting {e.request.url!r}.")
-            return f"Error: Could not connect to Ollama. Details: {e}"
+            return ""
+
+    async def generate_stream(self,
+                              prompt: str,
+                              history: List[Dict[str, Any]] = None,
+                              format_schema: Optional[Dict] = None,
+                              system: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streams content from the Ollama API, yielding each chunk of the reply as it is produced.
+        Ollama sends one JSON object per line; the last one has "done": true.
+        Failures before the first chunk are retried like generate(); afterwards an OllamaError
+        is raised to the caller, since the chunks already yielded cannot be taken back.
+        A cached reply is yielded as a single chunk.
+        """
+        payload = self._build_chat_payload(prompt, history, format_schema, stream=True, system=system)
+
+        cached = await self._cache_get(payload)
+        if cached is not None:
+            logger.debug("ollama chat cache hit model=%s", self.model)
+            generation_metrics.observe_cache_hit(self.model)
+            yield cached
+            return
+
+        chunks = []
+        done = False
+        attempt = 0
+        while True:
+            try:
+                async for content, done in self._chat_stream(payload, len(prompt)):
+                    if content:
+                        chunks.append(content)
+                        yield content
+                break
+            except OllamaError as e:
+                if chunks or not self._should_retry(e, attempt):
+                    raise
+                await self._backoff(e, attempt)
+                attempt += 1
+
+        # 只快取完整結束的回應
+        if done:
+            await self._cache_set(payload, "".join(chunks).strip())
+
+    async def _chat_stream(self, payload: Dict[str, Any], prompt_chars: int) -> AsyncIterator[Tuple[str, bool]]:
+        """送出一次串流 /api/chat 請求，逐一產生 (內容, 是否結束)"""
+        async with self._lease() as endpoint:
+            logger.debug("ollama chat stream request model=%s host=%s prompt_chars=%d", self.model, endpoint.url, prompt_chars)
+            started = time.perf_counter()
+            try:
+                async with self._http_client(endpoint.url).stream("POST", "/api/chat", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if "error" in chunk:
+                            raise OllamaResponseError(chunk["error"])
+
+                        content = chunk.get("message", {}).get("content") or chunk.get("response") or ""
+                        if chunk.get("done"):
+                            # 最後一個物件帶有 eval_count 等統計欄位
+                            self._record_success(endpoint.url, chunk, time.perf_counter() - started)
+                            yield content, True
+                            break
+                        yield content, False
+            except (httpx.HTTPError, ValueError, OllamaResponseError) as e:
+                error = to_ollama_error(e)
+                self._record_error(endpoint.url, error, time.perf_counter() - started)
+                raise error from e
+
+    @asynccontextmanager
+    async def _lease(self) -> AsyncIterator[OllamaEndpointConfig]:
+        try:
+            async with ollama_pool.lease(self.endpoints, self.model) as endpoint:
+                yield endpoint
+        except OllamaUnavailableError as e:
+            generation_metrics.observe_error(self.model, "circuit_open")
+            logger.warning("ollama chat rejected model=%s error=%s", self.model, e)
+            raise
+
+    def _should_retry(self, error: OllamaError, attempt: int) -> bool:
+        return error.retryable and attempt < settings.ollama_max_retries
+
+    async def _backoff(self, error: OllamaError, attempt: int) -> None:
+        """重試前等待：base * 2^attempt（不超過上限），乘上 0.5–1 的隨機抖動避免同時重試"""
+        delay = min(settings.ollama_retry_backoff_max_seconds, settings.ollama_retry_backoff_seconds * 2 ** attempt)
+        delay *= random.uniform(0.5, 1.0)
+        generation_metrics.observe_retry(self.model, error_type(error))
+        logger.info(
+            "ollama chat retry model=%s attempt=%d delay=%.1fs error=%s",
+            self.model, attempt + 1, delay, error
+        )
+        await asyncio.sleep(delay)
+
+    def _record_success(self, url: str, data: Dict[str, Any], latency: float) -> None:
+        ollama_pool.report_success(url)
+        generation_metrics.observe_response(self.model, latency, data)
+        eval_count = data.get("eval_count") or 0
+        eval_seconds = (data.get("eval_duration") or 0) / 1e9
+        logger.info(
+            "ollama chat completed model=%s host=%s latency=%.2fs prompt_tokens=%s prompt_eval_duration=%.2fs eval_tokens=%s tokens_per_second=%.1f load_duration=%.2fs",
+            self.model,
+            url,
+            latency,
+            data.get("prompt_eval_count"),
+            (data.get("prompt_eval_duration") or 0) / 1e9,
+            data.get("eval_count"),
+            eval_count / eval_seconds if eval_seconds else 0.0,
+            (data.get("load_duration") or 0) / 1e9
+        )
+
+    def _record_error(self, url: str, error: OllamaError, latency: float) -> None:
+        # 暫時性錯誤代表端點可能有問題，計入斷路器；4xx 與模型回報的錯誤則不計入
+        if error.retryable:
+            ollama_pool.report_failure(url)
+        generation_metrics.observe_error(self.model, error_type(error), latency)
+        logger.warning(
+            "ollama chat failed model=%s host=%s error_type=%s latency=%.2fs error=%s",
+            self.model, url, error_type(error), latency, error
+        )
 
     async def generate_structured_dataset(self, 
                                         instruction: str, 
@@ -117,138 +387,16 @@ class OllamaClient:
         Generates a structured instruction tuning dataset using optimized prompt engineering.
         Returns a dictionary with instruction, input, and output fields.
         """
-        
-        # Build the optimized prompt with all context
-        prompt_parts = []
-        
-        # 1. System context and role definition
-        system_context = """你是一位資安專家，專門協助生成高品質的指令微調資料集。你的任務是根據提供的指令和上下文，生成符合資安法規要求的訓練資料。
-
-請嚴格按照指定的 JSON 格式輸出，不要包含任何其他文字。"""
-        
-        prompt_parts.append(system_context)
-        
-        # 2. Original instruction and input
-        prompt_parts.append("## 原始需求")
-        prompt_parts.append(f"指令: {instruction}")
-        if input_text:
-            prompt_parts.append(f"輸入: {input_text}")
-        
-        # 3. System prompt if provided
-        if system_prompt:
-            prompt_parts.append(f"系統提示: {system_prompt}")
-        
-        # 4. Source regulations
-        if source and len(source) > 0:
-            prompt_parts.append("## 法規依據")
-            for i, src in enumerate(source, 1):
-                prompt_parts.append(f"{i}. {src}")
-        
-        # 5. Rejection reasons if provided
-        if rejection_reasons and len(rejection_reasons) > 0:
-            prompt_parts.append("## 需要改進的地方")
-            for i, reason in enumerate(rejection_reasons, 1):
-                prompt_parts.append(f"{i}. {reason}")
-        
-        # 6. Final instruction
-        prompt_parts.append("## 生成要求")
-        prompt_parts.append("請根據上述資訊，生成一個完整的指令微調資料集項目。確保：")
-        prompt_parts.append("1. 指令清楚明確，要求模型回答資安相關問題")
-        prompt_parts.append("2. 輸入內容提供適當的上下文，提出與法規依據相關但不直接詢問法規內容的問題")
-        prompt_parts.append("3. 輸出內容準確、實用且依照法規依據回答")
-        prompt_parts.append("4. 如果提供了拒絕原因，請針對這些問題改進原始需求")
-        prompt_parts.append("5. 請以繁體中文回答")
-
-        # 7. One Shot Prompt
-        prompt_parts.append("## Few Shot Prompt")
-        prompt_parts.append("### 1")
-        prompt_parts.append("利用資通安全管理法第4條：為提升資通安全，政府應提供資源，整合民間及產業力量，提升全民資通安全意識，並推動下列事項：\n一、資通安全專業人才之培育。\n二、資通安全科技之研發、整合、應用、產學合作及國際交流合作。\n三、資通安全產業之發展。\n四、資通安全軟硬體技術規範、相關服務與審驗機制之發展。\n前項相關事項之推動，由主管機關以國家資通安全發展方案定之。")
-        prompt_parts.append("請根據上述法規，生成的指令微調資料集如下：")
-        prompt_parts.append("""\"instruction\": "政府會怎麼提升大家的資安能力？",
-\"input\": "政府會做什麼來保護我們的資安？",
-\"output\": "政府會做的事包括：培養資安人才、推動資安技術研發、發展資安產業，以及建立資安產品與服務的標準和審查制度。",
-\"history\": [
-  ["什麼是資通系統、資通安全和資通安全事件？", "資通系統就是像電腦、伺服器這些用來處理資料的系統。資通安全是保護這些系統不被駭客入侵或資料被偷。資通安全事件是指系統被攻擊、出錯或造成服務中斷的情況。"]
-]""")
-        prompt_parts.append("### 2")
-        prompt_parts.append("""利用資通安全責任等級分級辦法第5條：各機關有下列情形之一者，其資通安全責任等級為 B 級：
-一、業務涉及公務機關捐助或研發之國家核心科技資訊之安全維護與管理。
-二、業務涉及區域性或地區性民眾服務或共用性資通系統之維運。
-三、業務涉及區域性或地區性個人資料檔案之持有。
-四、涉及中央二級機關與所屬機關共用性資通系統維運。
-五、屬公務機關且業務涉及區域性或地區性之關鍵基礎設施事項。
-六、屬關鍵基礎設施提供者，經主管機關認定其資通系統失效將造成嚴重影響者。
-七、屬公立區域醫院或地區醫院。""")
-        prompt_parts.append("請根據上述法規，生成的指令微調資料集如下：")
-        prompt_parts.append("""\"instruction\": "什麼情況會被列為B級？",
-\"input\": "我機關有提供地方服務，會是B級嗎？",
-\"output\": "有可能。像是提供地方性的民眾服務、處理區域個資、或是地方政府的關鍵設施單位，通常會列為B級。",
-\"history\": []""")
-        
-        # Combine all parts
-        full_prompt = "\n\n".join(prompt_parts)
+        # 固定的提示詞前綴作為 system 訊息，原始需求與拒絕原因放在最後
+        prompt = build_revision_prompt(instruction, input_text, system_prompt, source, rejection_reasons)
         
         try:
             # Use structured output with JSON schema
-            response = await self.generate(full_prompt, format_schema=DATASET_SCHEMA)
-            
-            # Parse JSON response
-            try:
-                # Try to parse the response as JSON
-                result = json.loads(response)
-                
-                # Ensure all required fields are present
-                if "instruction" not in result:
-                    result["instruction"] = instruction
-                if "input" not in result:
-                    result["input"] = input_text or ""
-                if "output" not in result:
-                    result["output"] = "無法生成輸出內容"
-                if "history" not in result:
-                    result["history"] = []
-                
-                # 驗證和修正 history 格式
-                if "history" in result and isinstance(result["history"], list):
-                    corrected_history = []
-                    for item in result["history"]:
-                        if isinstance(item, list) and len(item) == 2:
-                            # 正確的二維陣列格式
-                            corrected_history.append(item)
-                        elif isinstance(item, str):
-                            # 如果是字串，可能是單一問題或回答，跳過
-                            continue
-                        elif isinstance(item, dict):
-                            # 如果是物件，嘗試提取問題和回答
-                            if "question" in item and "answer" in item:
-                                corrected_history.append([item["question"], item["answer"]])
-                            elif "instruction" in item and "output" in item:
-                                corrected_history.append([item["instruction"], item["output"]])
-                            else:
-                                # 無法解析的格式，跳過
-                                continue
-                        else:
-                            # 其他格式，跳過
-                            continue
-                    result["history"] = corrected_history
-                else:
-                    result["history"] = []
-                
-                return result
-                
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                print(f"Raw response: {response}")
-                
-                # Fallback: return structured response
-                return {
-                    "instruction": instruction,
-                    "input": input_text or "",
-                    "output": response.strip(),
-                    "history": []
-                }
+            response = await self.generate(prompt, format_schema=DATASET_SCHEMA, system=SYSTEM_PROMPT)
+            return parse_dataset_response(response, instruction, input_text or "")
                 
         except Exception as e:
-            print(f"Generation error: {e}")
+            logger.error("Generation error: %s", e)
             raise e
 
     async def generate_from_regulations(self, article_contents: List[str]) -> Dict[str, Any]:
@@ -256,111 +404,33 @@ class OllamaClient:
         Generate a complete dataset from legal regulations using generate_structured_dataset.
         Returns a dictionary with instruction, input, output, system, history, and source fields.
         """
-        
-        prompt = []
-        prompt.append("你是一位資安專家，專門協助生成高品質的指令微調資料集。你的任務是根據提供的法律條文，生成符合資安法規要求的訓練資料。")
-        prompt.append("請根據以下提供的法律條文，撰寫相對應的問答集：")
-        prompt.append("## 法律條文")
-        for i, article in enumerate(article_contents, 1):
-            prompt.append(f"{i}. {article}")
-        prompt.append("## 生成要求")
-        prompt.append("請根據上述資訊，生成一個完整的指令微調資料集項目。確保：")
-        prompt.append("1. 指令清楚明確，要求模型回答資安相關問題")
-        prompt.append("2. 輸入內容提供適當的上下文，提出與法規依據相關但不直接詢問法規內容的問題")
-        prompt.append("3. 輸出內容準確、實用且依照法規依據回答")
-        prompt.append("4. 如果提供了拒絕原因，請針對這些問題改進原始需求")
-        prompt.append("5. 請以繁體中文回答")
-        prompt.append("## Few Shot Prompt")
-        prompt.append("### 1")
-        prompt.append("利用資通安全管理法第4條：為提升資通安全，政府應提供資源，整合民間及產業力量，提升全民資通安全意識，並推動下列事項：\n一、資通安全專業人才之培育。\n二、資通安全科技之研發、整合、應用、產學合作及國際交流合作。\n三、資通安全產業之發展。\n四、資通安全軟硬體技術規範、相關服務與審驗機制之發展。\n前項相關事項之推動，由主管機關以國家資通安全發展方案定之。")
-        prompt.append("請根據上述法規，生成的指令微調資料集如下：")
-        prompt.append("""\"instruction\": "政府會怎麼提升大家的資安能力？",
-\"input\": "政府會做什麼來保護我們的資安？",
-\"output\": "政府會做的事包括：培養資安人才、推動資安技術研發、發展資安產業，以及建立資安產品與服務的標準和審查制度。",
-\"history\": [
-  ["什麼是資通系統、資通安全和資通安全事件？", "資通系統就是像電腦、伺服器這些用來處理資料的系統。資通安全是保護這些系統不被駭客入侵或資料被偷。資通安全事件是指系統被攻擊、出錯或造成服務中斷的情況。"]
-]""")
-        prompt.append("### 2")
-        prompt.append("""利用資通安全責任等級分級辦法第5條：各機關有下列情形之一者，其資通安全責任等級為 B 級：
-一、業務涉及公務機關捐助或研發之國家核心科技資訊之安全維護與管理。
-二、業務涉及區域性或地區性民眾服務或共用性資通系統之維運。
-三、業務涉及區域性或地區性個人資料檔案之持有。
-四、涉及中央二級機關與所屬機關共用性資通系統維運。
-五、屬公務機關且業務涉及區域性或地區性之關鍵基礎設施事項。
-六、屬關鍵基礎設施提供者，經主管機關認定其資通系統失效將造成嚴重影響者。
-七、屬公立區域醫院或地區醫院。""")
-        prompt.append("請根據上述法規，生成的指令微調資料集如下：")
-        prompt.append("""\"instruction\": "什麼情況會被列為B級？",
-\"input\": "我機關有提供地方服務，會是B級嗎？",
-\"output\": "有可能。像是提供地方性的民眾服務、處理區域個資、或是地方政府的關鍵設施單位，通常會列為B級。",
-\"history\": []""")
-
-        full_prompt = "\n\n".join(prompt)
+        prompt = build_regulation_prompt(article_contents)
         
         try:
             # Use structured output with JSON schema
-            response = await self.generate(full_prompt, format_schema=DATASET_SCHEMA)
-            print(response)
-            
-            # Parse JSON response
-            try:
-                # Try to parse the response as JSON
-                result = json.loads(response)
-                
-                # Ensure all required fields are present
-                if "instruction" not in result:
-                    result["instruction"] = "請根據資安法規回答問題"
-                if "input" not in result:
-                    result["input"] = "請提供資安相關的指導"
-                if "output" not in result:
-                    result["output"] = "無法生成輸出內容"
-                if "history" not in result:
-                    result["history"] = []
-                
-                # 驗證和修正 history 格式
-                if "history" in result and isinstance(result["history"], list):
-                    corrected_history = []
-                    for item in result["history"]:
-                        if isinstance(item, list) and len(item) == 2:
-                            # 正確的二維陣列格式
-                            corrected_history.append(item)
-                        elif isinstance(item, str):
-                            # 如果是字串，可能是單一問題或回答，跳過
-                            continue
-                        elif isinstance(item, dict):
-                            # 如果是物件，嘗試提取問題和回答
-                            if "question" in item and "answer" in item:
-                                corrected_history.append([item["question"], item["answer"]])
-                            elif "instruction" in item and "output" in item:
-                                corrected_history.append([item["instruction"], item["output"]])
-                            else:
-                                # 無法解析的格式，跳過
-                                continue
-                        else:
-                            # 其他格式，跳過
-                            continue
-                    result["history"] = corrected_history
-                else:
-                    result["history"] = []
-                
-                return result
-                
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                print(f"Raw response: {response}")
-                
-                # Fallback: return structured response
-                return {
-                    "instruction": "請根據資安法規回答問題",
-                    "input": "請提供資安相關的指導",
-                    "output": response.strip(),
-                    "history": []
-                }
+            response = await self.generate(prompt, format_schema=DATASET_SCHEMA, system=SYSTEM_PROMPT)
+            return parse_dataset_response(response, REGULATION_DEFAULT_INSTRUCTION, REGULATION_DEFAULT_INPUT)
             
         except Exception as e:
-            print(f"Generation error: {e}")
+            logger.error("Generation error: %s", e)
             raise e
 
+    async def stream_from_regulations(self, article_contents: List[str]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of generate_from_regulations.
+        Yields ("token", text) for each chunk as the model produces it, then a single
+        ("result", dict) once the stream completes and the accumulated JSON is parsed.
+        """
+        prompt = build_regulation_prompt(article_contents)
+
+        chunks = []
+        async for chunk in self.generate_stream(prompt, format_schema=DATASET_SCHEMA, system=SYSTEM_PROMPT):
+            chunks.append(chunk)
+            yield "token", chunk
+
+        response = "".join(chunks).strip()
+        yield "result", parse_dataset_response(response, REGULATION_DEFAULT_INSTRUCTION, REGULATION_DEFAULT_INPUT)
+
 # Example of how to use it (optional, for direct testing)
 async def main():
     client = OllamaClient(model="qwen3:1.7b")
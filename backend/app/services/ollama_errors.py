@@ -0,0 +1,69 @@
+from typing import Optional
+
+import httpx
+
+
+class OllamaError(RuntimeError):
+    """呼叫 Ollama 失敗；retryable 表示稍後重試可能成功"""
+
+    retryable = False
+
+
+class OllamaConnectionError(OllamaError):
+    """無法連線到 Ollama（連線被拒、DNS 失敗、連線中斷等）"""
+
+    retryable = True
+
+
+class OllamaTimeoutError(OllamaError):
+    """等待 Ollama 回應逾時"""
+
+    retryable = True
+
+
+class OllamaHTTPError(OllamaError):
+    """Ollama 回傳錯誤狀態碼；5xx 視為暫時性錯誤"""
+
+    def __init__(self, status_code: int, detail: Optional[str] = None):
+        self.status_code = status_code
+        self.detail = detail
+        message = f"Ollama returned HTTP {status_code}"
+        super().__init__(f"{message}: {detail}" if detail else message)
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code >= 500
+
+
+class OllamaResponseError(OllamaError):
+    """Ollama 在回應內容中回報的錯誤（例如模型不存在），或回應無法解析"""
+
+
+class OllamaUnavailableError(OllamaError):
+    """斷路器開啟：所有可處理此模型的端點都暫時停用，請求不會送出"""
+
+    def __init__(self, model: str, retry_after: float):
+        self.model = model
+        self.retry_after = retry_after
+        super().__init__(f"No Ollama endpoint available for model {model}; retry in {retry_after:.0f}s")
+
+
+def _error_detail(response: httpx.Response) -> Optional[str]:
+    try:
+        return response.json().get("error")
+    except Exception:
+        # 串流回應的內容尚未讀取，或不是 JSON
+        return None
+
+
+def to_ollama_error(error: Exception) -> OllamaError:
+    """將 httpx 與解析錯誤轉換為對應的 OllamaError"""
+    if isinstance(error, OllamaError):
+        return error
+    if isinstance(error, httpx.HTTPStatusError):
+        return OllamaHTTPError(error.response.status_code, _error_detail(error.response))
+    if isinstance(error, httpx.TimeoutException):
+        return OllamaTimeoutError(f"Timed out waiting for Ollama: {error!r}")
+    if isinstance(error, httpx.RequestError):
+        return OllamaConnectionError(f"Could not connect to Ollama: {error}")
+    return OllamaResponseError(f"Invalid response from Ollama: {error}")
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import httpx
+
+from app.config import settings
+from app.services.http_clients import ollama_http_clients
+from app.services.ollama_errors import OllamaUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_model_name(name: str) -> str:
+    """Ollama 對未指定標籤的模型使用 latest，例如 llama3 與 llama3:latest 為同一模型"""
+    return name if ":" in name else f"{name}:latest"
+
+
+class OllamaEndpointConfig:
+    """ollama_url 設定中的一個端點：位址、權重與提供的模型（空集合表示不限制）"""
+
+    def __init__(self, url: str, weight: float = 1.0, models: Optional[List[str]] = None):
+        self.url = url.rstrip("/")
+        self.weight = weight if weight and weight > 0 else 1.0
+        self.models: Set[str] = {normalize_model_name(m) for m in models or []}
+
+    def serves(self, model: str) -> bool:
+        """依設定判斷此端點是否提供此模型（不含 /api/tags 的結果）"""
+        return not self.models or normalize_model_name(model) in self.models
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, OllamaEndpointConfig)
+            and (self.url, self.weight, self.models) == (other.url, other.weight, other.models)
+        )
+
+    def __repr__(self):
+        return f"OllamaEndpointConfig(url={self.url!r}, weight={self.weight}, models={sorted(self.models)})"
+
+
+def parse_endpoints(value: Any) -> List[OllamaEndpointConfig]:
+    """
+    解析 ollama_url 設定。支援：
+    - 單一網址字串（舊格式）
+    - 網址字串或 {"url", "weight", "models"} 物件組成的列表
+    """
+    if isinstance(value, dict) and "value" in value:
+        value = value["value"]
+    if not value:
+        return []
+    if isinstance(value, (str, dict)):
+        value = [value]
+
+    endpoints = []
+    for item in value:
+        if isinstance(item, str):
+            endpoints.append(OllamaEndpointConfig(item))
+        elif isinstance(item, dict) and item.get("url"):
+            endpoints.append(OllamaEndpointConfig(item["url"], item.get("weight", 1.0), item.get("models")))
+    return endpoints
+
+
+def primary_endpoint_url(value: Any) -> Optional[str]:
+    """取得設定中的第一個端點，供模型列表、下載等單一主機操作使用"""
+    endpoints = parse_endpoints(value)
+    return endpoints[0].url if endpoints else None
+
+
+class OllamaEndpointState:
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.total_requests = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.available_models: Optional[Set[str]] = None  # 最近一次 /api/tags 的結果，None 表示尚未確認
+        self.last_checked: Optional[float] = None
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def circuit(self, now: float, failure_threshold: int) -> str:
+        """斷路器狀態：closed 正常、open 暫停送出請求、half_open 允許一個試探請求"""
+        if self.is_ejected(now):
+            return "open"
+        if self.consecutive_failures >= failure_threshold:
+            return "half_open"
+        return "closed"
+
+
+class OllamaEndpointPool:
+    """
+    在多個 Ollama 端點之間分配生成請求。
+
+    每次請求選擇擁有該模型、未被剔除且 (進行中請求數 / 權重) 最低的端點。
+    每個端點也是一個斷路器：請求或健康檢查連續失敗達門檻即開啟（剔除）一段時間，
+    期間不送出請求；期滿後進入半開狀態，只放行一個試探請求，成功即恢復正常，
+    失敗則再次開啟。單一端點同樣適用，Ollama 停止時請求會立即失敗而不必等到逾時。
+    """
+
+    def __init__(self, failure_threshold: int, eject_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self._endpoints: List[OllamaEndpointConfig] = []
+        self._states: Dict[str, OllamaEndpointState] = {}
+
+    @property
+    def endpoints(self) -> List[OllamaEndpointConfig]:
+        return list(self._endpoints)
+
+    def configure(self, endpoints: List[OllamaEndpointConfig]) -> None:
+        """更新目前使用的端點；既有端點的狀態會保留"""
+        if endpoints == self._endpoints:
+            return
+        self._endpoints = list(endpoints)
+        for endpoint in endpoints:
+            self._states.setdefault(endpoint.url, OllamaEndpointState(endpoint.url))
+        logger.info("ollama endpoints configured endpoints=%s", [e.url for e in endpoints])
+
+    def state(self, url: str) -> OllamaEndpointState:
+        return self._states.setdefault(url, OllamaEndpointState(url))
+
+    def _serves(self, endpoint: OllamaEndpointConfig, model: str) -> bool:
+        if not endpoint.serves(model):
+            return False
+        available = self.state(endpoint.url).available_models
+        return available is None or normalize_model_name(model) in available
+
+    def _admits(self, endpoint: OllamaEndpointConfig, now: float) -> bool:
+        state = self.state(endpoint.url)
+        circuit = state.circuit(now, self.failure_threshold)
+        return circuit == "closed" or (circuit == "half_open" and state.in_flight == 0)
+
+    def select(self, endpoints: List[OllamaEndpointConfig], model: str) -> Optional[OllamaEndpointConfig]:
+        """選擇處理此模型請求的端點；所有端點的斷路器都未放行時回傳 None"""
+        now = time.monotonic()
+        serving = [e for e in endpoints if self._serves(e, model)] if len(endpoints) > 1 else endpoints
+        # 沒有端點提供此模型時仍送出請求，讓呼叫端取得 Ollama 實際的錯誤
+        candidates = [e for e in serving or endpoints if self._admits(e, now)]
+        if not candidates:
+            return None
+
+        def load(endpoint):
+            state = self.state(endpoint.url)
+            return (state.in_flight / endpoint.weight, state.total_requests / endpoint.weight)
+
+        return min(candidates, key=load)
+
+    def retry_after(self, endpoints: List[OllamaEndpointConfig]) -> float:
+        """最早恢復放行的端點還需要等待的秒數"""
+        now = time.monotonic()
+        return max(0.0, min(self.state(e.url).ejected_until for e in endpoints) - now)
+
+    def serving_count(self, endpoints: List[OllamaEndpointConfig], model: str) -> int:
+        """目前可處理此模型的端點數（至少為 1），用來放大並行上限"""
+        now = time.monotonic()
+        count = sum(
+            1 for e in endpoints
+            if self._serves(e, model) and not self.state(e.url).is_ejected(now)
+        )
+        return max(1, count)
+
+    @asynccontextmanager
+    async def lease(self, endpoints: List[OllamaEndpointConfig], model: str) -> AsyncIterator[OllamaEndpointConfig]:
+        """選擇端點並在請求期間計入其負載；沒有可用端點時立即拋出 OllamaUnavailableError"""
+        endpoint = self.select(endpoints, model)
+        if endpoint is None:
+            raise OllamaUnavailableError(model, self.retry_after(endpoints))
+        state = self.state(endpoint.url)
+        state.in_flight += 1
+        state.total_requests += 1
+        try:
+            yield endpoint
+        finally:
+            state.in_flight -= 1
+
+    def report_success(self, url: str) -> None:
+        state = self.state(url)
+        if state.consecutive_failures or state.ejected_until:
+            logger.info("ollama endpoint recovered url=%s", url)
+        state.consecutive_failures = 0
+        state.ejected_until = 0.0
+
+    def report_failure(self, url: str) -> None:
+        state = self.state(url)
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= self.failure_threshold:
+            state.ejected_until = time.monotonic() + self.eject_seconds
+            logger.warning(
+                "ollama endpoint ejected url=%s consecutive_failures=%d eject_seconds=%.0f",
+                url, state.consecutive_failures, self.eject_seconds
+            )
+
+    async def probe(self, url: str) -> bool:
+        """以 /api/tags 檢查端點，同時更新端點上可用的模型"""
+        state = self.state(url)
+        state.last_checked = time.time()
+        try:
+            response = await ollama_http_clients.get(url).get(
+                "/api/tags", timeout=settings.ollama_health_check_timeout_seconds
+            )
+            response.raise_for_status()
+            state.available_models = {
+                normalize_model_name(m.get("name") or m.get("model", ""))
+                for m in response.json().get("models", [])
+            }
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("ollama health check failed url=%s error=%s", url, e)
+            self.report_failure(url)
+            return False
+        self.report_success(url)
+        return True
+
+    async def probe_all(self) -> Dict[str, bool]:
+        urls = [endpoint.url for endpoint in self._endpoints]
+        results = await asyncio.gather(*(self.probe(url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def run_health_checks(self, interval: float) -> None:
+        """定期檢查所有端點，直到被取消"""
+        while True:
+            if len(self._endpoints) > 1:
+                await self.probe_all()
+            await asyncio.sleep(interval)
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        result = []
+        for endpoint in self._endpoints:
+            state = self.state(endpoint.url)
+            result.append({
+                "url": endpoint.url,
+                "weight": endpoint.weight,
+                "models": sorted(endpoint.models),
+                "healthy": not state.is_ejected(now),
+                "circuit": state.circuit(now, self.failure_threshold),
+                "in_flight": state.in_flight,
+                "total_requests": state.total_requests,
+                "consecutive_failures": state.consecutive_failures,
+                "available_models": sorted(state.available_models) if state.available_models is not None else None,
+            })
+        return result
+
+
+ollama_pool = OllamaEndpointPool(
+    failure_threshold=settings.ollama_endpoint_failure_threshold,
+    eject_seconds=settings.ollama_endpoint_eject_seconds,
+)
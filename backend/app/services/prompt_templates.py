@@ -0,0 +1,97 @@
+"""
+生成資料集的提示詞範本。
+
+固定的角色說明、生成要求與 few-shot 範例在載入模組時組合一次（SYSTEM_PROMPT），
+每次請求都以相同內容作為第一個 system 訊息送出；每筆不同的內容（法規條文、原始需求、
+拒絕原因）則放在最後的 user 訊息。提示詞前綴固定時，Ollama 可以沿用已載入模型中
+計算過的提示詞快取，只需評估後段內容，prompt_eval_duration 隨之下降。
+
+SYSTEM_PROMPT 中不應加入任何每次請求不同的內容，否則前綴無法重用。
+"""
+from typing import List, Optional
+
+# few-shot 範例：(法規條文, 對應的資料集項目)
+FEW_SHOT_EXAMPLES = [
+    (
+        "利用資通安全管理法第4條：為提升資通安全，政府應提供資源，整合民間及產業力量，提升全民資通安全意識，並推動下列事項：\n一、資通安全專業人才之培育。\n二、資通安全科技之研發、整合、應用、產學合作及國際交流合作。\n三、資通安全產業之發展。\n四、資通安全軟硬體技術規範、相關服務與審驗機制之發展。\n前項相關事項之推動，由主管機關以國家資通安全發展方案定之。",
+        """\"instruction\": "政府會怎麼提升大家的資安能力？",
+\"input\": "政府會做什麼來保護我們的資安？",
+\"output\": "政府會做的事包括：培養資安人才、推動資安技術研發、發展資安產業，以及建立資安產品與服務的標準和審查制度。",
+\"history\": [
+  ["什麼是資通系統、資通安全和資通安全事件？", "資通系統就是像電腦、伺服器這些用來處理資料的系統。資通安全是保護這些系統不被駭客入侵或資料被偷。資通安全事件是指系統被攻擊、出錯或造成服務中斷的情況。"]
+]""",
+    ),
+    (
+        """利用資通安全責任等級分級辦法第5條：各機關有下列情形之一者，其資通安全責任等級為 B 級：
+一、業務涉及公務機關捐助或研發之國家核心科技資訊之安全維護與管理。
+二、業務涉及區域性或地區性民眾服務或共用性資通系統之維運。
+三、業務涉及區域性或地區性個人資料檔案之持有。
+四、涉及中央二級機關與所屬機關共用性資通系統維運。
+五、屬公務機關且業務涉及區域性或地區性之關鍵基礎設施事項。
+六、屬關鍵基礎設施提供者，經主管機關認定其資通系統失效將造成嚴重影響者。
+七、屬公立區域醫院或地區醫院。""",
+        """\"instruction\": "什麼情況會被列為B級？",
+\"input\": "我機關有提供地方服務，會是B級嗎？",
+\"output\": "有可能。像是提供地方性的民眾服務、處理區域個資、或是地方政府的關鍵設施單位，通常會列為B級。",
+\"history\": []""",
+    ),
+]
+
+
+def _compile_system_prompt() -> str:
+    parts = [
+        "你是一位資安專家，專門協助生成高品質的指令微調資料集。你的任務是根據使用者提供的法律條文或原始需求，生成符合資安法規要求的訓練資料。",
+        "請嚴格按照指定的 JSON 格式輸出，不要包含任何其他文字。",
+        "## 生成要求",
+        "請根據使用者提供的資訊，生成一個完整的指令微調資料集項目。確保：",
+        "1. 指令清楚明確，要求模型回答資安相關問題",
+        "2. 輸入內容提供適當的上下文，提出與法規依據相關但不直接詢問法規內容的問題",
+        "3. 輸出內容準確、實用且依照法規依據回答",
+        "4. 如果提供了拒絕原因，請針對這些問題改進原始需求",
+        "5. 請以繁體中文回答",
+        "## Few Shot Prompt",
+    ]
+    for i, (article, example) in enumerate(FEW_SHOT_EXAMPLES, 1):
+        parts.append(f"### {i}")
+        parts.append(article)
+        parts.append("請根據上述法規，生成的指令微調資料集如下：")
+        parts.append(example)
+    return "\n\n".join(parts)
+
+
+# 所有生成請求共用的 system 訊息，只在載入模組時組合一次
+SYSTEM_PROMPT = _compile_system_prompt()
+
+
+def build_regulation_prompt(article_contents: List[str]) -> str:
+    """依法規條文生成資料集的 user 訊息"""
+    parts = ["請根據以下提供的法律條文，撰寫相對應的問答集：", "## 法律條文"]
+    for i, article in enumerate(article_contents, 1):
+        parts.append(f"{i}. {article}")
+    return "\n\n".join(parts)
+
+
+def build_revision_prompt(instruction: str,
+                          input_text: Optional[str] = None,
+                          system_prompt: Optional[str] = None,
+                          source: Optional[List[str]] = None,
+                          rejection_reasons: Optional[List[str]] = None) -> str:
+    """依原始需求、法規依據與拒絕原因重新生成資料集的 user 訊息"""
+    parts = ["## 原始需求", f"指令: {instruction}"]
+    if input_text:
+        parts.append(f"輸入: {input_text}")
+    if system_prompt:
+        parts.append(f"系統提示: {system_prompt}")
+
+    if source:
+        parts.append("## 法規依據")
+        for i, src in enumerate(source, 1):
+            parts.append(f"{i}. {src}")
+
+    if rejection_reasons:
+        parts.append("## 需要改進的地方")
+        for i, reason in enumerate(rejection_reasons, 1):
+            parts.append(f"{i}. {reason}")
+
+    parts.append("請根據上述資訊與生成要求，生成一個完整的指令微調資料集項目。")
+    return "\n\n".join(parts)
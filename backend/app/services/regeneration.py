@@ -1,106 +1,113 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud
 from app.services.ollama_client import OllamaClient
-import json
+from app.stats_cache import stats_cache
+from typing import Dict, List, Optional
+import logging
 import random
 
-async def regenerate_dataset(db: Session, dataset_id: int, model_name: str = None):
+logger = logging.getLogger(__name__)
+
+async def resolve_regeneration_model(db: AsyncSession, model_name: str = None) -> str:
+    """決定重新生成使用的模型：指定的模型，否則從設定中隨機選擇一個"""
+    if model_name:
+        return model_name
+    models_setting = await crud.get_setting_async(db, "ollama_models")
+    if models_setting and models_setting.value and len(models_setting.value) > 0:
+        return random.choice(models_setting.value)
+    return "llama3"  # 預設模型
+
+def plan_regeneration_models(model_weights: Optional[Dict[str, float]], count: int) -> List[Optional[str]]:
+    """
+    依權重分配 count 筆重新生成工作的模型。
+    以平滑加權輪詢排列：各模型的數量符合權重比例，且依序領取時模型交錯出現，不會一個模型做完才換下一個。
+    未指定權重時回傳 None，由 worker 從 ollama_models 隨機選擇。
+    """
+    weights = {name: weight for name, weight in (model_weights or {}).items() if weight > 0}
+    if not weights:
+        return [None] * count
+
+    total = sum(weights.values())
+    current = dict.fromkeys(weights, 0.0)
+    plan = []
+    for _ in range(count):
+        for name, weight in weights.items():
+            current[name] += weight
+        chosen = max(current, key=current.get)
+        current[chosen] -= total
+        plan.append(chosen)
+    return plan
+
+async def regenerate_dataset(db: AsyncSession, dataset_id: int, model_name: str = None) -> bool:
     """
     The core logic for regenerating a dataset item using optimized prompt engineering.
+    Returns False if the dataset no longer exists. Ollama and database errors are raised
+    to the caller (the regeneration worker), which retries or marks the task as failed.
     """
-    print(f"Starting regeneration process for dataset ID: {dataset_id}")
-    dataset = crud.get_raw_dataset(db, dataset_id)
+    logger.info("Starting regeneration process for dataset ID: %s", dataset_id)
+    dataset = await crud.get_raw_dataset_async(db, dataset_id)
     if not dataset:
-        print(f"Dataset {dataset_id} not found for regeneration.")
-        return
-    
+        logger.warning("Dataset %s not found for regeneration.", dataset_id)
+        return False
+
     # Set status to regenerating
     dataset.review_status = "regenerating"
-    db.commit()
-    print(f"Dataset {dataset_id} status set to regenerating")
+    await db.commit()
+    logger.info("Dataset %s status set to regenerating", dataset_id)
 
     # 1. Get all rejection reasons
-    rejection_logs = crud.get_rejection_reasons_for_dataset(db, dataset_id)
+    rejection_logs = await crud.get_rejection_reasons_for_dataset_async(db, dataset_id)
     reasons = [log.comment for log in rejection_logs if log.comment]
-    
-    print(f"Found {len(reasons)} rejection reasons for dataset {dataset_id}")
-    
+
+    logger.info("Found %d rejection reasons for dataset %s", len(reasons), dataset_id)
+
     # 2. Get Ollama configuration
-    url_setting = crud.get_setting(db, "ollama_url")
+    url_setting = await crud.get_setting_async(db, "ollama_url")
     ollama_url = url_setting.value if url_setting else "http://ollama:11434"
 
     # 3. 決定使用的模型
-    if model_name:
-        # 使用指定的模型
-        selected_model = model_name
-    else:
-        # 從設定中隨機選擇一個模型
-        models_setting = crud.get_setting(db, "ollama_models")
-        if models_setting and models_setting.value and len(models_setting.value) > 0:
-            selected_model = random.choice(models_setting.value)
-        else:
-            selected_model = "llama3"  # 預設模型
-    
-    print(f"Using model: {selected_model} for regeneration")
+    selected_model = await resolve_regeneration_model(db, model_name)
+    logger.info("Using model: %s for regeneration", selected_model)
 
     # 4. Create Ollama client and generate structured content
-    ollama_client = OllamaClient(host=ollama_url, model=selected_model)
-    
-    try:
-        # Use the new structured generation method
-        structured_result = await ollama_client.generate_structured_dataset(
-            instruction=dataset.instruction or "",
-            input_text=dataset.input,
-            system_prompt=dataset.system,
-            source=dataset.source if dataset.source else [],
-            rejection_reasons=reasons
-        )
-        
-        # Check if generation was successful
-        if structured_result["output"].startswith("Error:"):
-            print(f"Failed to regenerate content for dataset {dataset_id}. Reason: {structured_result['output']}")
-            return
-        
-        print(f"Successfully generated new structured content for dataset {dataset_id}")
-        print(f"New instruction: {structured_result['instruction'][:100]}...")
-        print(f"New output: {structured_result['output'][:100]}...")
-        
-        # 4. Update the dataset in the database
-        # Add the old output to history
-        history = list(dataset.history) if dataset.history else []
-        
-        # Get current review stats before clearing logs
-        current_stats = crud.get_dataset_review_stats(db, dataset_id)
-        
-        # 修正：將歷史記錄轉換為二維陣列格式 [指令, 回答]
-        if dataset.instruction and dataset.output:
-            history.append([dataset.instruction, dataset.output])
-        
-        # 保存額外的元資料到系統欄位（如果需要）
-        system_info = {
-            "reject_count": current_stats["reject_count"],
-            "accept_count": current_stats["accept_count"],
-            "rejection_reasons": reasons,
-            "previous_input": dataset.input
-        }
-
-        # Update with new structured content
-        dataset.instruction = structured_result["instruction"]
-        dataset.input = structured_result["input"]
-        dataset.output = structured_result["output"]
-        dataset.system = json.dumps(system_info) if system_info else None  # 保存元資料到系統欄位
-        dataset.model_name = selected_model  # 新增：保存使用的模型名稱
-        dataset.review_status = "pending"
-        dataset.history = history
-        
-        # Clear all review logs for this dataset to allow re-review
-        for review_log in dataset.review_logs:
-            db.delete(review_log)
-        
-        db.commit()
-        print(f"Dataset {dataset_id} has been updated with new structured content and reset for review.")
-        
-    except Exception as e:
-        print(f"Error during regeneration process for dataset {dataset_id}: {e}")
-        # Optionally, set a specific status like 'failed'
-        return 
\ No newline at end of file
+    keep_alive = await crud.get_model_keep_alive_async(db, selected_model)
+    ollama_client = OllamaClient(
+        host=ollama_url, model=selected_model, use_cache=False, keep_alive=keep_alive  # 重新生成需要不同的結果
+    )
+
+    # Use the new structured generation method
+    structured_result = await ollama_client.generate_structured_dataset(
+        instruction=dataset.instruction or "",
+        input_text=dataset.input,
+        system_prompt=dataset.system,
+        source=dataset.source if dataset.source else [],
+        rejection_reasons=reasons
+    )
+
+    logger.info("Successfully generated new structured content for dataset %s", dataset_id)
+    logger.debug("New instruction: %s...", structured_result['instruction'][:100])
+    logger.debug("New output: %s...", structured_result['output'][:100])
+
+    # 5. Save the current content as a revision (one appended row instead of rewriting the history JSON)
+    await crud.add_dataset_revision_async(db, dataset, rejection_snapshot={
+        "reject_count": dataset.reject_count,
+        "accept_count": dataset.accept_count,
+        "rejection_reasons": reasons,
+    })
+
+    # Update with new structured content
+    dataset.instruction = structured_result["instruction"]
+    dataset.input = structured_result["input"]
+    dataset.output = structured_result["output"]
+    dataset.model_name = selected_model  # 新增：保存使用的模型名稱
+    dataset.review_status = "pending"
+    dataset.accept_count = 0
+    dataset.reject_count = 0
+
+    # Clear all review logs for this dataset to allow re-review
+    await crud.delete_review_logs_for_dataset_async(db, dataset_id)
+
+    await db.commit()
+    stats_cache.invalidate()
+    logger.info("Dataset %s has been updated with new structured content and reset for review.", dataset_id)
+    return True
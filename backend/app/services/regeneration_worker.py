@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import List, Optional, Set
+
+from app import crud
+from app.config import settings
+from app.database.base import AsyncSessionLocal
+from app.services.dataset_generation import ModelLimiter, get_model_limit
+from app.services.ollama_errors import OllamaUnavailableError
+from app.services.regeneration import regenerate_dataset, resolve_regeneration_model
+
+logger = logging.getLogger(__name__)
+
+
+class RegenerationWorkerPool:
+    """
+    執行 regeneration_tasks 佇列中的重新生成工作。
+
+    每個 worker 以自己的 session 領取工作（資料庫層級的原子領取，多個行程也不會重複執行），
+    同一模型同時執行的數量受 ollama_model_concurrency 限制（與批量生成共用同一個上限）。失敗的工作以指數退避重試，
+    超過 REGENERATION_MAX_ATTEMPTS 次後標記為失敗並還原資料集狀態。
+
+    領取的工作以 claimed_by 記錄所屬行程，執行期間定期更新心跳；
+    心跳逾時（行程結束或當機）的工作才會被 recover() 與定期檢查放回佇列，
+    其他行程仍在執行的工作不會被搶走。
+
+    同一資料集同時只會重新生成一次：加入佇列與領取時由資料庫把關，
+    本行程內另以 _in_flight 記錄執行中的資料集，重複的工作直接併入進行中的那一次。
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        workers: int = settings.regeneration_workers,
+        poll_interval: float = settings.regeneration_poll_interval_seconds,
+        heartbeat_interval: float = settings.regeneration_heartbeat_interval_seconds,
+        stale_after: float = settings.regeneration_stale_after_seconds
+    ):
+        self._session_factory = session_factory
+        self._workers = max(1, workers)
+        self._poll_interval = poll_interval
+        self._heartbeat_interval = heartbeat_interval
+        self._stale_after = stale_after
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: Set[int] = set()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def recover(self) -> int:
+        """將心跳逾時的中斷工作與停留在 regenerating 的資料集重新排入佇列"""
+        async with self._session_factory() as db:
+            count = await crud.requeue_orphaned_regenerations_async(db, self._stale_after)
+        if count:
+            logger.info("regeneration tasks requeued count=%d", count)
+        return count
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self._workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def shutdown(self) -> None:
+        """停止所有 worker；執行中的工作維持 running，心跳逾時後由 recover() 重新排入"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                worked = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("regeneration worker %d error: %s", index, e)
+                worked = False
+            if not worked:
+                await asyncio.sleep(self._poll_interval)
+
+    async def _reaper(self) -> None:
+        """定期將其他行程遺留、心跳逾時的工作放回佇列"""
+        while True:
+            await asyncio.sleep(self._stale_after)
+            try:
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("regeneration reaper error: %s", e)
+
+    async def _heartbeat(self, task_id: int) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            try:
+                async with self._session_factory() as db:
+                    alive = await crud.heartbeat_regeneration_task_async(db, task_id, self.worker_id)
+                if not alive:
+                    logger.warning("regeneration task no longer claimed task_id=%s worker=%s", task_id, self.worker_id)
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("regeneration heartbeat error task_id=%s error=%s", task_id, e)
+
+    async def run_once(self) -> bool:
+        """領取並執行一筆工作；佇列中沒有可執行的工作時回傳 False"""
+        async with self._session_factory() as db:
+            task = await crud.claim_regeneration_task_async(db, self.worker_id)
+            if task is None:
+                return False
+            task_id, dataset_id, attempts = task.id, task.dataset_id, task.attempts
+            if dataset_id in self._in_flight:
+                logger.info("regeneration task coalesced task_id=%s dataset_id=%s", task_id, dataset_id)
+                await crud.complete_regeneration_task_async(db, task_id)
+                return True
+            self._in_flight.add(dataset_id)
+            heartbeat = asyncio.create_task(self._heartbeat(task_id))
+            try:
+                model_name = await resolve_regeneration_model(db, task.model_name)
+                limit = await self._model_limit(db, model_name)
+            except BaseException:
+                heartbeat.cancel()
+                self._in_flight.discard(dataset_id)
+                raise
+
+        logger.info(
+            "regeneration task started task_id=%s dataset_id=%s model=%s attempt=%d",
+            task_id, dataset_id, model_name, attempts
+        )
+        try:
+            async with limit:
+                async with self._session_factory() as db:
+                    found = await regenerate_dataset(db, dataset_id, model_name)
+        except Exception as e:
+            await self._handle_failure(task_id, dataset_id, attempts, e)
+            return True
+        finally:
+            heartbeat.cancel()
+            self._in_flight.discard(dataset_id)
+
+        async with self._session_factory() as db:
+            if found:
+                await crud.complete_regeneration_task_async(db, task_id)
+            else:
+                await crud.fail_regeneration_task_async(db, task_id, "Dataset not found")
+        return True
+
+    async def _model_limit(self, db, model_name: str) -> ModelLimiter:
+        url_setting = await crud.get_setting_async(db, "ollama_url")
+        return await get_model_limit(db, url_setting.value if url_setting else None, model_name)
+
+    async def _handle_failure(self, task_id: int, dataset_id: int, attempts: int, error: Exception) -> None:
+        message = f"{type(error).__name__}: {error}"
+        async with self._session_factory() as db:
+            if attempts >= settings.regeneration_max_attempts:
+                logger.error(
+                    "regeneration task failed task_id=%s dataset_id=%s attempts=%d error=%s",
+                    task_id, dataset_id, attempts, message
+                )
+                await crud.fail_regeneration_task_async(db, task_id, message)
+                return
+
+            delay = retry_delay(attempts, error)
+            logger.warning(
+                "regeneration task will retry task_id=%s dataset_id=%s attempts=%d delay=%.0fs error=%s",
+                task_id, dataset_id, attempts, delay, message
+            )
+            await crud.retry_regeneration_task_async(db, task_id, message, delay)
+
+
+def retry_delay(attempts: int, error: Optional[Exception] = None) -> float:
+    """第 n 次失敗後的等待秒數：base * 2^(n-1)，不超過上限；斷路器開啟時至少等到端點恢復放行"""
+    delay = min(
+        settings.regeneration_retry_delay_max_seconds,
+        settings.regeneration_retry_delay_seconds * 2 ** max(0, attempts - 1)
+    )
+    if isinstance(error, OllamaUnavailableError):
+        delay = max(delay, error.retry_after)
+    return delay
+
+
+regeneration_worker_pool = RegenerationWorkerPool()
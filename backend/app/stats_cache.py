@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.config import settings
+
+
+class StatsCache:
+    """
+    儀表板統計的記憶體快取。
+
+    每次會影響統計的寫入都會呼叫 invalidate() 遞增世代編號，舊世代的項目隨即失效；
+    max_staleness 秒則限制項目的最長存活時間，用來涵蓋其他 worker 行程的寫入。
+    max_staleness <= 0 時停用快取。
+    """
+
+    def __init__(self, max_staleness: float):
+        self.max_staleness = max_staleness
+        self._generation = 0
+        self._entries: Dict[Hashable, Tuple[int, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if self.max_staleness <= 0:
+            return compute()
+
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, created_at, value = entry
+                if entry_generation == generation and now - created_at <= self.max_staleness:
+                    return value
+
+        value = compute()
+
+        with self._lock:
+            # 計算期間若有寫入，結果可能已過時，不寫入快取
+            if self._generation == generation:
+                self._entries[key] = (generation, now, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+stats_cache = StatsCache(max_staleness=settings.stats_cache_max_staleness_seconds)
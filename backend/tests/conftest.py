@@ -1,12 +1,19 @@
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+# app.main 在匯入時即建立資料表並執行遷移，測試時改用暫存目錄中的資料庫
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
 from app.main import app
 from app.database.base import Base
-from app.api.v1.dependencies import get_db
+from app.database.base import get_db
 
 # --- Test Database Setup ---
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -63,3 +70,16 @@ def client(db_session):
     
     # Clean up dependency overrides
     app.dependency_overrides.clear()
+
+@pytest.fixture
+async def async_db():
+    """
+    Provides an AsyncSession bound to a fresh in-memory database.
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+    await engine.dispose()
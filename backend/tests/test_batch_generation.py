@@ -0,0 +1,147 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas
+from app.api.v1 import datasets as datasets_api
+from app.services import dataset_generation
+from app.database import models
+
+
+async def test_batch_generation_is_bounded_and_ordered(async_db, monkeypatch):
+    """
+    Test that batch items run concurrently up to the model's limit, keep their
+    original order and count failures individually.
+    """
+    articles = [models.LegalArticle(title="資通安全管理法", number=str(i), content=f"內容{i}") for i in range(6)]
+    async_db.add_all(articles)
+    async_db.add(models.SystemSetting(key="ollama_model_concurrency", value={"qwen3:1.7b": 3}))
+    await async_db.commit()
+
+    # Item i of the batch uses article i
+    picks = iter(range(6))
+    monkeypatch.setattr(dataset_generation.random, "randint", lambda a, b: 1)
+    monkeypatch.setattr(dataset_generation.random, "sample", lambda population, k: [population[next(picks)]])
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_generate_from_regulations(self, article_contents):
+        nonlocal in_flight, max_in_flight
+        number = int(article_contents[0].split("第")[1].split("條")[0])
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Earlier items finish last, so the result order must not follow completion order
+        await asyncio.sleep(0.01 * (6 - number))
+        in_flight -= 1
+        if number == 2:
+            raise RuntimeError("generation failed")
+        return {"instruction": f"q{number}", "input": "", "output": f"a{number}", "history": []}
+
+    monkeypatch.setattr(datasets_api.OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+
+    request = schemas.BatchGenerateFromRegulationsRequest(
+        selected_article_ids=[a.id for a in articles], model_name="qwen3:1.7b", batch_size=6, random_selection=True
+    )
+    result = await datasets_api.batch_generate_datasets_from_regulations(request, db=async_db, admin_user=None)
+
+    assert max_in_flight == 3
+    assert result.success_count == 5
+    assert result.failed_count == 1
+    assert [d.instruction for d in result.datasets] == ["q0", "q1", "q3", "q4", "q5"]
+
+
+async def test_concurrent_batches_share_the_model_limit(async_db, monkeypatch):
+    """
+    Test that two batches for the same model running at once stay within one model limit.
+    """
+    articles = [models.LegalArticle(title="資通安全管理法", number=str(i), content=f"內容{i}") for i in range(4)]
+    async_db.add_all(articles)
+    async_db.add(models.SystemSetting(key="ollama_model_concurrency", value={"qwen3:1.7b": 2}))
+    await async_db.commit()
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_generate_from_regulations(self, article_contents):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"instruction": "q", "input": "", "output": "a", "history": []}
+
+    monkeypatch.setattr(datasets_api.OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+
+    request = schemas.BatchGenerateFromRegulationsRequest(
+        selected_article_ids=[a.id for a in articles], model_name="qwen3:1.7b", batch_size=4, random_selection=True
+    )
+    async with AsyncSession(async_db.bind, expire_on_commit=False) as other_db:
+        results = await asyncio.gather(*(
+            datasets_api.batch_generate_datasets_from_regulations(request, db=db, admin_user=None)
+            for db in (async_db, other_db)
+        ))
+
+    assert max_in_flight == 2
+    assert [result.success_count for result in results] == [4, 4]
+
+
+async def test_model_limit_resizes_in_place_while_permits_are_held():
+    """
+    Test that changing a model's limit keeps counting requests already running,
+    so lowering it never lets more requests through than the new limit.
+    """
+    limits = dataset_generation.ModelConcurrencyLimits()
+    limiter = limits.get("qwen3:1.7b", 3)
+    for _ in range(3):
+        await limiter.acquire()
+
+    # The limit drops while all three permits are held: same limiter, nothing new admitted
+    assert limits.get("qwen3:1.7b", 2) is limiter
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    assert limiter.in_flight == 2
+
+    limiter.release()
+    await asyncio.sleep(0)
+    assert waiter.done()
+    assert limiter.in_flight == 2
+
+    # Raising the limit admits waiting requests immediately
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not second.done()
+    limits.get("qwen3:1.7b", 3)
+    await asyncio.sleep(0)
+    assert second.done()
+    assert limiter.in_flight == 3
+
+
+async def test_cancelled_batch_item_counts_as_failed(async_db, monkeypatch):
+    """
+    Test that an item whose generation is cancelled is reported as failed, not as a dataset.
+    """
+    article = models.LegalArticle(title="資通安全管理法", number="1", content="內容")
+    async_db.add(article)
+    await async_db.commit()
+    calls = 0
+
+    async def fake_generate_from_regulations(self, article_contents):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise asyncio.CancelledError()
+        return {"instruction": "q", "input": "", "output": "a", "history": []}
+
+    monkeypatch.setattr(datasets_api.OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+
+    request = schemas.BatchGenerateFromRegulationsRequest(
+        selected_article_ids=[article.id], model_name="qwen3:1.7b", batch_size=3, random_selection=False
+    )
+    result = await datasets_api.batch_generate_datasets_from_regulations(request, db=async_db, admin_user=None)
+
+    assert (result.success_count, result.failed_count) == (2, 1)
+    assert len(result.datasets) == 2
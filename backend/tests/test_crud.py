@@ -1,6 +1,9 @@
 import pytest
+from sqlalchemy import event
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from app import crud, schemas
+from app.database import models
 from app.database.models import UserRole
 
 def test_create_user(db_session: Session):
@@ -90,11 +93,12 @@ def test_update_user(db_session: Session):
     assert updated_user.role == UserRole.ADMIN
     
     # Update password
+    old_password_hash = db_user.password_hash
     user_update_password = schemas.UserUpdate(password="newpassword1")
     updated_user = crud.update_user(db_session, user_id=db_user.id, user_update=user_update_password)
     
     # Password hash should have changed
-    assert updated_user.password_hash != db_user.password_hash
+    assert updated_user.password_hash != old_password_hash
 
 def test_delete_user(db_session: Session):
     """
@@ -113,3 +117,180 @@ def test_delete_user(db_session: Session):
     # Verify user is deleted
     retrieved_user = crud.get_user(db_session, user_id=db_user.id)
     assert retrieved_user is None
+
+def test_get_raw_datasets_keyset_pagination(db_session: Session):
+    """
+    Test paging through raw datasets with after_id and next_cursor.
+    """
+    reviewer = crud.create_user(db_session, user=schemas.UserCreate(username="pager", password="password123", role=UserRole.EXPERT))
+    created = [
+        crud.create_raw_dataset(db_session, dataset=schemas.RawDatasetCreate(instruction=f"q{i}", output=f"a{i}"))
+        for i in range(5)
+    ]
+    crud.create_review_log(db_session, dataset_id=created[0].id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="ACCEPT"))
+    crud.create_review_log(db_session, dataset_id=created[3].id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="REJECT"))
+
+    first_page = crud.get_raw_datasets(db_session, limit=3)
+    assert [d.id for d in first_page.items] == [d.id for d in created[:3]]
+    assert first_page.next_cursor == created[2].id
+    assert first_page.items[0].accept_count == 1
+    assert first_page.items[0].reject_count == 0
+
+    second_page = crud.get_raw_datasets(db_session, after_id=first_page.next_cursor, limit=3)
+    assert [d.id for d in second_page.items] == [d.id for d in created[3:]]
+    assert second_page.next_cursor is None
+    assert second_page.items[0].reject_count == 1
+    assert second_page.items[0].review_logs[0].reviewer_id == reviewer.id
+    # history is only loaded on request
+    assert first_page.items[0].history is None
+    assert crud.get_raw_dataset(db_session, created[0].id).history == []
+    assert crud.get_raw_datasets(db_session, limit=1, include_history=True).items[0].history == []
+
+def _count_queries(db_session: Session, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    bind = db_session.get_bind()
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+def test_get_model_stats_query_count_is_flat(db_session: Session):
+    """
+    Benchmark: get_model_stats issues the same number of queries for 1 or 20 models.
+    """
+    reviewer = crud.create_user(db_session, user=schemas.UserCreate(username="statsuser", password="password123", role=UserRole.EXPERT))
+
+    def add_model(name: str):
+        dataset = crud.create_raw_dataset(db_session, dataset=schemas.RawDatasetCreate(instruction="q", output="a", model_name=name))
+        crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="ACCEPT"))
+        crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="REJECT"))
+
+    add_model("model-0")
+    stats, single_model_queries = _count_queries(db_session, lambda: crud.get_model_stats(db_session))
+    assert len(stats) == 1
+    assert stats[0].total_datasets == 1
+    assert stats[0].total_reviews == 2
+    assert stats[0].total_accepts == 1
+    assert stats[0].total_rejects == 1
+    assert stats[0].acceptance_rate == 50.0
+
+    for i in range(1, 20):
+        add_model(f"model-{i}")
+    stats, many_model_queries = _count_queries(db_session, lambda: crud.get_model_stats(db_session))
+    assert len(stats) == 20
+    assert many_model_queries == single_model_queries
+
+def test_create_review_log_updates_counters(db_session: Session):
+    """
+    Test that review logs keep the dataset counters current and that they can be rebuilt.
+    """
+    reviewer = crud.create_user(db_session, user=schemas.UserCreate(username="counter", password="password123", role=UserRole.EXPERT))
+    dataset = crud.create_raw_dataset(db_session, dataset=schemas.RawDatasetCreate(instruction="q", output="a"))
+
+    crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="ACCEPT"))
+    crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="reject"))
+    crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="REJECT"))
+
+    db_session.refresh(dataset)
+    assert dataset.accept_count == 1
+    assert dataset.reject_count == 2
+
+    # Corrupt the counters and repair them from review_logs
+    dataset.accept_count = 7
+    dataset.reject_count = 0
+    db_session.commit()
+
+    crud.rebuild_review_counters(db_session)
+    db_session.refresh(dataset)
+    assert dataset.accept_count == 1
+    assert dataset.reject_count == 2
+
+    with pytest.raises(ValidationError):
+        schemas.ReviewCreate(result="SKIP")
+
+def test_bulk_maintenance_runs_in_chunks(db_session: Session, monkeypatch):
+    """
+    Test that the stats reset and final dataset purge run as chunked set-based statements.
+    """
+    monkeypatch.setattr(crud, "BULK_MAINTENANCE_CHUNK_SIZE", 3)
+    reviewer = crud.create_user(db_session, user=schemas.UserCreate(username="maintainer", password="password123", role=UserRole.EXPERT))
+    reason = models.RejectionReason(label="chunked-reason", category="test")
+    db_session.add(reason)
+    datasets = crud.bulk_create_raw_datasets(db_session, datasets=[
+        schemas.RawDatasetCreate(instruction=f"q{i}", output=f"a{i}", model_name="llama3") for i in range(7)
+    ])
+    for dataset in datasets:
+        crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id,
+                               review=schemas.ReviewCreate(result="REJECT", rejection_reason_ids=[reason.id]))
+    db_session.add_all([models.FinalDataset(original_input=f"q{i}", final_output=f"a{i}") for i in range(8)])
+    db_session.commit()
+    review_logs = db_session.query(models.ReviewLog).count()
+    raw_datasets = db_session.query(models.RawDataset).count()
+    final_datasets = db_session.query(models.FinalDataset).count()
+
+    result = crud.refresh_model_stats(db_session)
+
+    assert result["cleanup_info"] == {"total_review_logs_cleared": review_logs, "raw_datasets_reset": raw_datasets}
+    assert db_session.query(models.ReviewLog).count() == 0
+    assert db_session.query(models.review_log_rejection_reason_association).count() == 0
+    assert all(d.reject_count == 0 and d.review_status == "pending" for d in datasets)
+
+    assert crud.delete_all_final_datasets(db_session) == final_datasets
+    assert db_session.query(models.FinalDataset).count() == 0
+
+def test_bulk_create_raw_datasets(db_session: Session):
+    """
+    Test creating a batch of datasets in one statement.
+    """
+    batch = [
+        schemas.RawDatasetCreate(instruction=f"bulk {i}", output=f"answer {i}", source=["資通安全管理法第4條"], model_name="qwen3:1.7b")
+        for i in range(50)
+    ]
+    created = crud.bulk_create_raw_datasets(db_session, datasets=batch)
+
+    assert len(created) == 50
+    assert [d.instruction for d in created] == [f"bulk {i}" for i in range(50)]
+    assert all(d.id is not None for d in created)
+    assert created[0].review_status == "pending"
+    assert created[0].accept_count == 0
+    assert created[0].source == ["資通安全管理法第4條"]
+    assert crud.get_raw_dataset(db_session, created[-1].id).output == "answer 49"
+
+def test_upsert_legal_articles(db_session: Session):
+    """
+    Test that re-importing an article updates it instead of duplicating it.
+    """
+    first_ids = crud.upsert_legal_articles(db_session, [
+        schemas.LegalArticleCreate(title="資通安全管理法", number="1", content="舊內容"),
+        schemas.LegalArticleCreate(title="資通安全管理法", number="2", content="第二條"),
+    ], chunk_size=1)
+    second_ids = crud.upsert_legal_articles(db_session, [
+        schemas.LegalArticleCreate(title="資通安全管理法", number="3", content="第三條"),
+        schemas.LegalArticleCreate(title="資通安全管理法", number="1", content="新內容"),
+    ])
+
+    assert second_ids[1] == first_ids[0]
+    assert second_ids[0] not in first_ids
+    article = crud.get_legal_article_by_title_and_number(db_session, title="資通安全管理法", number="1")
+    assert article.id == first_ids[0]
+    assert article.content == "新內容"
+    assert db_session.query(crud.models.LegalArticle).filter(crud.models.LegalArticle.title == "資通安全管理法").count() == 3
+
+def test_iter_final_datasets_for_export(db_session: Session):
+    """
+    Test streaming final datasets joined with their source instruction fields.
+    """
+    raw = crud.create_raw_dataset(db_session, dataset=schemas.RawDatasetCreate(instruction="指令", input="輸入", output="回答"))
+    db_session.add(crud.models.FinalDataset(original_input="指令: 指令\n輸入: 輸入", final_output="回答", raw_dataset_id=raw.id))
+    db_session.add(crud.models.FinalDataset(original_input="孤兒資料", final_output="回答2", raw_dataset_id=None))
+    db_session.commit()
+
+    rows = list(crud.iter_final_datasets_for_export(db_session, batch_size=1))
+
+    assert [(r.instruction, r.input, r.final_output) for r in rows] == [("指令", "輸入", "回答"), (None, None, "回答2")]
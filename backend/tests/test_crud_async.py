@@ -0,0 +1,70 @@
+from sqlalchemy import select
+
+from app import crud
+from app.database import models
+from app.services import regeneration
+
+
+async def test_get_setting_async(async_db):
+    async_db.add(models.SystemSetting(key="ollama_models", value=["qwen3:1.7b"]))
+    await async_db.commit()
+
+    setting = await crud.get_setting_async(async_db, "ollama_models")
+    assert setting.value == ["qwen3:1.7b"]
+    assert await crud.get_setting_async(async_db, "missing") is None
+
+
+async def test_get_model_keep_alive_async(async_db, monkeypatch):
+    monkeypatch.setattr(crud.app_settings, "ollama_keep_alive", "30m")
+    async_db.add(models.SystemSetting(key="ollama_model_keep_alive", value={"qwen3:1.7b": -1}))
+    await async_db.commit()
+
+    assert await crud.get_model_keep_alive_async(async_db, "qwen3:1.7b") == -1
+    assert await crud.get_model_keep_alive_async(async_db, "llama3") == "30m"
+
+
+async def test_get_legal_articles_by_ids_async_keeps_order(async_db):
+    first = models.LegalArticle(title="資通安全管理法", number="1", content="a")
+    second = models.LegalArticle(title="資通安全管理法", number="2", content="b")
+    async_db.add_all([first, second])
+    await async_db.commit()
+
+    articles = await crud.get_legal_articles_by_ids_async(async_db, [second.id, 999, first.id])
+    assert [a.id for a in articles] == [second.id, first.id]
+
+
+async def test_regenerate_dataset_resets_reviews(async_db, monkeypatch):
+    """
+    Test the async regeneration path end to end with a stubbed Ollama call.
+    """
+    reviewer = models.User(username="asyncreviewer", password_hash="x", role=models.UserRole.EXPERT)
+    dataset = models.RawDataset(instruction="old q", output="old a", reject_count=1)
+    async_db.add_all([reviewer, dataset])
+    await async_db.flush()
+    async_db.add(models.ReviewLog(dataset_id=dataset.id, reviewer_id=reviewer.id, result="REJECT", comment="太模糊"))
+    await async_db.commit()
+
+    captured = {}
+
+    async def fake_generate_structured_dataset(self, **kwargs):
+        captured.update(kwargs)
+        return {"instruction": "new q", "input": "", "output": "new a", "history": []}
+
+    monkeypatch.setattr(
+        regeneration.OllamaClient, "generate_structured_dataset", fake_generate_structured_dataset
+    )
+
+    await regeneration.regenerate_dataset(async_db, dataset.id, "qwen3:1.7b")
+
+    refreshed = await crud.get_raw_dataset_async(async_db, dataset.id)
+    await async_db.refresh(refreshed)
+    assert captured["rejection_reasons"] == ["太模糊"]
+    assert refreshed.output == "new a"
+    assert refreshed.review_status == models.ReviewStatus.PENDING
+    assert refreshed.reject_count == 0
+    assert refreshed.history == []
+    revisions = (await async_db.execute(select(models.DatasetRevision))).scalars().all()
+    assert [(r.revision, r.instruction, r.output) for r in revisions] == [(1, "old q", "old a")]
+    assert revisions[0].rejection_snapshot["rejection_reasons"] == ["太模糊"]
+    assert await crud.get_rejection_reasons_for_dataset_async(async_db, dataset.id) == []
+
@@ -0,0 +1,21 @@
+from sqlalchemy import text
+
+from app.config import settings
+from app.database.base import create_db_engine
+
+
+def test_sqlite_engine_profile_pragmas(tmp_path):
+    """
+    Test that file-based SQLite connections are opened in WAL mode with the configured pragmas.
+    """
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # NORMAL == 1
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout_ms
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == -settings.sqlite_cache_size_kib
+    finally:
+        engine.dispose()
+
@@ -0,0 +1,71 @@
+import httpx
+
+from app.services import generation_cache as generation_cache_module
+from app.services.generation_cache import GenerationCache, make_cache_key
+from app.services.ollama_client import OllamaClient
+
+
+def test_cache_key_ignores_stream_flag():
+    payload = {"model": "qwen3:1.7b", "messages": [{"role": "user", "content": "hi"}], "stream": False, "think": False}
+    assert make_cache_key(payload) == make_cache_key({**payload, "stream": True})
+    assert make_cache_key(payload) != make_cache_key({**payload, "model": "llama3"})
+    assert make_cache_key(payload) != make_cache_key({**payload, "format": "json"})
+
+
+def test_cache_counts_hits_and_expires(tmp_path, monkeypatch):
+    cache = GenerationCache(str(tmp_path / "cache.db"), max_bytes=1024, ttl_seconds=60)
+    now = 1000.0
+    monkeypatch.setattr(generation_cache_module.time, "time", lambda: now)
+
+    assert cache.get("a") is None
+    cache.set("a", "answer")
+    assert cache.get("a") == "answer"
+
+    now += 61
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = GenerationCache(str(tmp_path / "cache.db"), max_bytes=10, ttl_seconds=0)
+    now = 1000.0
+    monkeypatch.setattr(generation_cache_module.time, "time", lambda: now)
+
+    cache.set("a", "aaaa")
+    now += 1
+    cache.set("b", "bbbb")
+    now += 1
+    assert cache.get("a") == "aaaa"  # "b" is now the least recently used
+    now += 1
+    cache.set("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats()["size_bytes"] == 8
+    cache.close()
+
+
+async def test_ollama_client_reuses_cached_response(tmp_path, monkeypatch):
+    cache = GenerationCache(str(tmp_path / "cache.db"), max_bytes=1024 * 1024, ttl_seconds=60)
+    monkeypatch.setattr("app.services.ollama_client.generation_cache", cache)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": f"answer {len(calls)}"}})
+
+    def make_client(use_cache=True):
+        client = OllamaClient(host="http://ollama-cache:11434", model="qwen3:1.7b", use_cache=use_cache)
+        client.client = httpx.AsyncClient(base_url=client.host, transport=httpx.MockTransport(handler))
+        return client
+
+    cached_client = make_client()
+    assert await cached_client.generate("hi") == "answer 1"
+    assert await cached_client.generate("hi") == "answer 1"
+    # Bypassing the cache goes back to Ollama
+    assert await make_client(use_cache=False).generate("hi") == "answer 2"
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import crud
+from app.api.v1 import generation_jobs as generation_jobs_api
+from app.database import models
+from app.database.base import Base
+from app.services.generation_jobs import GenerationJobRunner
+from app.services.ollama_client import OllamaClient
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    """
+    A file-backed database so the runner's concurrent sessions each get their own connection.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _create_job(session_factory, batch_size):
+    async with session_factory() as db:
+        selections = [[{"id": i, "title": "資通安全管理法", "number": str(i), "content": f"內容{i}"}] for i in range(batch_size)]
+        job = await crud.create_generation_job_async(db, model_name="qwen3:1.7b", article_selections=selections)
+        return job.id
+
+
+def _article_number(article_contents):
+    return int(article_contents[0].split("第")[1].split("條")[0])
+
+
+async def test_job_saves_items_as_they_finish(session_factory, monkeypatch):
+    async def fake_generate_from_regulations(self, article_contents):
+        number = _article_number(article_contents)
+        # Later items finish first
+        await asyncio.sleep(0.01 * (4 - number))
+        if number == 1:
+            raise RuntimeError("generation failed")
+        return {"instruction": f"q{number}", "input": "", "output": f"a{number}", "history": []}
+
+    monkeypatch.setattr(OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+
+    async with session_factory() as db:
+        db.add(models.SystemSetting(key="ollama_model_concurrency", value={"qwen3:1.7b": 4}))
+        await db.commit()
+    job_id = await _create_job(session_factory, 4)
+    runner = GenerationJobRunner(session_factory=session_factory)
+    runner.start(job_id)
+    await runner.wait(job_id)
+
+    async with session_factory() as db:
+        job = await crud.get_generation_job_async(db, job_id)
+        page = await crud.get_generation_job_items_async(db, job_id)
+
+    assert job.status == models.GenerationJobStatus.COMPLETED
+    assert job.completed_items == 3
+    assert job.failed_items == 1
+    assert job.finished_at is not None
+    assert [item.item_index for item in page.items] == [0, 1, 2, 3]
+    assert page.items[0].result.instruction == "q0"
+    assert page.items[0].result.source == ["資通安全管理法第0條"]
+    assert page.items[1].status == models.GenerationJobItemStatus.FAILED
+    assert page.items[1].error == "generation failed"
+    # Completion order is recorded so progress can be streamed incrementally
+    assert sorted(item.sequence for item in page.items) == [1, 2, 3, 4]
+    assert page.items[3].sequence == 1
+
+
+async def test_cancel_keeps_finished_items(session_factory, monkeypatch):
+    release = asyncio.Event()
+
+    async def fake_generate_from_regulations(self, article_contents):
+        number = _article_number(article_contents)
+        if number > 0:
+            await release.wait()
+        return {"instruction": f"q{number}", "input": "", "output": f"a{number}", "history": []}
+
+    monkeypatch.setattr(OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+
+    job_id = await _create_job(session_factory, 4)
+    runner = GenerationJobRunner(session_factory=session_factory)
+    runner.start(job_id)
+    for _ in range(100):
+        async with session_factory() as db:
+            if (await crud.get_generation_job_async(db, job_id)).completed_items == 1:
+                break
+        await asyncio.sleep(0.01)
+
+    async with session_factory() as db:
+        await crud.cancel_generation_job_async(db, job_id)
+    runner.cancel(job_id)
+    await runner.wait(job_id)
+
+    async with session_factory() as db:
+        job = await crud.get_generation_job_async(db, job_id)
+        page = await crud.get_generation_job_items_async(db, job_id)
+        finished = await crud.get_generation_job_items_async(db, job_id, finished_only=True)
+
+    assert job.status == models.GenerationJobStatus.CANCELLED
+    assert job.completed_items == 1
+    assert [item.status for item in page.items] == [
+        models.GenerationJobItemStatus.COMPLETED,
+        models.GenerationJobItemStatus.CANCELLED,
+        models.GenerationJobItemStatus.CANCELLED,
+        models.GenerationJobItemStatus.CANCELLED,
+    ]
+    assert [item.item_index for item in finished.items] == [0]
+    # A cancelled item cannot be completed afterwards
+    async with session_factory() as db:
+        assert not await crud.complete_generation_job_item_async(db, job_id, page.items[1].id, result={})
+
+
+async def test_resume_only_generates_pending_items(session_factory, monkeypatch):
+    generated = []
+
+    async def fake_generate_from_regulations(self, article_contents):
+        number = _article_number(article_contents)
+        generated.append(number)
+        return {"instruction": f"q{number}", "input": "", "output": f"a{number}", "history": []}
+
+    monkeypatch.setattr(OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+
+    # Simulate a job interrupted by a restart after its first item was saved
+    job_id = await _create_job(session_factory, 3)
+    async with session_factory() as db:
+        await crud.start_generation_job_async(db, job_id)
+        first_item = (await crud.get_pending_generation_job_items_async(db, job_id))[0]
+        await crud.complete_generation_job_item_async(db, job_id, first_item.id, result={"instruction": "q0"})
+
+    runner = GenerationJobRunner(session_factory=session_factory)
+    await runner.resume_unfinished()
+    await runner.wait(job_id)
+
+    async with session_factory() as db:
+        job = await crud.get_generation_job_async(db, job_id)
+
+    assert sorted(generated) == [1, 2]
+    assert job.status == models.GenerationJobStatus.COMPLETED
+    assert job.completed_items == 3
+
+
+async def test_event_stream_resumes_after_sequence(session_factory, monkeypatch):
+    async def fake_generate_from_regulations(self, article_contents):
+        number = _article_number(article_contents)
+        return {"instruction": f"q{number}", "input": "", "output": f"a{number}", "history": []}
+
+    monkeypatch.setattr(OllamaClient, "generate_from_regulations", fake_generate_from_regulations)
+    monkeypatch.setattr(generation_jobs_api, "AsyncSessionLocal", session_factory)
+
+    job_id = await _create_job(session_factory, 3)
+    runner = GenerationJobRunner(session_factory=session_factory)
+    runner.start(job_id)
+    await runner.wait(job_id)
+
+    events = [event async for event in generation_jobs_api._stream_job_events(job_id, after_sequence=1, poll_interval=0.01)]
+
+    assert [event.split("\n")[1] for event in events] == [
+        "event: item", "event: item", "event: progress", "event: done"
+    ]
+    assert events[0].startswith("id: 2\n")
+    assert events[1].startswith("id: 3\n")
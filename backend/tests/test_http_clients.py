@@ -0,0 +1,49 @@
+import httpx
+
+from app import schemas
+from app.api.v1 import ollama as ollama_api
+from app.services.http_clients import OllamaHTTPClientRegistry
+from app.services.ollama_client import OllamaClient
+
+
+async def test_registry_shares_client_per_host():
+    registry = OllamaHTTPClientRegistry()
+
+    first = registry.get("http://ollama-a:11434")
+    assert registry.get("http://ollama-a:11434/") is first
+    assert registry.get("http://ollama-b:11434") is not first
+
+    await registry.aclose()
+    assert first.is_closed
+    # A closed client is replaced on next use
+    assert registry.get("http://ollama-a:11434") is not first
+    await registry.aclose()
+
+
+def test_ollama_clients_share_connection_pool():
+    first = OllamaClient(host="http://ollama-shared:11434", model="qwen3:1.7b")
+    second = OllamaClient(host="http://ollama-shared:11434", model="llama3")
+    assert first.client is second.client
+
+
+async def test_connection_test_does_not_register_unconfigured_urls(db_session, monkeypatch):
+    registry = OllamaHTTPClientRegistry()
+    monkeypatch.setattr(ollama_api, "ollama_http_clients", registry)
+    monkeypatch.delenv("OLLAMA_BASE_URL", raising=False)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"version": "0.5.0"}))
+    real_async_client = httpx.AsyncClient
+    opened = []
+
+    def async_client(**kwargs):
+        opened.append(real_async_client(transport=transport, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(ollama_api.httpx, "AsyncClient", async_client)
+
+    result = await ollama_api.test_ollama_connection(
+        schemas.OllamaTestRequest(url="http://ollama-new:11434/"), db=db_session, current_user=None
+    )
+
+    assert result["version"] == "0.5.0"
+    assert registry._clients == {}
+    assert opened[0].is_closed
@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+from app.services import legal_article_import
+from app.services.legal_article_import import iter_legal_articles
+
+ARTICLES = [
+    {"title": "資通安全管理法", "number": str(i), "content": f"第{i}條內容" * 20}
+    for i in range(1, 40)
+]
+
+
+def test_iter_legal_articles_json_array_across_read_boundaries(monkeypatch):
+    """
+    Test that a JSON array is parsed correctly when items straddle read boundaries.
+    """
+    monkeypatch.setattr(legal_article_import, "READ_SIZE", 7)
+    payload = json.dumps(ARTICLES, ensure_ascii=False, indent=2).encode("utf-8")
+
+    articles = list(iter_legal_articles(io.BytesIO(payload), "articles.json"))
+
+    assert [a.number for a in articles] == [a["number"] for a in ARTICLES]
+    assert articles[-1].content == ARTICLES[-1]["content"]
+
+
+def test_iter_legal_articles_jsonl():
+    payload = "\n".join(json.dumps(a, ensure_ascii=False) for a in ARTICLES[:3]) + "\n\n"
+
+    articles = list(iter_legal_articles(io.BytesIO(payload.encode("utf-8")), "articles.jsonl"))
+
+    assert [a.number for a in articles] == ["1", "2", "3"]
+
+
+@pytest.mark.parametrize("payload", [b'{"title": "x"}', b'[{"title": "x", "number": "1", "content": "c"}', b"[1, 2]"])
+def test_iter_legal_articles_rejects_invalid_files(payload):
+    with pytest.raises(ValueError):
+        list(iter_legal_articles(io.BytesIO(payload), "articles.json"))
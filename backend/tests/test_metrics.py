@@ -0,0 +1,53 @@
+import httpx
+import pytest
+
+from app.config import settings
+from app.metrics import GenerationMetrics
+from app.services.ollama_client import OllamaClient
+from app.services.ollama_errors import OllamaHTTPError
+
+
+def test_metrics_render_prometheus_text():
+    metrics = GenerationMetrics()
+    metrics.observe_response("qwen3:1.7b", 12.0, {
+        "prompt_eval_count": 800,
+        "eval_count": 200,
+        "prompt_eval_duration": 2_000_000_000,
+        "eval_duration": 10_000_000_000,
+        "load_duration": 3_000_000,
+    })
+    metrics.observe_error("qwen3:1.7b", "timeout", 300.0)
+
+    text = metrics.render()
+    assert 'ollama_requests_total{model="qwen3:1.7b",outcome="success"} 1' in text
+    assert 'ollama_request_errors_total{model="qwen3:1.7b",error_type="timeout"} 1' in text
+    assert 'ollama_request_duration_seconds_bucket{model="qwen3:1.7b",le="20.0"} 1' in text
+    assert 'ollama_request_duration_seconds_bucket{model="qwen3:1.7b",le="+Inf"} 2' in text
+    assert 'ollama_request_duration_seconds_count{model="qwen3:1.7b"} 2' in text
+    assert 'ollama_model_load_duration_seconds_bucket{model="qwen3:1.7b",le="0.01"} 1' in text
+    assert 'ollama_prompt_tokens_total{model="qwen3:1.7b"} 800' in text
+    assert 'ollama_tokens_per_second{model="qwen3:1.7b"} 20.0' in text
+
+
+async def test_ollama_client_records_metrics(monkeypatch):
+    metrics = GenerationMetrics()
+    monkeypatch.setattr("app.services.ollama_client.generation_metrics", metrics)
+    monkeypatch.setattr(settings, "ollama_max_retries", 0)
+    responses = iter([
+        httpx.Response(200, json={"message": {"content": "ok"}, "eval_count": 5, "eval_duration": 1_000_000_000}),
+        httpx.Response(503, json={"error": "overloaded"}),
+    ])
+
+    client = OllamaClient(host="http://ollama-metrics:11434", model="llama3", use_cache=False)
+    client.client = httpx.AsyncClient(
+        base_url=client.host, transport=httpx.MockTransport(lambda request: next(responses))
+    )
+
+    assert await client.generate("hi") == "ok"
+    with pytest.raises(OllamaHTTPError):
+        await client.generate("hi")
+    await client.client.aclose()
+
+    text = metrics.render()
+    assert 'ollama_generated_tokens_total{model="llama3"} 5' in text
+    assert 'ollama_request_errors_total{model="llama3",error_type="http_503"} 1' in text
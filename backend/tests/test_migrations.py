@@ -0,0 +1,182 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.database.base import Base
+from app.database import migrations
+
+# (查詢, 預期使用的索引)
+HOT_QUERIES = [
+    (
+        "SELECT id FROM review_logs WHERE dataset_id = 1 AND result = 'REJECT'",
+        "ix_review_logs_dataset_id_result",
+    ),
+    (
+        "SELECT id FROM review_logs WHERE reviewer_id = 1 AND timestamp >= '2024-01-01'",
+        "ix_review_logs_reviewer_id_timestamp",
+    ),
+    (
+        "SELECT count(id) FROM review_logs WHERE model_name = 'llama3' AND result = 'ACCEPT'",
+        "ix_review_logs_model_name_result",
+    ),
+    (
+        "SELECT id FROM raw_dataset WHERE review_status = 'PENDING' AND id > 10 ORDER BY id",
+        "ix_raw_dataset_review_status_id",
+    ),
+    (
+        "SELECT count(id) FROM raw_dataset WHERE model_name = 'llama3' AND review_status != 'ACCEPTED'",
+        "ix_raw_dataset_model_name_review_status",
+    ),
+]
+
+COMPOSITE_INDEXES = [index_name for _, index_name in HOT_QUERIES]
+
+
+@pytest.fixture
+def legacy_engine():
+    """
+    Provides a database whose tables exist but lack the composite indexes,
+    like a database created before the indexes were declared.
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for index_name in COMPOSITE_INDEXES:
+            conn.execute(text(f"DROP INDEX {index_name}"))
+    yield engine
+    engine.dispose()
+
+
+def _query_plan(engine, query: str) -> str:
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {query}")).fetchall()
+    return " ".join(row[-1] for row in rows)
+
+
+def test_migration_creates_indexes_used_by_planner(legacy_engine):
+    """
+    Test that the hot queries stop scanning once the migration has built the indexes.
+    """
+    for query, index_name in HOT_QUERIES:
+        assert index_name not in _query_plan(legacy_engine, query)
+
+    created = migrations.create_missing_indexes(legacy_engine)
+    assert sorted(created) == sorted(COMPOSITE_INDEXES)
+
+    for query, index_name in HOT_QUERIES:
+        assert index_name in _query_plan(legacy_engine, query)
+
+
+def test_migration_is_idempotent(legacy_engine):
+    """
+    Test that running the migration twice does not try to rebuild anything.
+    """
+    migrations.run_migrations(legacy_engine)
+    assert migrations.run_migrations(legacy_engine) == []
+
+
+def test_migration_adds_missing_nullable_columns(legacy_engine):
+    """
+    Test that a column added to a model is added to an existing table.
+    """
+    with legacy_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE final_dataset DROP COLUMN model_name"))
+
+    assert "final_dataset.model_name" in migrations.run_migrations(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(final_dataset)"))]
+    assert "model_name" in columns
+
+
+def test_migration_deduplicates_legal_articles_only_on_request(legacy_engine, caplog):
+    """
+    Test that duplicate (title, number) rows block the unique index until the dedupe step
+    is requested, which keeps the most complete row and repoints generation job items.
+    """
+    with legacy_engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_legal_articles_title_number"))
+        for content in ("short", "the complete article", "newer"):
+            conn.execute(text(
+                "INSERT INTO legal_articles (title, number, content) VALUES ('資通安全管理法', '1', :content)"
+            ), {"content": content})
+        conn.execute(text(
+            "INSERT INTO generation_jobs (status, model_name, total_items, completed_items, failed_items) "
+            "VALUES ('PENDING', 'llama3', 1, 0, 0)"
+        ))
+        conn.execute(text(
+            "INSERT INTO generation_job_items (job_id, item_index, status, articles) VALUES (1, 0, 'PENDING', :articles)"
+        ), {"articles": json.dumps([{"id": 3, "title": "資通安全管理法", "number": "1", "content": "newer"}])})
+
+    applied = migrations.run_migrations(legacy_engine)
+    assert "uq_legal_articles_title_number" not in applied
+    assert "--dedupe-legal-articles" in caplog.text
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM legal_articles")).scalar() == 3
+
+    caplog.clear()
+    applied = migrations.run_migrations(legacy_engine, dedupe_legal_articles=True)
+    assert "uq_legal_articles_title_number" in applied
+    assert [record.levelname for record in caplog.records if "removed as duplicate" in record.message] == ["WARNING"] * 2
+
+    with legacy_engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, content FROM legal_articles")).fetchall()
+        item_articles = json.loads(conn.execute(text("SELECT articles FROM generation_job_items")).scalar())
+    assert [tuple(row) for row in rows] == [(2, "the complete article")]
+    assert item_articles[0]["id"] == 2
+
+
+def test_migration_moves_regeneration_metadata_to_revisions(legacy_engine):
+    """
+    Test that rejection metadata stored in `system` by the old regeneration becomes a revision.
+    """
+    metadata = {"reject_count": 3, "accept_count": 0, "rejection_reasons": ["不正確"], "previous_input": "舊輸入"}
+    with legacy_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO raw_dataset (id, instruction, output, system, history, review_status) "
+            "VALUES (1, '新問題', '新回答', :system, :history, 'PENDING')"
+        ), {"system": json.dumps(metadata), "history": json.dumps([["多輪問題", "多輪回答"], ["舊問題", "舊回答"]])})
+
+    assert migrations.run_migrations(legacy_engine)[-1].startswith("raw_dataset: moved regeneration metadata")
+    assert migrations.move_regeneration_metadata_to_revisions(legacy_engine) == []
+
+    with legacy_engine.connect() as conn:
+        dataset = conn.execute(text("SELECT system, history FROM raw_dataset WHERE id = 1")).one()
+        revision = conn.execute(text(
+            "SELECT revision, instruction, input, output, rejection_snapshot FROM dataset_revisions"
+        )).one()
+    assert dataset.system is None
+    assert json.loads(dataset.history) == [["多輪問題", "多輪回答"]]
+    assert revision[:4] == (1, "舊問題", "舊輸入", "舊回答")
+    assert json.loads(revision.rejection_snapshot) == {"reject_count": 3, "accept_count": 0, "rejection_reasons": ["不正確"]}
+
+
+def test_migration_rebuilds_stale_review_counters(legacy_engine):
+    """
+    Test that counters left stale by older versions are rebuilt once from review_logs.
+    """
+    with legacy_engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, password_hash, role) VALUES (1, 'r', 'x', 'EXPERT')"))
+        conn.execute(text(
+            "INSERT INTO raw_dataset (id, output, review_status, accept_count, reject_count) "
+            "VALUES (1, 'a', 'PENDING', 0, 0), (2, 'b', 'PENDING', 1, 0)"
+        ))
+        conn.execute(text(
+            "INSERT INTO review_logs (dataset_id, reviewer_id, result) "
+            "VALUES (1, 1, 'REJECT'), (1, 1, 'REJECT'), (1, 1, 'ACCEPT'), (2, 1, 'ACCEPT')"
+        ))
+
+    assert migrations.rebuild_review_counters(legacy_engine) == [
+        "raw_dataset: rebuilt review counters of 1 datasets from review_logs"
+    ]
+    assert migrations.rebuild_review_counters(legacy_engine) == []
+
+    with legacy_engine.connect() as conn:
+        counters = conn.execute(text("SELECT accept_count, reject_count FROM raw_dataset ORDER BY id")).fetchall()
+    assert [tuple(row) for row in counters] == [(1, 2), (1, 0)]
@@ -0,0 +1,71 @@
+import json
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import models
+from app.database.base import Base
+from app.services import model_warmup as model_warmup_module
+from app.services.model_warmup import ModelWarmup
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'warmup.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def ollama_requests(monkeypatch):
+    """Record /api/generate calls per host; models named "broken" fail to load."""
+    requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append((request.url.host, body["model"], body["keep_alive"]))
+        if body["model"] == "broken":
+            return httpx.Response(404, json={"error": "model 'broken' not found"})
+        return httpx.Response(200, json={"model": body["model"], "done": True, "load_duration": 2_500_000_000})
+
+    clients = {}
+
+    class FakeRegistry:
+        def get(self, url):
+            return clients.setdefault(url, httpx.AsyncClient(base_url=url, transport=httpx.MockTransport(handler)))
+
+    monkeypatch.setattr(model_warmup_module, "ollama_http_clients", FakeRegistry())
+    return requests
+
+
+async def test_warmup_loads_each_model_on_serving_endpoints(session_factory, ollama_requests, monkeypatch):
+    monkeypatch.setattr(model_warmup_module.crud.app_settings, "ollama_keep_alive", "30m")
+    async with session_factory() as db:
+        db.add_all([
+            models.SystemSetting(key="ollama_url", value=[
+                "http://a:11434",
+                {"url": "http://b:11434", "models": ["llama3"]},
+            ]),
+            models.SystemSetting(key="ollama_models", value=["qwen3:1.7b", "llama3", "broken"]),
+            models.SystemSetting(key="ollama_model_keep_alive", value={"llama3": -1}),
+        ])
+        await db.commit()
+
+    report = await ModelWarmup(session_factory).run(unload_models=["mistral", "llama3"])
+
+    # "llama3" is still configured, so only "mistral" is unloaded; b only serves llama3
+    assert ollama_requests == [
+        ("a", "mistral", 0),
+        ("a", "qwen3:1.7b", "30m"),
+        ("a", "llama3", -1),
+        ("a", "broken", "30m"),
+        ("b", "llama3", -1),
+    ]
+    by_target = {(r["url"], r["model"]): r for r in report["results"]}
+    assert by_target[("http://a:11434", "mistral")]["status"] == "unloaded"
+    assert by_target[("http://b:11434", "llama3")]["load_seconds"] == 2.5
+    assert by_target[("http://a:11434", "broken")]["status"] == "failed"
+    assert "not found" in by_target[("http://a:11434", "broken")]["error"]
@@ -0,0 +1,160 @@
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import ollama_client as ollama_client_module
+from app.services.ollama_client import OllamaClient, parse_dataset_response
+from app.services.ollama_errors import OllamaConnectionError, OllamaHTTPError, OllamaUnavailableError
+from app.services.ollama_pool import OllamaEndpointPool
+from app.services.prompt_templates import SYSTEM_PROMPT
+
+
+def _ndjson(*chunks):
+    return "".join(json.dumps(chunk, ensure_ascii=False) + "\n" for chunk in chunks)
+
+
+def _client_with_transport(handler):
+    client = OllamaClient(host="http://ollama-stream:11434", model="qwen3:1.7b")
+    client.client = httpx.AsyncClient(base_url=client.host, transport=httpx.MockTransport(handler))
+    return client
+
+
+async def test_stream_from_regulations_relays_chunks_then_parses():
+    answer = json.dumps({
+        "instruction": "什麼情況會被列為B級？",
+        "input": "我機關有提供地方服務，會是B級嗎？",
+        "output": "有可能。",
+        "history": [{"question": "q", "answer": "a"}, "skip"]
+    }, ensure_ascii=False)
+    pieces = [answer[:10], answer[10:40], answer[40:]]
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        body = _ndjson(
+            *({"message": {"role": "assistant", "content": piece}, "done": False} for piece in pieces),
+            {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": 42}
+        )
+        return httpx.Response(200, text=body, headers={"Content-Type": "application/x-ndjson"})
+
+    client = _client_with_transport(handler)
+    events = [event async for event in client.stream_from_regulations(["資通安全管理法第4條：內容"])]
+    await client.client.aclose()
+
+    assert requests[0]["stream"] is True
+    assert events[:3] == [("token", piece) for piece in pieces]
+    kind, result = events[3]
+    assert kind == "result"
+    assert result["instruction"] == "什麼情況會被列為B級？"
+    assert result["history"] == [["q", "a"]]
+
+
+async def test_generate_stream_raises_on_error_chunk():
+    def handler(request):
+        return httpx.Response(200, text=_ndjson({"error": "model not found"}))
+
+    client = _client_with_transport(handler)
+    with pytest.raises(RuntimeError, match="model not found"):
+        async for _ in client.generate_stream("hi"):
+            pass
+    await client.client.aclose()
+
+
+def test_parse_dataset_response_falls_back_to_raw_text():
+    result = parse_dataset_response("not json", "預設指令", "預設輸入")
+    assert result == {"instruction": "預設指令", "input": "預設輸入", "output": "not json", "history": []}
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    """Isolated circuit breaker state and recorded (instead of real) backoff sleeps."""
+    pool = OllamaEndpointPool(failure_threshold=3, eject_seconds=30)
+    monkeypatch.setattr(ollama_client_module, "ollama_pool", pool)
+    monkeypatch.setattr(settings, "ollama_max_retries", 2)
+    monkeypatch.setattr(settings, "ollama_retry_backoff_seconds", 1.0)
+    monkeypatch.setattr(ollama_client_module.random, "uniform", lambda a, b: b)
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(ollama_client_module.asyncio, "sleep", fake_sleep)
+    return pool, sleeps
+
+
+async def test_generate_retries_transient_errors_with_backoff(fast_retries):
+    pool, sleeps = fast_retries
+    responses = iter([httpx.Response(503), httpx.Response(502), httpx.Response(200, json={"message": {"content": "ok"}})])
+    client = _client_with_transport(lambda request: next(responses))
+
+    assert await client.generate("hi") == "ok"
+    assert sleeps == [1.0, 2.0]
+    assert pool.state(client.host).consecutive_failures == 0
+    await client.client.aclose()
+
+
+async def test_generate_does_not_retry_client_errors(fast_retries):
+    _, sleeps = fast_retries
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404, json={"error": "model 'qwen3:1.7b' not found"})
+
+    client = _client_with_transport(handler)
+    with pytest.raises(OllamaHTTPError, match="not found") as exc_info:
+        await client.generate("hi")
+    assert exc_info.value.status_code == 404
+    assert len(calls) == 1 and sleeps == []
+    await client.client.aclose()
+
+
+async def test_circuit_breaker_fails_fast_then_admits_one_trial(fast_retries, monkeypatch):
+    pool, _ = fast_retries
+    now = 1000.0
+    monkeypatch.setattr("app.services.ollama_pool.time.monotonic", lambda: now)
+    healthy = False
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if not healthy:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"message": {"content": "back"}})
+
+    client = _client_with_transport(handler)
+    with pytest.raises(OllamaConnectionError):
+        await client.generate("hi")
+    assert len(calls) == 3  # one attempt plus two retries opens the circuit
+
+    with pytest.raises(OllamaUnavailableError):
+        await client.generate("hi")
+    assert len(calls) == 3  # rejected without contacting Ollama
+
+    now += 31
+    healthy = True
+    assert await client.generate("hi") == "back"
+    assert pool.state(client.host).circuit(now, pool.failure_threshold) == "closed"
+    await client.client.aclose()
+
+
+async def test_regulation_prompts_share_a_static_system_prefix():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"message": {"content": "{}"}})
+
+    client = OllamaClient(host="http://ollama-prefix:11434", model="qwen3:1.7b", use_cache=False, keep_alive="1h")
+    client.client = httpx.AsyncClient(base_url=client.host, transport=httpx.MockTransport(handler))
+    await client.generate_from_regulations(["資通安全管理法第4條：內容"])
+    await client.generate_structured_dataset("舊指令", rejection_reasons=["太模糊"])
+    await client.client.aclose()
+
+    first, second = (request["messages"] for request in requests)
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert "資通安全管理法第4條：內容" in first[-1]["content"]
+    assert "太模糊" in second[-1]["content"] and "太模糊" not in SYSTEM_PROMPT
+    assert [r["keep_alive"] for r in requests] == ["1h", "1h"]
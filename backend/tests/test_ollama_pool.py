@@ -0,0 +1,112 @@
+import httpx
+
+from app.config import settings
+from app.services import ollama_pool as ollama_pool_module
+from app.services.ollama_client import OllamaClient
+from app.services.ollama_pool import OllamaEndpointPool, parse_endpoints, primary_endpoint_url
+
+
+def test_parse_endpoints_accepts_single_url_and_lists():
+    assert [e.url for e in parse_endpoints("http://a:11434/")] == ["http://a:11434"]
+    assert parse_endpoints(None) == []
+
+    endpoints = parse_endpoints([
+        "http://a:11434",
+        {"url": "http://b:11434", "weight": 2, "models": ["llama3", "qwen3:1.7b"]},
+    ])
+    assert [(e.url, e.weight) for e in endpoints] == [("http://a:11434", 1.0), ("http://b:11434", 2)]
+    assert endpoints[1].models == {"llama3:latest", "qwen3:1.7b"}
+    assert primary_endpoint_url([{"url": "http://b:11434"}]) == "http://b:11434"
+
+
+def test_select_prefers_least_loaded_healthy_endpoint_with_model(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(ollama_pool_module.time, "monotonic", lambda: now)
+    pool = OllamaEndpointPool(failure_threshold=2, eject_seconds=30)
+    a, b, c = parse_endpoints([
+        "http://a:11434",
+        {"url": "http://b:11434", "weight": 2},
+        {"url": "http://c:11434", "models": ["llama3"]},
+    ])
+    endpoints = [a, b, c]
+    pool.configure(endpoints)
+
+    # c does not serve the model; b has twice the weight, so it takes two requests per one on a
+    pool.state(a.url).in_flight = 1
+    pool.state(b.url).in_flight = 1
+    assert pool.select(endpoints, "qwen3:1.7b") is b
+    pool.state(b.url).in_flight = 3
+    assert pool.select(endpoints, "qwen3:1.7b") is a
+
+    # Models reported by /api/tags are taken into account
+    pool.state(a.url).available_models = {"llama3:latest"}
+    assert pool.select(endpoints, "qwen3:1.7b") is b
+
+    # Consecutive failures eject an endpoint until the eject period is over
+    pool.state(a.url).available_models = None
+    pool.state(b.url).in_flight = 0
+    pool.report_failure(b.url)
+    assert pool.select(endpoints, "qwen3:1.7b") is b
+    pool.report_failure(b.url)
+    assert pool.select(endpoints, "qwen3:1.7b") is a
+    assert pool.serving_count(endpoints, "qwen3:1.7b") == 1
+    now += 31
+    assert pool.select(endpoints, "qwen3:1.7b") is b
+    assert pool.serving_count(endpoints, "qwen3:1.7b") == 2
+
+
+async def test_probe_updates_models_and_readmits_endpoint(monkeypatch):
+    pool = OllamaEndpointPool(failure_threshold=1, eject_seconds=300)
+    healthy = False
+
+    def handler(request):
+        if not healthy:
+            return httpx.Response(500)
+        return httpx.Response(200, json={"models": [{"name": "qwen3:1.7b"}, {"name": "llama3:latest"}]})
+
+    client = httpx.AsyncClient(base_url="http://probe:11434", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ollama_pool_module.ollama_http_clients, "get", lambda url: client)
+    endpoints = parse_endpoints(["http://probe:11434", "http://other:11434"])
+    pool.configure(endpoints)
+
+    assert await pool.probe("http://probe:11434") is False
+    assert pool.serving_count(endpoints, "llama3") == 1
+
+    healthy = True
+    assert await pool.probe("http://probe:11434") is True
+    assert pool.state("http://probe:11434").available_models == {"qwen3:1.7b", "llama3:latest"}
+    assert pool.serving_count(endpoints, "llama3") == 2
+    await client.aclose()
+
+
+async def test_client_routes_around_failing_endpoint(monkeypatch):
+    pool = OllamaEndpointPool(failure_threshold=1, eject_seconds=300)
+    monkeypatch.setattr("app.services.ollama_client.ollama_pool", pool)
+    monkeypatch.setattr(settings, "ollama_retry_backoff_seconds", 0)
+    calls = []
+
+    def handler(request):
+        host = request.url.host
+        calls.append(host)
+        if host == "down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"message": {"content": f"from {host}"}})
+
+    clients = {}
+
+    class FakeRegistry:
+        def get(self, url):
+            return clients.setdefault(url, httpx.AsyncClient(base_url=url, transport=httpx.MockTransport(handler)))
+
+    monkeypatch.setattr("app.services.ollama_client.ollama_http_clients", FakeRegistry())
+
+    ollama = OllamaClient(host=["http://down:11434", "http://up:11434"], model="qwen3:1.7b", use_cache=False)
+    # Creating a client leaves the shared pool's configured endpoints alone
+    assert pool.endpoints == []
+    results = [await ollama.generate("hi") for _ in range(3)]
+
+    # The failed request is retried on the other endpoint; later ones skip the ejected endpoint
+    assert results == ["from up", "from up", "from up"]
+    assert calls == ["down", "up", "up", "up"]
+    for client in clients.values():
+        await client.aclose()
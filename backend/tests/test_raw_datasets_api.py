@@ -0,0 +1,13 @@
+from app.api.v1 import raw_datasets
+
+
+def test_read_raw_datasets_rejects_out_of_range_paging(client, db_session):
+    """
+    Test that the raw datasets listing bounds its page size and cursor.
+    """
+    client.app.dependency_overrides[raw_datasets.get_db] = lambda: db_session
+
+    assert client.get("/api/v1/raw-datasets/", params={"limit": 1001}).status_code == 422
+    assert client.get("/api/v1/raw-datasets/", params={"limit": 0}).status_code == 422
+    assert client.get("/api/v1/raw-datasets/", params={"after_id": -1}).status_code == 422
+    assert client.get("/api/v1/raw-datasets/", params={"limit": 1000}).status_code == 200
@@ -0,0 +1,327 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import crud, schemas
+from app.api.v1.regeneration_sweeps import _validate_sweep_request
+from app.config import settings
+from app.database import models
+from app.database.base import Base
+from app.services.ollama_client import OllamaClient
+from app.services.ollama_errors import OllamaConnectionError
+from app.services.regeneration import plan_regeneration_models
+from app.services.regeneration_worker import RegenerationWorkerPool
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    """
+    A file-backed database so each worker session gets its own connection.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'regeneration.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _add_queued_dataset(session_factory, previous_status=models.ReviewStatus.REJECTED, **task_fields):
+    async with session_factory() as db:
+        dataset = models.RawDataset(instruction="old q", output="old a", reject_count=3,
+                                    review_status=models.ReviewStatus.REGENERATING)
+        db.add(dataset)
+        await db.flush()
+        task = models.RegenerationTask(
+            dataset_id=dataset.id,
+            model_name="qwen3:1.7b",
+            status=task_fields.pop("status", models.RegenerationTaskStatus.PENDING),
+            previous_status=previous_status.value,
+            attempts=0,
+            available_at=crud._utcnow() - timedelta(seconds=1),
+            **task_fields
+        )
+        db.add(task)
+        await db.commit()
+        return dataset.id, task.id
+
+
+async def _load(session_factory, dataset_id, task_id):
+    async with session_factory() as db:
+        return await crud.get_raw_dataset_async(db, dataset_id), await crud.get_regeneration_task_async(db, task_id)
+
+
+def test_enqueue_regeneration_marks_dataset(db_session):
+    dataset = models.RawDataset(instruction="q", output="a", review_status=models.ReviewStatus.REVIEWING)
+    db_session.add(dataset)
+    db_session.commit()
+
+    task = crud.enqueue_regeneration(db_session, dataset.id, "llama3")
+
+    assert task.status == models.RegenerationTaskStatus.PENDING
+    assert task.previous_status == "reviewing"
+    assert dataset.review_status == models.ReviewStatus.REGENERATING
+    assert crud.enqueue_regeneration(db_session, 999999) is None
+
+
+def test_repeated_triggers_coalesce_into_one_task(db_session):
+    dataset = models.RawDataset(instruction="q", output="a", review_status=models.ReviewStatus.PENDING)
+    db_session.add(dataset)
+    db_session.commit()
+
+    tasks = [crud.enqueue_regeneration(db_session, dataset.id)]
+    # A coalesced trigger must not discard the caller's pending changes
+    unsaved = models.RawDataset(instruction="other", output="other")
+    db_session.add(unsaved)
+    tasks += [crud.enqueue_regeneration(db_session, dataset.id) for _ in range(2)]
+
+    assert unsaved in db_session
+    assert len({task.id for task in tasks}) == 1
+    assert db_session.query(models.RegenerationTask).filter_by(dataset_id=dataset.id).count() == 1
+    assert tasks[0].previous_status == "pending"
+
+
+def test_refresh_model_stats_keeps_queued_regenerations(db_session):
+    queued = models.RawDataset(instruction="q", output="a", reject_count=3, review_status=models.ReviewStatus.REJECTED)
+    reviewed = models.RawDataset(instruction="q", output="a", accept_count=2, review_status=models.ReviewStatus.ACCEPTED)
+    db_session.add_all([queued, reviewed])
+    db_session.commit()
+    task = crud.enqueue_regeneration(db_session, queued.id)
+
+    crud.refresh_model_stats(db_session)
+
+    assert queued.review_status == models.ReviewStatus.REGENERATING
+    assert reviewed.review_status == models.ReviewStatus.PENDING
+    assert crud.get_active_regeneration_task(db_session, queued.id).id == task.id
+    # A regeneration that finally fails falls back to pending, not the cleared rejected status
+    assert crud.get_active_regeneration_task(db_session, queued.id).previous_status == "pending"
+
+
+async def test_worker_regenerates_and_completes_task(session_factory, monkeypatch):
+    async def fake_generate_structured_dataset(self, **kwargs):
+        return {"instruction": "new q", "input": "", "output": "new a", "history": []}
+
+    monkeypatch.setattr(OllamaClient, "generate_structured_dataset", fake_generate_structured_dataset)
+    dataset_id, task_id = await _add_queued_dataset(session_factory)
+    pool = RegenerationWorkerPool(session_factory, workers=1)
+
+    assert await pool.run_once() is True
+    assert await pool.run_once() is False
+
+    dataset, task = await _load(session_factory, dataset_id, task_id)
+    assert dataset.output == "new a"
+    assert dataset.review_status == models.ReviewStatus.PENDING
+    assert dataset.system is None and dataset.history == []
+    assert task.status == models.RegenerationTaskStatus.COMPLETED
+    assert task.attempts == 1
+
+    async with session_factory() as db:
+        revisions = (await db.execute(
+            crud.select(models.DatasetRevision).filter_by(dataset_id=dataset_id)
+        )).scalars().all()
+    assert [(r.revision, r.instruction, r.output) for r in revisions] == [(1, "old q", "old a")]
+    assert revisions[0].rejection_snapshot == {"reject_count": 3, "accept_count": 0, "rejection_reasons": []}
+
+
+async def test_worker_retries_then_fails_and_restores_status(session_factory, monkeypatch):
+    async def failing_generate_structured_dataset(self, **kwargs):
+        raise OllamaConnectionError("connection refused")
+
+    monkeypatch.setattr(OllamaClient, "generate_structured_dataset", failing_generate_structured_dataset)
+    monkeypatch.setattr(settings, "regeneration_max_attempts", 2)
+    monkeypatch.setattr(settings, "regeneration_retry_delay_seconds", 60)
+    dataset_id, task_id = await _add_queued_dataset(session_factory)
+    pool = RegenerationWorkerPool(session_factory, workers=1)
+
+    assert await pool.run_once() is True
+    dataset, task = await _load(session_factory, dataset_id, task_id)
+    assert task.status == models.RegenerationTaskStatus.PENDING
+    assert "connection refused" in task.last_error
+    assert dataset.review_status == models.ReviewStatus.REGENERATING
+    # Not claimable again until the retry delay has passed
+    assert await pool.run_once() is False
+
+    async with session_factory() as db:
+        await crud.retry_regeneration_task_async(db, task_id, task.last_error, delay_seconds=-1)
+    assert await pool.run_once() is True
+
+    dataset, task = await _load(session_factory, dataset_id, task_id)
+    assert task.status == models.RegenerationTaskStatus.FAILED
+    assert task.attempts == 2
+    assert dataset.review_status == models.ReviewStatus.REJECTED
+    assert dataset.output == "old a"
+
+
+async def test_concurrent_claims_take_each_task_once(session_factory):
+    for _ in range(3):
+        await _add_queued_dataset(session_factory)
+
+    async def claim():
+        async with session_factory() as db:
+            task = await crud.claim_regeneration_task_async(db)
+            return task.id if task else None
+
+    claimed = await asyncio.gather(*(claim() for _ in range(5)))
+    assert sorted(task_id for task_id in claimed if task_id) == [1, 2, 3]
+    assert claimed.count(None) == 2
+
+
+async def test_recover_requeues_interrupted_and_orphaned_datasets(session_factory):
+    stale = crud._utcnow() - timedelta(seconds=settings.regeneration_stale_after_seconds + 60)
+    _, running_task_id = await _add_queued_dataset(
+        session_factory, status=models.RegenerationTaskStatus.RUNNING,
+        claimed_by="crashed-host:1", started_at=stale, heartbeat_at=stale
+    )
+    async with session_factory() as db:
+        orphan = models.RawDataset(instruction="q", output="a", review_status=models.ReviewStatus.REGENERATING)
+        db.add(orphan)
+        await db.commit()
+
+    assert await RegenerationWorkerPool(session_factory).recover() == 2
+
+    async with session_factory() as db:
+        running = await crud.get_regeneration_task_async(db, running_task_id)
+        assert running.status == models.RegenerationTaskStatus.PENDING
+        claimed = [await crud.claim_regeneration_task_async(db) for _ in range(2)]
+    assert {task.dataset_id for task in claimed} == {running.dataset_id, orphan.id}
+
+
+async def test_recover_leaves_live_running_tasks_alone(session_factory):
+    now = crud._utcnow()
+    dataset_id, task_id = await _add_queued_dataset(
+        session_factory, status=models.RegenerationTaskStatus.RUNNING,
+        claimed_by="other-host:42", started_at=now - timedelta(hours=1), heartbeat_at=now
+    )
+
+    assert await RegenerationWorkerPool(session_factory).recover() == 0
+
+    dataset, task = await _load(session_factory, dataset_id, task_id)
+    assert task.status == models.RegenerationTaskStatus.RUNNING
+    assert task.claimed_by == "other-host:42"
+    assert dataset.review_status == models.ReviewStatus.REGENERATING
+
+
+async def test_claim_records_owner_and_heartbeat_is_owner_only(session_factory):
+    _, task_id = await _add_queued_dataset(session_factory)
+    async with session_factory() as db:
+        task = await crud.claim_regeneration_task_async(db, "host-a:1")
+        assert task.claimed_by == "host-a:1"
+        assert task.heartbeat_at is not None
+
+        assert await crud.heartbeat_regeneration_task_async(db, task_id, "host-a:1")
+        assert not await crud.heartbeat_regeneration_task_async(db, task_id, "host-b:2")
+
+
+async def test_duplicate_tasks_for_a_dataset_run_once(session_factory, monkeypatch):
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = []
+
+    async def slow_generate_structured_dataset(self, **kwargs):
+        calls.append(kwargs)
+        started.set()
+        await release.wait()
+        return {"instruction": "new q", "input": "", "output": "new a", "history": []}
+
+    monkeypatch.setattr(OllamaClient, "generate_structured_dataset", slow_generate_structured_dataset)
+    dataset_id, first_id = await _add_queued_dataset(session_factory)
+    async with session_factory() as db:
+        db.add(models.RegenerationTask(dataset_id=dataset_id, status=models.RegenerationTaskStatus.PENDING,
+                                       attempts=0, available_at=crud._utcnow() - timedelta(seconds=1)))
+        await db.commit()
+    pool = RegenerationWorkerPool(session_factory, workers=2)
+
+    first = asyncio.create_task(pool.run_once())
+    await started.wait()
+    # The duplicate is not claimed while the first regeneration of the dataset is running
+    assert await pool.run_once() is False
+    release.set()
+    assert await first is True
+
+    # Once claimable, a duplicate claimed while the dataset is in flight in this process is coalesced
+    pool._in_flight.add(dataset_id)
+    assert await pool.run_once() is True
+    assert len(calls) == 1
+    async with session_factory() as db:
+        tasks = (await db.execute(
+            crud.select(models.RegenerationTask).filter_by(dataset_id=dataset_id)
+        )).scalars().all()
+    assert [task.status for task in tasks] == [models.RegenerationTaskStatus.COMPLETED] * 2
+
+
+def test_plan_regeneration_models_interleaves_by_weight():
+    plan = plan_regeneration_models({"llama3": 2, "qwen3:1.7b": 1, "unused": 0}, 6)
+
+    assert plan.count("llama3") == 4 and plan.count("qwen3:1.7b") == 2
+    assert plan[:3] in (["llama3", "qwen3:1.7b", "llama3"], ["llama3", "llama3", "qwen3:1.7b"])
+    assert plan_regeneration_models(None, 2) == [None, None]
+
+
+async def test_sweep_queues_matching_datasets_within_its_concurrency_limit(session_factory):
+    async with session_factory() as db:
+        db.add_all([
+            models.RawDataset(instruction="q", output="a", model_name="llama3", reject_count=4,
+                              source=["資通安全管理法"], review_status=models.ReviewStatus.REJECTED),
+            models.RawDataset(instruction="q", output="a", model_name="llama3", reject_count=2,
+                              source=["資通安全管理法施行細則"], review_status=models.ReviewStatus.PENDING),
+            models.RawDataset(instruction="q", output="a", model_name="llama3", reject_count=3,
+                              source=["個人資料保護法"], review_status=models.ReviewStatus.REJECTED),
+            models.RawDataset(instruction="q", output="a", model_name="mistral", reject_count=5,
+                              source=["資通安全管理法"], review_status=models.ReviewStatus.REJECTED),
+        ])
+        await db.commit()
+
+        filters = schemas.RegenerationSweepFilters(model_name="llama3", min_reject_count=2, source="資通安全")
+        candidates = await crud.get_regeneration_candidates_async(db, filters, limit=10)
+        assert candidates == [(1, "rejected"), (2, "pending")]
+
+        sweep = await crud.create_regeneration_sweep_async(
+            db, filters, candidates, plan_regeneration_models({"qwen3:1.7b": 1}, len(candidates)),
+            {"qwen3:1.7b": 1}, max_concurrency=1
+        )
+        assert sweep.total_items == 2
+        # Datasets already regenerating are no longer candidates
+        assert await crud.get_regeneration_candidates_async(db, filters, limit=10) == []
+
+        first = await crud.claim_regeneration_task_async(db)
+        assert (first.dataset_id, first.model_name) == (1, "qwen3:1.7b")
+        # The second sweep task waits until the first one finishes
+        assert await crud.claim_regeneration_task_async(db) is None
+        await crud.complete_regeneration_task_async(db, first.id)
+        second = await crud.claim_regeneration_task_async(db)
+        assert second.dataset_id == 2
+        await crud.fail_regeneration_task_async(db, second.id, "boom")
+
+        progress = await crud.get_regeneration_sweep_async(db, sweep.id)
+    assert (progress.matched_items, progress.completed, progress.failed, progress.pending) == (2, 1, 1, 0)
+    assert progress.finished is True
+    assert progress.by_model["qwen3:1.7b"].completed == 1
+    assert progress.estimated_remaining_seconds == 0.0
+
+
+async def test_sweep_source_filter_matches_individual_titles(session_factory):
+    async with session_factory() as db:
+        db.add_all([
+            models.RawDataset(instruction="q", output="a", source=["資通安全管理法", "個人資料保護法"]),
+            models.RawDataset(instruction="q", output="a", source=["50% 法規"]),
+        ])
+        await db.commit()
+
+        async def matching(source):
+            filters = schemas.RegenerationSweepFilters(source=source)
+            return [dataset_id for dataset_id, _ in await crud.get_regeneration_candidates_async(db, filters, limit=10)]
+
+        assert await matching("個人資料") == [1]
+        assert await matching("50%") == [2]
+        # Text spanning two titles, or JSON punctuation, matches nothing
+        assert await matching('管理法", "個人') == []
+        assert await matching('["') == []
+
+
+def test_sweep_concurrency_cannot_exceed_the_worker_count():
+    request = schemas.RegenerationSweepCreate(max_concurrency=settings.regeneration_workers + 1)
+    with pytest.raises(HTTPException) as excinfo:
+        _validate_sweep_request(request)
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,56 @@
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.database.models import UserRole
+from app.stats_cache import StatsCache, stats_cache
+
+
+def test_stats_cache_serves_until_invalidated():
+    cache = StatsCache(max_staleness=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("admin", compute) == 1
+    assert cache.get_or_compute("admin", compute) == 1
+    assert cache.get_or_compute(("user", 1), compute) == 2
+
+    cache.invalidate()
+    assert cache.get_or_compute("admin", compute) == 3
+
+
+def test_stats_cache_respects_max_staleness(monkeypatch):
+    cache = StatsCache(max_staleness=5)
+    now = [100.0]
+    monkeypatch.setattr("app.stats_cache.time.monotonic", lambda: now[0])
+
+    assert cache.get_or_compute("admin", lambda: "first") == "first"
+    now[0] += 4
+    assert cache.get_or_compute("admin", lambda: "second") == "first"
+    now[0] += 2
+    assert cache.get_or_compute("admin", lambda: "third") == "third"
+
+
+def test_stats_cache_disabled():
+    cache = StatsCache(max_staleness=0)
+    values = iter([1, 2])
+    assert cache.get_or_compute("admin", lambda: next(values)) == 1
+    assert cache.get_or_compute("admin", lambda: next(values)) == 2
+
+
+def test_review_log_invalidates_stats_cache(db_session: Session):
+    """
+    Test that writing a review or rebuilding the counters bumps the cache generation.
+    """
+    reviewer = crud.create_user(db_session, user=schemas.UserCreate(username="cacheuser", password="password123", role=UserRole.EXPERT))
+    dataset = crud.create_raw_dataset(db_session, dataset=schemas.RawDatasetCreate(instruction="q", output="a"))
+
+    generation = stats_cache.generation
+    crud.create_review_log(db_session, dataset_id=dataset.id, reviewer_id=reviewer.id, review=schemas.ReviewCreate(result="ACCEPT"))
+    assert stats_cache.generation > generation
+
+    generation = stats_cache.generation
+    crud.rebuild_review_counters(db_session)
+    assert stats_cache.generation > generation
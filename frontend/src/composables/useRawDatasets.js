@@ -0,0 +1,29 @@
+import useAuth from '../store/auth'
+
+const PAGE_SIZE = 500
+
+const useRawDatasets = () => {
+  const { instance } = useAuth()
+
+  // 依 next_cursor 逐頁取得所有待審核資料；history 需明確要求才會回傳
+  const fetchAllRawDatasets = async ({ includeHistory = false } = {}) => {
+    const items = []
+    let afterId = null
+    do {
+      const params = { limit: PAGE_SIZE, include_history: includeHistory }
+      if (afterId !== null) {
+        params.after_id = afterId
+      }
+      const response = await instance.get('/api/v1/datasets/', { params })
+      items.push(...response.data.items)
+      afterId = response.data.next_cursor
+    } while (afterId !== null && afterId !== undefined)
+    return items
+  }
+
+  return {
+    fetchAllRawDatasets,
+  }
+}
+
+export default useRawDatasets